@@ -1,6 +1,19 @@
-from .modules import (
-    transcribe_audio,
-    clean_text,
-    save_transcript,
-    preprocess_transcript
-)
\ No newline at end of file
+# Các hàm tiện ích được import lười (khi truy cập lần đầu) để "import app" không phải nạp faster-whisper
+_LAZY_EXPORTS = {
+    "transcribe_audio": "app.modules.preprocessing",
+    "clean_text": "app.modules.preprocessing",
+    "save_transcript": "app.modules.preprocessing",
+    "preprocess_transcript": "app.modules.preprocessing",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
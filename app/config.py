@@ -1,6 +1,5 @@
 import os
 from dotenv import load_dotenv
-from faster_whisper import WhisperModel
 
 load_dotenv()
 ##Cau hinh cho Whisper
@@ -10,6 +9,142 @@ WHISPER_DEVICE = 'cpu'
 WHISPER_COMPUTE_TYPE = 'int8'
 WHISPER_BEAM_SIZE = 8
 WHISPER_USE_VAD = True
+# Số process transcribe song song cho file dài (1 = một lời gọi duy nhất, >1 = chia shard theo VAD);
+# không áp dụng cho job nền, nơi mỗi worker của JOB_WHISPER_WORKERS transcribe cả file bằng model đã nạp sẵn
+WHISPER_NUM_WORKERS = int(os.getenv('WHISPER_NUM_WORKERS', 1))
+# Kích thước batch khi transcribe dạng luồng (batch nhỏ hơn cho đoạn đầu tiên sớm hơn)
+WHISPER_STREAM_BATCH_SIZE = 8
+# Cache transcript theo hash nội dung audio và tham số Whisper
+TRANSCRIPT_CACHE_ENABLED = os.getenv('TRANSCRIPT_CACHE_ENABLED', '1') == '1'
+TRANSCRIPT_CACHE_DIR = os.getenv('TRANSCRIPT_CACHE_DIR', os.path.join('.cache', 'transcripts'))
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Cache audio đã giải mã (PCM float32 16 kHz mono, memory-map) theo hash nội dung audio:
+# mỗi file chỉ giải mã một lần cho mọi lần transcribe/thử lại/shard trong thời gian ttl (mặc định bằng JOB_RESULT_TTL)
+PCM_CACHE_ENABLED = os.getenv('PCM_CACHE_ENABLED', '1') == '1'
+PCM_CACHE_DIR = os.getenv('PCM_CACHE_DIR', os.path.join('.cache', 'pcm'))
+PCM_CACHE_MAX_BYTES = int(os.getenv('PCM_CACHE_MAX_BYTES', 4 * 1024 * 1024 * 1024))
+PCM_CACHE_TTL = int(os.getenv('PCM_CACHE_TTL', os.getenv('JOB_RESULT_TTL', 3600)))
+# Chế độ hai lượt: model nhỏ giải mã tham lam cho transcript/biên bản nháp nhanh, sau đó model ở trên cho bản cuối
+# (WHISPER_MODEL_CACHE_SIZE được nâng lên ít nhất 2 để giữ cả hai model trong bộ nhớ, xem bên dưới)
+WHISPER_DRAFT_MODEL_SIZE = os.getenv('WHISPER_DRAFT_MODEL_SIZE', 'base')
+WHISPER_DRAFT_BEAM_SIZE = int(os.getenv('WHISPER_DRAFT_BEAM_SIZE', 1))
+# Lọc đoạn Whisper "bịa" ra (hallucination), vòng lặp và từ đệm trước khi gửi transcript tới LLM.
+# Các cụm từ được so khớp không phân biệt hoa thường bằng một automaton (Aho-Corasick) cho cả danh sách;
+# có thể bổ sung cụm từ qua file TRANSCRIPT_FILTER_PHRASES_FILE (mỗi dòng một cụm)
+TRANSCRIPT_FILTER_ENABLED = os.getenv('TRANSCRIPT_FILTER_ENABLED', '1') == '1'
+TRANSCRIPT_FILTER_PHRASES = [
+    'Hãy subscribe cho kênh',
+    'Ghiền Mì Gõ',
+    'Để không bỏ lỡ những video hấp dẫn',
+    'Hãy đăng ký kênh',
+    'Đăng ký kênh để ủng hộ kênh của mình nhé',
+    'Để ủng hộ kênh của mình nhé',
+    'Hẹn gặp lại các bạn trong những video tiếp theo',
+    'Subtitles by the Amara.org community',
+]
+TRANSCRIPT_FILTER_PHRASES_FILE = os.getenv('TRANSCRIPT_FILTER_PHRASES_FILE') or None
+TRANSCRIPT_FILLER_WORDS = ['ừ', 'ừm', 'ờ', 'à', 'ơ', 'ư', 'hử', 'uh', 'um', 'uhm', 'hmm', 'ah', 'eh']
+# Bỏ đoạn có no_speech_prob > ngưỡng và avg_logprob < ngưỡng (cùng quy tắc với Whisper)
+TRANSCRIPT_NO_SPEECH_THRESHOLD = float(os.getenv('TRANSCRIPT_NO_SPEECH_THRESHOLD', 0.6))
+TRANSCRIPT_LOGPROB_THRESHOLD = float(os.getenv('TRANSCRIPT_LOGPROB_THRESHOLD', -1.0))
+# Cụm từ/đoạn lặp liên tiếp từ số lần này trở lên được coi là vòng lặp của Whisper
+TRANSCRIPT_REPEAT_THRESHOLD = int(os.getenv('TRANSCRIPT_REPEAT_THRESHOLD', 3))
+# Lọc salience trước khi chia chunk: chấm điểm từng câu bằng TF-IDF/từ khóa và chỉ giữ khoảng SALIENCE_KEEP_RATIO
+# số từ của transcript (1 = tắt). Câu có ngày/giờ, tên người hoặc từ khóa quyết định dưới đây luôn được giữ
+SALIENCE_KEEP_RATIO = float(os.getenv('SALIENCE_KEEP_RATIO', 1.0))
+SALIENCE_DECISION_CUES = [
+    'quyết định', 'thống nhất', 'đồng ý', 'phê duyệt', 'chốt', 'kết luận', 'giao cho', 'phân công',
+    'phụ trách', 'chịu trách nhiệm', 'hạn chót', 'deadline', 'hoàn thành trước', 'đề xuất', 'kiến nghị',
+    'yêu cầu', 'cần phải', 'triển khai', 'ngân sách', 'tài liệu', 'đính kèm'
+]
+# Các từ đáp lời không tính điểm (cùng với TRANSCRIPT_FILLER_WORDS)
+SALIENCE_STOP_WORDS = ['vâng', 'dạ', 'ok', 'okay', 'ừ', 'rồi', 'nhé', 'nhỉ', 'ạ', 'đúng', 'thế', 'à', 'thì', 'là', 'mà']
+# Số model Whisper tối đa giữ trong bộ nhớ (LRU), model ít dùng nhất sẽ bị giải phóng
+WHISPER_MODEL_CACHE_SIZE = int(os.getenv('WHISPER_MODEL_CACHE_SIZE', 1))
+# Có model nháp khác model chính: giữ cả hai, nếu không mỗi lần transcribe hai lượt sẽ giải phóng rồi nạp lại model chính
+if WHISPER_DRAFT_MODEL_SIZE and WHISPER_DRAFT_MODEL_SIZE != WHISPER_MODEL_SIZE:
+    WHISPER_MODEL_CACHE_SIZE = max(WHISPER_MODEL_CACHE_SIZE, 2)
+# Nạp sẵn model Whisper khi khởi động API để tránh cold start ở request đầu tiên
+WHISPER_WARMUP_ON_STARTUP = os.getenv('WHISPER_WARMUP_ON_STARTUP', '1') == '1'
+
+##Cau hinh cho job chay nen
+# Số process worker chạy Whisper (mỗi worker giữ một model riêng)
+JOB_WHISPER_WORKERS = int(os.getenv('JOB_WHISPER_WORKERS', 1))
+# Số thread worker gọi LLM
+JOB_LLM_WORKERS = int(os.getenv('JOB_LLM_WORKERS', 4))
+# Số job tối đa đang chờ/chạy, vượt quá sẽ trả về HTTP 429
+JOB_MAX_QUEUE_DEPTH = int(os.getenv('JOB_MAX_QUEUE_DEPTH', 16))
+# Thời gian (giây) giữ kết quả job đã hoàn thành
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', 3600))
+
+# Thời gian (giây) giữ phiên họp trực tiếp không hoạt động
+LIVE_SESSION_TTL = int(os.getenv('LIVE_SESSION_TTL', 4 * 3600))
+
+##Cau hinh cho LLM
+LLM_MODEL_NAME = 'gpt-4o-mini'
+# Cách lấy biên bản có cấu trúc từ LLM khi trích xuất từng chunk:
+#   'structured': function calling với schema MeetingMinutes và prompt rút gọn (không lặp lại schema/output mẫu
+#                 trong mỗi prompt); tự quay về 'parser' nếu model không hỗ trợ hoặc output không hợp lệ
+#   'parser':     prompt đầy đủ (format instructions + output mẫu) và PydanticOutputParser trên văn bản trả về
+LLM_OUTPUT_MODE = os.getenv('LLM_OUTPUT_MODE', 'structured')
+# Số chunk gửi tới LLM đồng thời khi tạo meeting minutes
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+# Hạn mức request/token mỗi phút của API key (0 = không giới hạn)
+LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', 0))
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', 0))
+# Số lời gọi LLM đồng thời tối đa của cả process (mọi request, mọi batch; 0 = không giới hạn)
+# và kích thước pool kết nối HTTP keep-alive của client LLM dùng chung
+LLM_GLOBAL_CONCURRENCY = int(os.getenv('LLM_GLOBAL_CONCURRENCY', 16))
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv('LLM_HTTP_MAX_CONNECTIONS', 20))
+LLM_HTTP_TIMEOUT = float(os.getenv('LLM_HTTP_TIMEOUT', 120))
+# Chia transcript theo ngân sách token: số token tối đa mỗi chunk và số token chồng lấn
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', 1500))
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', 150))
+# Lập lịch theo deadline (mặc định cho tham số deadline_seconds của /summarize-file và cho giao diện; 0 = tắt):
+# chọn kích thước chunk, số lời gọi song song và độ sâu hợp nhất theo độ dài transcript và độ trễ quan sát được của model.
+# Độ trễ mỗi lời gọi được ước lượng là base + rate * token prompt, học dần bằng EWMA (hệ số alpha) cho từng model;
+# trước khi có số đo dùng các giá trị mặc định dưới đây (giây, giây cho mỗi 1000 token prompt)
+SUMMARY_DEADLINE_SECONDS = float(os.getenv('SUMMARY_DEADLINE_SECONDS', 0))
+LLM_LATENCY_EWMA_ALPHA = float(os.getenv('LLM_LATENCY_EWMA_ALPHA', 0.2))
+LLM_LATENCY_PRIOR_BASE = float(os.getenv('LLM_LATENCY_PRIOR_BASE', 2.0))
+LLM_LATENCY_PRIOR_PER_1K_TOKENS = float(os.getenv('LLM_LATENCY_PRIOR_PER_1K_TOKENS', 3.0))
+# Các kích thước chunk (token) được xét và phần deadline dùng để lập lịch (phần còn lại dự phòng)
+SCHEDULER_CHUNK_TOKENS = [500, 1000, 1500, 2500, 4000, 8000]
+SCHEDULER_SAFETY_FACTOR = float(os.getenv('SCHEDULER_SAFETY_FACTOR', 0.8))
+# Hợp nhất phân cấp (tree-reduce): số kết quả gộp mỗi nhóm và số ý tối đa mỗi mục
+REDUCE_FAN_IN = int(os.getenv('REDUCE_FAN_IN', 4))
+REDUCE_MAX_ITEMS = int(os.getenv('REDUCE_MAX_ITEMS', 15))
+# Ngưỡng Jaccard để gộp các ý gần trùng (diễn đạt lại, khác dấu) khi hợp nhất kết quả các chunk
+# (0 = tắt, chỉ gộp ý trùng khớp; ví dụ 0.7 để bật)
+MERGE_DEDUP_THRESHOLD = float(os.getenv('MERGE_DEDUP_THRESHOLD', 0))
+# Từ phủ định/đổi chiều: hai ý khác nhau ở các từ này (hoặc ở tên riêng, con số) không bao giờ bị gộp
+MERGE_DEDUP_GUARD_WORDS = [
+    'không', 'chưa', 'chẳng', 'chả', 'đừng', 'chớ', 'ko', 'tăng', 'giảm', 'thêm', 'bớt', 'hủy', 'huỷ', 'hoãn',
+    'dừng', 'ngừng', 'bỏ', 'cấm', 'phản', 'chối'
+]
+# Cache kết quả trích xuất của LLM theo nội dung chunk (SQLite trên đĩa)
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', '1') == '1'
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join('.cache', 'llm_cache.sqlite3'))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 30 * 24 * 3600))
+# Checkpoint theo job: kết quả của từng chunk được lưu ngay khi xong, lần thử lại cùng job_id chỉ xử lý chunk còn thiếu
+CHECKPOINT_ENABLED = os.getenv('CHECKPOINT_ENABLED', '1') == '1'
+CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', os.path.join('.cache', 'checkpoints.sqlite3'))
+CHECKPOINT_TTL = int(os.getenv('CHECKPOINT_TTL', 7 * 24 * 3600))
+
+# Thư mục chứa các thư mục tạm của từng request (mặc định: thư mục tạm của hệ thống)
+TEMP_DIR = os.getenv('TEMP_DIR') or None
+# Thư mục chứa file DOCX của giao diện Gradio được xóa khi cũ hơn OUTPUT_DIR_TTL giây (dọn ở mỗi lần xuất)
+OUTPUT_DIR_TTL = int(os.getenv('OUTPUT_DIR_TTL', os.getenv('JOB_RESULT_TTL', 3600)))
+# File DOCX khung tùy chỉnh cho biên bản (phải chứa đoạn văn {{NOI_DUNG_BIEN_BAN}}); mặc định dựng sẵn theo mẫu hành chính
+DOCX_TEMPLATE_PATH = os.getenv('DOCX_TEMPLATE_PATH') or None
+
+##Cau hinh cho metrics
+# Luôn trả về header Server-Timing (thời gian từng bước) cho mọi request;
+# nếu tắt, client vẫn có thể yêu cầu bằng header "X-Timing: 1"
+TIMING_HEADERS_ENABLED = os.getenv('TIMING_HEADERS_ENABLED', '0') == '1'
+# Mức log của các sự kiện có cấu trúc (logger 'app.events', in ra stderr mỗi sự kiện một dòng JSON); 'OFF' để tắt
+EVENT_LOG_LEVEL = os.getenv('EVENT_LOG_LEVEL', 'INFO').upper()
 
 
 ## OPen ai key
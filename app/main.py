@@ -1,112 +1,347 @@
+import asyncio
 import os
 import sys
+import io
+import json
 import shutil
-import uvicorn
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Form
-from fastapi.responses import JSONResponse, FileResponse
+import tempfile
+import time
+import uuid
+import zipfile
+from contextlib import asynccontextmanager
+from functools import partial
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from app.modules.preprocessing import transcribe_audio, save_transcript, preprocess_transcript, clean_text
-from app.modules.summarizer import generate_meeting_minutes, process_transcript_file
-from app.modules.exporter import export_meeting_minutes_to_docx
+from typing import List, Literal, Optional
+from app.modules.preprocessing import (
+    transcribe_audio, transcribe_audio_stream, format_transcript, preprocess_transcript,
+    clean_text
+)
+from app.modules.summarizer import (
+    IncrementalSummarizer, generate_meeting_minutes, process_transcript, split_transcript_by_lines, summarize_batch
+)
+from app.modules.chunking import split_transcript_by_tokens, chunk_report
+from app.modules.salience import get_salience_filter
+from app.modules.scheduler import get_deadline_scheduler, llm_latency
+from app.modules.checkpoint import get_checkpoint_store, open_checkpoint
+from app.modules.rate_limiter import RateLimiter
+from app.modules.llm_cache import CacheUsage, get_llm_cache
+from app.modules.transcript_cache import get_transcript_cache, hash_audio_file, hash_audio_stream
+from app.modules.audio_ingest import get_pcm_cache
+from app.modules.live_session import live_sessions
+from app.modules.exporter import export_meeting_minutes_to_docx_bytes, export_meeting_minutes_bulk
 from app.modules.schema import MeetingMinutes
-import config
+from app.modules.segment_store import SegmentStore
+from app.modules.model_registry import get_model_registry
+from app.modules.metrics import (
+    registry as metrics_registry, span, observe_stage, start_request_timings, end_request_timings,
+    server_timing_header
+)
+from app.modules.jobs import (
+    JobManager, JobStatus, QueueFullError, get_job_manager, shutdown_job_manager,
+    run_transcription_job, run_summarize_file_job, run_summarize_job, run_two_pass_final_job, remove_path
+)
+from app import config
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Nạp sẵn model Whisper theo cấu hình khi khởi động API,
+    để request transcribe đầu tiên không phải chờ nạp model.
+    """
+    if config.WHISPER_WARMUP_ON_STARTUP:
+        await run_in_threadpool(
+            get_model_registry().warm_up,
+            config.WHISPER_MODEL_SIZE,
+            config.WHISPER_DEVICE,
+            config.WHISPER_COMPUTE_TYPE
+        )
+    yield
+    shutdown_job_manager()
+    get_model_registry().clear()
 
 
 app = FastAPI(
     title="Meeting Minutes Generator API",
     description="API cho ứng dụng tạo biên bản cuộc họp từ transcript",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """
+    Đo thời gian của cả request và của từng bước (upload, Whisper, chunking, LLM, merge, DOCX...).
+    Bảng thời gian được trả về trong header Server-Timing nếu bật TIMING_HEADERS_ENABLED
+    hoặc client gửi header "X-Timing: 1".
+    Với response dạng luồng, header chỉ chứa các bước đã xong trước khi bắt đầu gửi dữ liệu.
+    """
+    token = start_request_timings()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        timings = end_request_timings(token)
+    observe_stage("request", time.perf_counter() - start)
+    if config.TIMING_HEADERS_ENABLED or request.headers.get("x-timing") == "1":
+        timings["total"] = [time.perf_counter() - start, 1]
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
+# ---------------------
+# Endpoint metrics định dạng Prometheus
+# ---------------------
+@app.get("/metrics", summary="Metrics định dạng Prometheus")
+async def metrics_endpoint():
+    """
+    Trả về thời gian từng bước (histogram), số chunk, số lời gọi/token LLM, số lần hit/miss cache
+    và số lỗi theo từng bước. Metrics tính riêng cho từng process (không gồm các process worker Whisper).
+    """
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+# ---------------------
+# File tạm của request: mỗi request một thư mục riêng để các request đồng thời không ghi đè file của nhau
+# ---------------------
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def make_upload_path(upload: UploadFile) -> str:
+    """Tạo thư mục tạm riêng cho request và trả về đường dẫn file (giữ tên gốc) bên trong thư mục đó."""
+    directory = tempfile.mkdtemp(prefix="mmg_", dir=config.TEMP_DIR)
+    return os.path.join(directory, os.path.basename(upload.filename or "") or "upload")
+
+
+def save_upload_to_temp(upload: UploadFile) -> str:
+    """Lưu file upload vào thư mục tạm riêng của request và trả về đường dẫn."""
+    path = make_upload_path(upload)
+    with open(path, "wb") as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+    return path
+
+
+def remove_upload(path: str) -> None:
+    """Xóa file upload cùng thư mục tạm của request."""
+    remove_path(os.path.dirname(path))
+
+
+async def read_upload_text(upload: UploadFile) -> str:
+    """Đọc toàn bộ file transcript upload vào bộ nhớ (UTF-8), không ghi ra đĩa."""
+    with span("upload_read"):
+        return (await upload.read()).decode("utf-8")
+
+
+def attachment_headers(filename: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+# ---------------------
+# Endpoint thống kê registry model Whisper
+# ---------------------
+@app.get("/models/stats", summary="Thống kê model Whisper đã nạp")
+async def model_stats_endpoint():
+    """
+    Trả về số lần hit/miss, số lần nạp, thời gian nạp và danh sách model Whisper đang được giữ trong bộ nhớ.
+    """
+    return JSONResponse(content=get_model_registry().stats())
+
+
+@app.get("/cache/stats", summary="Thống kê cache kết quả LLM và cache transcript")
+async def llm_cache_stats_endpoint():
+    """
+    Trả về số bản ghi và dung lượng của cache kết quả trích xuất LLM, cache transcript, cache audio PCM
+    và checkpoint các job tạo meeting minutes trên đĩa.
+    """
+    cache = get_llm_cache()
+    transcript_cache = get_transcript_cache()
+    pcm_cache = get_pcm_cache()
+    checkpoint_store = get_checkpoint_store()
+    return JSONResponse(content={
+        "llm": cache.stats() if cache is not None else {"enabled": False},
+        "transcripts": transcript_cache.stats() if transcript_cache is not None else {"enabled": False},
+        "pcm": pcm_cache.stats() if pcm_cache is not None else {"enabled": False},
+        "checkpoints": checkpoint_store.stats() if checkpoint_store is not None else {"enabled": False}
+    })
+
+
+@app.get("/checkpoints/{job_id}", summary="Số chunk đã có checkpoint của một job tạo meeting minutes")
+async def checkpoint_status_endpoint(job_id: str):
+    """
+    Trả về số chunk đã hoàn thành (đã lưu checkpoint) của job; 0 nếu job chưa chạy hoặc đã hoàn thành.
+    """
+    store = get_checkpoint_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Checkpoint bị tắt.")
+    return JSONResponse(content={"job_id": job_id, "completed_chunks": await run_in_threadpool(store.count, job_id)})
+
+
+@app.get("/llm/latency", summary="Độ trễ quan sát được của các lời gọi LLM theo model")
+async def llm_latency_endpoint():
+    """
+    Trả về mô hình độ trễ (EWMA) của từng model dùng để lập lịch theo deadline: số lần đo, độ trễ cố định
+    mỗi lời gọi và số giây cho mỗi 1000 token prompt.
+    """
+    return JSONResponse(content=llm_latency.stats())
+
+
 # ---------------------
 # Endpoint cho chuyển đổi audio thành transcript
 # ---------------------
 @app.post("/transcribe", summary="Chuyển đổi audio thành transcript")
 async def transcribe_endpoint(audio: UploadFile = File(...)):
     """
-    Nhận file audio, lưu tạm trên đĩa, gọi hàm transcribe_audio và trả về transcript cùng thông tin.
+    Nhận file audio, gọi hàm transcribe_audio trực tiếp trên file upload và trả về transcript cùng thông tin.
     """
-    temp_audio_path = f"temp_{audio.filename}"
     try:
-        with open(temp_audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
+        # Tính hash nội dung để tra cache transcript/PCM; audio được giải mã thẳng từ file upload, không sao chép ra đĩa
+        with span("upload_hash"):
+            audio_hash = await run_in_threadpool(hash_audio_stream, audio.file)
 
-        segments, info = transcribe_audio(
-            input_audio=temp_audio_path,
+        segments, info = await run_in_threadpool(
+            transcribe_audio,
+            input_audio=audio.file,
             model_size=config.WHISPER_MODEL_SIZE,
             device=config.WHISPER_DEVICE,
             compute_type=config.WHISPER_COMPUTE_TYPE,
             beam_size=config.WHISPER_BEAM_SIZE,
-            vad_filter=config.WHISPER_USE_VAD
+            vad_filter=config.WHISPER_USE_VAD,
+            num_workers=config.WHISPER_NUM_WORKERS,
+            audio_hash=audio_hash
         )
         result = {
-            "transcript": segments,
+            "transcript": segments.to_list(),
             "info": {
                 "language": info.language,
-                "language_probability": info.language_probability
+                "language_probability": info.language_probability,
+                "filtered": getattr(info, "filtered", None)
             }
         }
         return JSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
 
 
 # ---------------------
 # Endpoint cho chuyển đổi audio thành transcript và trả về file TXT
 # ---------------------
-# Hàm hỗ trợ xóa file sau khi trả về FileResponse
-def remove_file(path: str):
-    if os.path.exists(path):
-        os.remove(path)
-
 @app.post("/transcribe-txt", summary="Chuyển đổi audio thành transcript và trả về file TXT")
-async def transcribe_txt_endpoint(audio: UploadFile = File(...), background_tasks: BackgroundTasks = None):
+async def transcribe_txt_endpoint(audio: UploadFile = File(...)):
     """
-    Nhận file audio, lưu tạm trên đĩa, gọi hàm transcribe_audio, lưu transcript ra file TXT
-    và trả về file TXT để client có thể tải về.
+    Nhận file audio, gọi hàm transcribe_audio trực tiếp trên file upload
+    và trả về transcript dạng file TXT (tạo trong bộ nhớ) để client có thể tải về.
     """
-    temp_audio_path = f"temp_{audio.filename}"
-    temp_txt_path = f"transcript_{audio.filename}.txt"
     try:
-        # Lưu file audio tạm
-        with open(temp_audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
+        # Tính hash nội dung để tra cache transcript/PCM; audio được giải mã thẳng từ file upload, không sao chép ra đĩa
+        with span("upload_hash"):
+            audio_hash = await run_in_threadpool(hash_audio_stream, audio.file)
 
-        segments, info = transcribe_audio(
-            input_audio=temp_audio_path,
+        segments, info = await run_in_threadpool(
+            transcribe_audio,
+            input_audio=audio.file,
             model_size=config.WHISPER_MODEL_SIZE,
             device=config.WHISPER_DEVICE,
             compute_type=config.WHISPER_COMPUTE_TYPE,
             beam_size=config.WHISPER_BEAM_SIZE,
-            vad_filter=config.WHISPER_USE_VAD
+            vad_filter=config.WHISPER_USE_VAD,
+            num_workers=config.WHISPER_NUM_WORKERS,
+            audio_hash=audio_hash
         )
-        # Lưu transcript ra file TXT
-        save_transcript(segments, temp_txt_path)
-
-        # Xóa file audio tạm
-        if os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
-
-        # Đặt background task để xóa file TXT sau khi trả về
-        if background_tasks:
-            background_tasks.add_task(remove_file, temp_txt_path)
-        else:
-            # Nếu không sử dụng BackgroundTasks, xóa file sau khi trả về (có thể gây lỗi nếu file bị xóa quá sớm)
-            pass
-
-        return FileResponse(
-            path=temp_txt_path,
-            media_type="text/plain",
-            filename="transcript.txt"
+        headers = attachment_headers("transcript.txt")
+        filtered = getattr(info, "filtered", None)
+        if filtered:
+            # Số token hallucination/từ đệm đã bị loại khỏi transcript
+            headers["X-Transcript-Tokens-Removed"] = str(filtered["total_tokens_removed"])
+        return Response(
+            content=format_transcript(segments).encode("utf-8"),
+            media_type="text/plain; charset=utf-8",
+            headers=headers
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# ---------------------
+# Endpoint cho chuyển đổi audio thành transcript dạng luồng (NDJSON)
+# ---------------------
+def stream_transcription_events(segments, info, start: float):
+    """
+    Generator sinh các sự kiện NDJSON trong quá trình transcribe:
+      - info: ngôn ngữ nhận diện được
+      - segment: từng đoạn transcript ngay khi được giải mã (kèm thời gian đã trôi qua)
+      - done: tổng số đoạn, time-to-first-segment và tổng thời gian xử lý
+      - error: nếu có lỗi xảy ra giữa chừng
+    segments là generator của transcribe_audio_stream (audio đã được giải mã trước khi bắt đầu trả về),
+    start là thời điểm bắt đầu xử lý request.
+    """
+    first_segment_at = None
+    count = 0
+    try:
+        yield json.dumps({
+            "type": "info",
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "elapsed": round(time.perf_counter() - start, 3)
+        }, ensure_ascii=False) + "\n"
+
+        for segment in segments:
+            elapsed = time.perf_counter() - start
+            if first_segment_at is None:
+                first_segment_at = elapsed
+            yield json.dumps({
+                "type": "segment",
+                "index": count,
+                **segment,
+                "elapsed": round(elapsed, 3)
+            }, ensure_ascii=False) + "\n"
+            count += 1
+
+        yield json.dumps({
+            "type": "done",
+            "segments": count,
+            "time_to_first_segment": round(first_segment_at, 3) if first_segment_at is not None else None,
+            "filtered": getattr(info, "filtered", None),
+            "total_time": round(time.perf_counter() - start, 3)
+        }, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+
+
+@app.post("/transcribe-stream", summary="Chuyển đổi audio thành transcript dạng luồng (NDJSON)")
+async def transcribe_stream_endpoint(audio: UploadFile = File(...)):
+    """
+    Nhận file audio và trả về transcript dạng NDJSON: mỗi dòng là một sự kiện JSON,
+    các đoạn transcript được gửi ngay khi Faster Whisper giải mã xong thay vì chờ toàn bộ file.
+    """
+    start = time.perf_counter()
+    try:
+        with span("upload_hash"):
+            audio_hash = await run_in_threadpool(hash_audio_stream, audio.file)
+        # Giải mã audio (vào cache PCM) trước khi trả response vì file upload có thể bị đóng sau đó;
+        # các đoạn transcript vẫn được sinh dần khi client đọc luồng
+        segments, info = await run_in_threadpool(
+            transcribe_audio_stream,
+            input_audio=audio.file,
+            model_size=config.WHISPER_MODEL_SIZE,
+            device=config.WHISPER_DEVICE,
+            compute_type=config.WHISPER_COMPUTE_TYPE,
+            beam_size=config.WHISPER_BEAM_SIZE,
+            vad_filter=config.WHISPER_USE_VAD,
+            batch_size=config.WHISPER_STREAM_BATCH_SIZE,
+            audio_hash=audio_hash
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        stream_transcription_events(segments, info, start),
+        media_type="application/x-ndjson"
+    )
+
+
 # ---------------------
 # Endpoint cho tạo meeting minutes từ file transcript
 # ---------------------
@@ -114,26 +349,117 @@ async def transcribe_txt_endpoint(audio: UploadFile = File(...), background_task
 async def summarize_file_endpoint(
         file: UploadFile = File(...),
         chunk_size: int = Form(7),
-        chunk_overlap: int = Form(2)
+        chunk_overlap: int = Form(2),
+        max_concurrency: int = Form(config.LLM_MAX_CONCURRENCY),
+        requests_per_minute: int = Form(0),
+        tokens_per_minute: int = Form(0),
+        use_cache: bool = Form(True),
+        chunk_tokens: int = Form(config.CHUNK_MAX_TOKENS),
+        chunk_overlap_tokens: int = Form(config.CHUNK_OVERLAP_TOKENS),
+        merge_strategy: Literal["flat", "tree"] = Form("flat"),
+        reduce_fan_in: int = Form(config.REDUCE_FAN_IN),
+        reducer: Literal["rule", "llm"] = Form("rule"),
+        keep_ratio: float = Form(config.SALIENCE_KEEP_RATIO, gt=0, le=1),
+        deadline_seconds: float = Form(config.SUMMARY_DEADLINE_SECONDS),
+        job_id: Optional[str] = Form(None),
+        resumable: bool = Form(False)
 ):
     """
-    Nhận file transcript dưới dạng UploadFile, lưu tạm, gọi hàm process_transcript_file để xử lý và hợp nhất meeting minutes.
-    Các tham số chunk_size và chunk_overlap được truyền qua Form.
+    Nhận file transcript dưới dạng UploadFile, đọc nội dung vào bộ nhớ và gọi process_transcript để xử lý
+    và hợp nhất meeting minutes (không ghi file tạm).
+    Mặc định transcript được chia theo ngân sách token (chunk_tokens, chunk_overlap_tokens);
+    đặt chunk_tokens=0 để chia theo số dòng với chunk_size và chunk_overlap.
+    max_concurrency là số chunk gửi tới LLM đồng thời; requests_per_minute/tokens_per_minute (khác 0)
+    đặt hạn mức riêng cho request này thay cho hạn mức chung trong config.
+    merge_strategy='tree' hợp nhất kết quả theo cây với reduce_fan_in kết quả mỗi nhóm,
+    dùng reducer 'rule' (theo luật) hoặc 'llm'.
+    keep_ratio < 1 bật bộ lọc salience trước khi chia chunk: chỉ giữ khoảng keep_ratio số từ của transcript
+    (luôn giữ câu có ngày, tên người, từ khóa quyết định); mức giảm token được trả về trong các header X-Salience-*.
+    deadline_seconds > 0 để server tự chọn kích thước chunk, số lời gọi song song và cách hợp nhất sao cho có
+    biên bản trong khoảng thời gian này (theo độ dài transcript và độ trễ quan sát được của model), thay cho các
+    tham số chunk_*, max_concurrency (khi đó là giới hạn trên) và merge_strategy/reduce_fan_in; lịch đã chọn được trả
+    về trong các header X-Schedule-* (X-Schedule-At-Risk=1 nếu ước lượng vẫn vượt deadline).
+    Số lần hit/miss cache LLM của request được trả về trong các header X-LLM-Cache-*.
+    Nếu truyền job_id (hoặc resumable=True để server tự tạo mã, trả về trong header X-Summary-Job-Id), kết quả từng
+    chunk được lưu checkpoint theo mã đó; nếu request lỗi giữa chừng, gửi lại cùng file với job_id đó để chỉ xử lý
+    các chunk còn thiếu (số chunk được dùng lại trong header X-Checkpoint-Resumed-Chunks).
+    Không có job_id và resumable=False thì không lưu checkpoint.
     """
-    temp_file_path = f"temp_{file.filename}"
+    checkpoint = open_checkpoint(job_id) if job_id or resumable else None
     try:
-        with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        transcript = await read_upload_text(file)
 
-        merged_minutes = process_transcript_file(temp_file_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        return JSONResponse(content=merged_minutes.model_dump())
+        rate_limiter = None
+        if requests_per_minute or tokens_per_minute:
+            rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+        cache_usage = CacheUsage()
+        salience = get_salience_filter(keep_ratio)
+        scheduler = get_deadline_scheduler(deadline_seconds, max_concurrency, reducer)
+        merged_minutes = await run_in_threadpool(
+            process_transcript, transcript, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+            max_concurrency=max_concurrency, rate_limiter=rate_limiter,
+            use_cache=use_cache, cache_usage=cache_usage,
+            chunk_tokens=chunk_tokens, chunk_overlap_tokens=chunk_overlap_tokens,
+            merge_strategy=merge_strategy, reduce_fan_in=reduce_fan_in, reducer=reducer, salience=salience,
+            scheduler=scheduler, checkpoint=checkpoint
+        )
+        headers = cache_usage.to_headers()
+        if salience is not None:
+            headers.update(salience.to_headers())
+        if scheduler is not None:
+            headers.update(scheduler.plan.to_headers())
+        if checkpoint is not None:
+            headers.update(checkpoint.to_headers())
+        return JSONResponse(content=merged_minutes.model_dump(), headers=headers)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+        headers = None
+        if checkpoint is not None:
+            # Trả mã job và số chunk đã xong để client tiếp tục thay vì làm lại từ đầu
+            headers = {"X-Summary-Job-Id": checkpoint.job_id, "X-Checkpoint-Completed-Chunks": str(checkpoint.completed)}
+        raise HTTPException(status_code=500, detail=str(e), headers=headers)
 
 
+# ---------------------
+# Endpoint so sánh cách chia chunk (không gọi LLM)
+# ---------------------
+@app.post("/chunk-report", summary="Thống kê số chunk và phân bố token của transcript")
+async def chunk_report_endpoint(
+        file: UploadFile = File(...),
+        chunk_size: int = Form(7),
+        chunk_overlap: int = Form(2),
+        chunk_tokens: int = Form(config.CHUNK_MAX_TOKENS),
+        chunk_overlap_tokens: int = Form(config.CHUNK_OVERLAP_TOKENS),
+        keep_ratio: float = Form(config.SALIENCE_KEEP_RATIO, gt=0, le=1)
+):
+    """
+    Chia transcript theo số dòng và theo ngân sách token, trả về số chunk (số lời gọi LLM)
+    và phân bố token của từng cách chia để so sánh.
+    Nếu keep_ratio < 1, trả thêm thống kê của bộ lọc salience và cách chia theo token sau khi lọc.
+    """
+    try:
+        transcript = await read_upload_text(file)
+
+        line_chunks = split_transcript_by_lines(transcript, chunk_size, chunk_overlap)
+        token_chunks = await run_in_threadpool(
+            split_transcript_by_tokens, transcript, chunk_tokens, chunk_overlap_tokens
+        )
+        report = {
+            "lines": chunk_report(line_chunks),
+            "tokens": chunk_report(token_chunks)
+        }
+        salience = get_salience_filter(keep_ratio)
+        if salience is not None:
+            filtered = await run_in_threadpool(salience.apply, transcript)
+            filtered_chunks = await run_in_threadpool(
+                split_transcript_by_tokens, filtered, chunk_tokens, chunk_overlap_tokens
+            )
+            report["salience"] = salience.report()
+            report["tokens_salience"] = chunk_report(filtered_chunks)
+        return JSONResponse(content=report)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ---------------------
 # Endpoint cho tạo meeting minutes từ transcript dạng văn bản (JSON input)
 # ---------------------
@@ -147,34 +473,359 @@ async def summarize_endpoint(input_data: TranscriptInput):
     Nhận transcript của cuộc họp dưới dạng văn bản và trả về meeting minutes theo định dạng JSON.
     """
     try:
-        meeting_minutes = generate_meeting_minutes(input_data.transcript)
-        return JSONResponse(content=meeting_minutes.model_dump())
+        cache_usage = CacheUsage()
+        meeting_minutes = await run_in_threadpool(
+            generate_meeting_minutes, input_data.transcript, cache_usage=cache_usage
+        )
+        return JSONResponse(content=meeting_minutes.model_dump(), headers=cache_usage.to_headers())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ---------------------
+# Endpoint tạo meeting minutes cho nhiều transcript cùng lúc (NDJSON)
+# ---------------------
+class BatchSummarizeInput(BaseModel):
+    transcripts: List[str]
+    max_concurrency: int = config.LLM_MAX_CONCURRENCY
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    use_cache: bool = True
+    chunk_size: int = 7
+    chunk_overlap: int = 2
+    chunk_tokens: int = config.CHUNK_MAX_TOKENS
+    chunk_overlap_tokens: int = config.CHUNK_OVERLAP_TOKENS
+    merge_strategy: Literal["flat", "tree"] = "flat"
+    reduce_fan_in: int = config.REDUCE_FAN_IN
+    reducer: Literal["rule", "llm"] = "rule"
+
+
+def stream_batch_events(input_data: BatchSummarizeInput, rate_limiter: Optional[RateLimiter]):
+    """
+    Generator sinh các sự kiện NDJSON của summarize_batch:
+      - result: meeting minutes (hoặc lỗi) của một transcript, ngay khi transcript đó xong
+      - done: số transcript thành công/lỗi, hit/miss cache LLM và tổng thời gian
+    """
+    start = time.perf_counter()
+    cache_usage = CacheUsage()
+    succeeded = failed = 0
+    try:
+        for result in summarize_batch(
+                input_data.transcripts, max_concurrency=input_data.max_concurrency, rate_limiter=rate_limiter,
+                use_cache=input_data.use_cache, cache_usage=cache_usage,
+                chunk_size=input_data.chunk_size, chunk_overlap=input_data.chunk_overlap,
+                chunk_tokens=input_data.chunk_tokens, chunk_overlap_tokens=input_data.chunk_overlap_tokens,
+                merge_strategy=input_data.merge_strategy, reduce_fan_in=input_data.reduce_fan_in,
+                reducer=input_data.reducer):
+            event = {"type": "result", "index": result.index, "chunks": result.chunks, "elapsed": result.seconds}
+            if result.error is None:
+                succeeded += 1
+                event.update(status="ok", meeting_minutes=result.minutes.model_dump())
+            else:
+                failed += 1
+                event.update(status="error", detail=result.error)
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+        yield json.dumps({
+            "type": "done",
+            "transcripts": len(input_data.transcripts),
+            "succeeded": succeeded,
+            "failed": failed,
+            "cache": cache_usage.to_dict(),
+            "total_time": round(time.perf_counter() - start, 3)
+        }) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": str(e)}, ensure_ascii=False) + "\n"
+
+
+@app.post("/summarize-batch", summary="Tạo meeting minutes cho nhiều transcript (NDJSON)")
+async def summarize_batch_endpoint(input_data: BatchSummarizeInput):
+    """
+    Nhận nhiều transcript dạng văn bản và trả về meeting minutes của từng transcript dạng NDJSON.
+    Chunk của mọi transcript dùng chung một pool gọi LLM (tối đa max_concurrency lời gọi đồng thời,
+    cùng client LLM và kết nối keep-alive); mỗi transcript được trả về ngay khi xử lý xong,
+    kèm index là vị trí của nó trong danh sách đầu vào.
+    """
+    if not input_data.transcripts:
+        raise HTTPException(status_code=400, detail="Danh sách transcript rỗng.")
+    rate_limiter = None
+    if input_data.requests_per_minute or input_data.tokens_per_minute:
+        rate_limiter = RateLimiter(input_data.requests_per_minute, input_data.tokens_per_minute)
+    return StreamingResponse(
+        stream_batch_events(input_data, rate_limiter),
+        media_type="application/x-ndjson"
+    )
+
+
 # ---------------------
 # Endpoint cho xuất meeting minutes ra file DOCX
 # ---------------------
 @app.post("/export-docx", summary="Xuất biên bản cuộc họp ra file DOCX")
-async def export_docx_endpoint(meeting_minutes: MeetingMinutes, background_tasks: BackgroundTasks):
+async def export_docx_endpoint(meeting_minutes: MeetingMinutes):
     """
     Nhận thông tin biên bản cuộc họp dưới dạng JSON (MeetingMinutes),
     xử lý và xuất ra file DOCX theo định dạng hành chính Việt Nam.
-    Sau khi trả về file, file tạm sẽ được xóa trong background.
+    File DOCX được tạo trong bộ nhớ và trả về dạng luồng, không ghi file tạm.
     """
     try:
-        temp_docx = "temp_meeting_minutes.docx"
-        export_meeting_minutes_to_docx(meeting_minutes, temp_docx)
-        background_tasks.add_task(remove_file, temp_docx)
-        return FileResponse(
-            path=temp_docx,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            filename="meeting_minutes.docx"
+        content = await run_in_threadpool(export_meeting_minutes_to_docx_bytes, meeting_minutes)
+        return StreamingResponse(
+            io.BytesIO(content),
+            media_type=DOCX_MEDIA_TYPE,
+            headers=attachment_headers("meeting_minutes.docx")
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def build_docx_bundle(minutes_list: List[MeetingMinutes]) -> bytes:
+    """Xuất nhiều biên bản bằng template dùng chung và đóng gói vào một file ZIP trong bộ nhớ."""
+    buffer = io.BytesIO()
+    # File DOCX đã được nén sẵn nên chỉ lưu (không nén lại) trong file ZIP
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for i, content in enumerate(export_meeting_minutes_bulk(minutes_list), start=1):
+            archive.writestr(f"meeting_minutes_{i}.docx", content)
+    return buffer.getvalue()
+
+
+@app.post("/export-docx-bulk", summary="Xuất nhiều biên bản cuộc họp ra các file DOCX (đóng gói ZIP)")
+async def export_docx_bulk_endpoint(minutes_list: List[MeetingMinutes]):
+    """
+    Nhận danh sách biên bản (MeetingMinutes), xuất từng biên bản ra DOCX bằng template biên dịch sẵn
+    và trả về một file ZIP gồm meeting_minutes_1.docx, meeting_minutes_2.docx, ... theo thứ tự đầu vào.
+    """
+    if not minutes_list:
+        raise HTTPException(status_code=400, detail="Danh sách biên bản rỗng.")
+    try:
+        content = await run_in_threadpool(build_docx_bundle, minutes_list)
+        return StreamingResponse(
+            io.BytesIO(content),
+            media_type="application/zip",
+            headers=attachment_headers("meeting_minutes.zip")
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ---------------------
+# Job chạy nền: submit, trạng thái, kết quả, hủy
+# ---------------------
+def submit_job(kind: str, fn, *args, pool: str = JobManager.POOL_LLM, cleanup=None, extra: Optional[dict] = None):
+    try:
+        job = get_job_manager().submit(kind, fn, *args, pool=pool, cleanup=cleanup)
+    except QueueFullError as e:
+        if cleanup is not None:
+            cleanup()
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={**job.to_dict(), **(extra or {})})
+
+
+@app.post("/jobs/transcribe", summary="Tạo job chuyển đổi audio thành transcript")
+async def submit_transcribe_job(audio: UploadFile = File(...)):
+    """
+    Nhận file audio và đưa vào pool process Whisper. Trả về job_id ngay lập tức (HTTP 202).
+    """
+    audio_path = await run_in_threadpool(save_upload_to_temp, audio)
+    return submit_job("transcribe", run_transcription_job, audio_path,
+                      pool=JobManager.POOL_WHISPER, cleanup=lambda: remove_upload(audio_path))
+
+
+@app.post("/jobs/summarize-file", summary="Tạo job tạo meeting minutes từ file transcript")
+async def submit_summarize_file_job(
+        file: UploadFile = File(...),
+        chunk_size: int = Form(7),
+        chunk_overlap: int = Form(2),
+        max_concurrency: int = Form(config.LLM_MAX_CONCURRENCY),
+        chunk_tokens: int = Form(config.CHUNK_MAX_TOKENS),
+        chunk_overlap_tokens: int = Form(config.CHUNK_OVERLAP_TOKENS),
+        keep_ratio: float = Form(config.SALIENCE_KEEP_RATIO, gt=0, le=1),
+        deadline_seconds: float = Form(config.SUMMARY_DEADLINE_SECONDS),
+        checkpoint_id: Optional[str] = Form(None),
+        resumable: bool = Form(False)
+):
+    """
+    Nhận file transcript và đưa vào pool thread LLM. Trả về job_id ngay lập tức (HTTP 202).
+    Nếu truyền checkpoint_id (hoặc resumable=True để server tự tạo mã, trả về trong trường checkpoint_id), kết quả
+    từng chunk được lưu checkpoint; nếu job lỗi, tạo job mới cùng file với checkpoint_id đó để chỉ xử lý các chunk
+    còn thiếu (xem tiến độ qua GET /checkpoints/{checkpoint_id}).
+    """
+    transcript = await read_upload_text(file)
+    if resumable and not checkpoint_id:
+        checkpoint_id = uuid.uuid4().hex
+    return submit_job("summarize-file", run_summarize_file_job, transcript, chunk_size, chunk_overlap, max_concurrency,
+                      chunk_tokens, chunk_overlap_tokens, keep_ratio, deadline_seconds, checkpoint_id,
+                      extra={"checkpoint_id": checkpoint_id} if checkpoint_id else None)
+
+
+@app.post("/jobs/summarize", summary="Tạo job tạo meeting minutes từ transcript dạng văn bản")
+async def submit_summarize_job(input_data: TranscriptInput):
+    """
+    Nhận transcript dạng văn bản và đưa vào pool thread LLM. Trả về job_id ngay lập tức (HTTP 202).
+    """
+    return submit_job("summarize", run_summarize_job, input_data.transcript)
+
+
+@app.post("/jobs/transcribe-two-pass", summary="Transcribe hai lượt: bản nháp ngay, bản cuối chạy nền")
+async def submit_two_pass_job(audio: UploadFile = File(...), summarize: bool = Form(True)):
+    """
+    Transcribe nhanh bằng model nháp (WHISPER_DRAFT_MODEL_SIZE, giải mã tham lam) và trả về transcript nháp
+    (kèm biên bản nháp nếu summarize=True), đồng thời tạo job chạy lượt cuối bằng model đã cấu hình (HTTP 202).
+    Mọi bước chạy qua JobManager (hàng đợi giới hạn, HTTP 429 khi đầy): lượt nháp và lượt cuối trong pool process
+    Whisper (giới hạn JOB_WHISPER_WORKERS), biên bản nháp và bản cập nhật trong pool LLM; request chờ bản nháp.
+    Chỉ các chunk có nội dung khác bản nháp được gửi lại tới LLM.
+    """
+    audio_path = await run_in_threadpool(save_upload_to_temp, audio)
+    manager = get_job_manager()
+    try:
+        audio_hash = await run_in_threadpool(hash_audio_file, audio_path)
+        draft_job = manager.submit("transcribe-two-pass-draft", run_transcription_job, audio_path,
+                                   config.WHISPER_DRAFT_MODEL_SIZE, config.WHISPER_DRAFT_BEAM_SIZE, audio_hash,
+                                   pool=JobManager.POOL_WHISPER)
+        draft = await asyncio.wrap_future(draft_job.future)
+        summarizer = None
+        draft_minutes = None
+        if summarize:
+            summarizer = IncrementalSummarizer(chunk_tokens=config.CHUNK_MAX_TOKENS,
+                                               chunk_overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+                                               max_concurrency=config.LLM_MAX_CONCURRENCY)
+            summarize_job = manager.submit("summarize-two-pass-draft", summarizer.summarize,
+                                           SegmentStore.from_segments(draft["transcript"]))
+            draft_minutes = await asyncio.wrap_future(summarize_job.future)
+        # Audio đã được giải mã và cache (PCM) ở lượt nháp, worker Whisper dùng lại theo audio_hash
+        job = manager.submit_then(
+            "transcribe-two-pass", run_transcription_job, audio_path, config.WHISPER_MODEL_SIZE,
+            config.WHISPER_BEAM_SIZE, audio_hash, then=partial(run_two_pass_final_job, summarizer=summarizer),
+            cleanup=lambda: remove_upload(audio_path)
+        )
+    except QueueFullError as e:
+        remove_upload(audio_path)
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        remove_upload(audio_path)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return JSONResponse(status_code=202, content={
+        "draft": {
+            "stage": "draft",
+            **draft,
+            "meeting_minutes": draft_minutes.model_dump() if draft_minutes is not None else None
+        },
+        "job": job.to_dict()
+    })
+
+
+@app.get("/jobs/{job_id}", summary="Trạng thái job")
+async def job_status_endpoint(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job.")
+    return JSONResponse(content=job.to_dict())
+
+
+@app.get("/jobs/{job_id}/result", summary="Kết quả job")
+async def job_result_endpoint(job_id: str):
+    """
+    Trả về kết quả job đã hoàn thành. Job chưa xong trả về HTTP 202 kèm trạng thái,
+    job lỗi trả về HTTP 500, job đã hủy trả về HTTP 410.
+    """
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job.")
+    status = job.status
+    if status == JobStatus.SUCCEEDED:
+        return JSONResponse(content=manager.result(job_id))
+    if status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+    if status == JobStatus.CANCELLED:
+        raise HTTPException(status_code=410, detail="Job đã bị hủy.")
+    return JSONResponse(status_code=202, content=job.to_dict())
+
+
+@app.delete("/jobs/{job_id}", summary="Hủy job")
+async def cancel_job_endpoint(job_id: str):
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy job.")
+    return JSONResponse(content=job.to_dict())
+
+
+# ---------------------
+# Phiên họp trực tiếp: gửi audio theo từng phần, biên bản được cập nhật liên tục
+# ---------------------
+def get_live_session_or_404(session_id: str):
+    session = live_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Không tìm thấy phiên họp.")
+    return session
+
+
+@app.post("/live/sessions", summary="Tạo phiên họp trực tiếp")
+async def create_live_session(
+        chunk_tokens: int = Form(config.CHUNK_MAX_TOKENS),
+        chunk_overlap_tokens: int = Form(config.CHUNK_OVERLAP_TOKENS),
+        max_concurrency: int = Form(config.LLM_MAX_CONCURRENCY)
+):
+    """
+    Tạo phiên họp mới. Audio được gửi dần qua /live/sessions/{session_id}/audio.
+    """
+    try:
+        session = live_sessions.create(max_tokens=chunk_tokens, overlap_tokens=chunk_overlap_tokens,
+                                       max_concurrency=max_concurrency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(status_code=201, content=session.status())
+
+
+@app.post("/live/sessions/{session_id}/audio", summary="Gửi thêm audio cho phiên họp trực tiếp")
+async def append_live_audio(session_id: str, audio: UploadFile = File(...)):
+    """
+    Nhận phần audio mới, chỉ transcribe phần này và tóm tắt các chunk vừa hoàn thành,
+    trả về trạng thái phiên cùng biên bản hiện tại.
+    """
+    session = get_live_session_or_404(session_id)
+    audio_path = await run_in_threadpool(save_upload_to_temp, audio)
+    try:
+        status = await run_in_threadpool(session.append_audio, audio_path)
+        return JSONResponse(content=status)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        remove_upload(audio_path)
+
+
+@app.get("/live/sessions/{session_id}", summary="Trạng thái và biên bản hiện tại của phiên họp")
+async def live_session_status(session_id: str):
+    return JSONResponse(content=get_live_session_or_404(session_id).status())
+
+
+@app.post("/live/sessions/{session_id}/finish", summary="Kết thúc phiên họp và lấy biên bản cuối cùng")
+async def finish_live_session(session_id: str):
+    """
+    Tóm tắt phần transcript còn lại và trả về biên bản cuối cùng của phiên họp.
+    """
+    session = get_live_session_or_404(session_id)
+    try:
+        minutes = await run_in_threadpool(session.finish)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if minutes is None:
+        raise HTTPException(status_code=422, detail="Phiên họp không có nội dung transcript nào.")
+    return JSONResponse(content=minutes.model_dump())
+
+
+@app.delete("/live/sessions/{session_id}", summary="Xóa phiên họp trực tiếp")
+async def delete_live_session(session_id: str):
+    if not live_sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy phiên họp.")
+    return {"session_id": session_id, "deleted": True}
+
+@app.get("/health", summary="Kiểm tra trạng thái API")
+async def health_endpoint():
+    return {"status": "ok", "jobs": get_job_manager().stats()}
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
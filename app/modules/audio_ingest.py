@@ -0,0 +1,211 @@
+import gc
+import itertools
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, BinaryIO, Optional, Union
+
+from app import config
+from app.modules.metrics import CACHE_LOOKUPS, span
+from app.modules.transcript_cache import hash_audio_file, hash_audio_stream
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SAMPLING_RATE = 16000
+# Số sample gom lại trước mỗi lần resample (giống faster_whisper.audio.decode_audio)
+_GROUP_SAMPLES = 500000
+
+
+def _decoded_frames(container):
+    """Các frame audio của luồng đầu tiên, bỏ qua frame lỗi và gom thành khối lớn để resample."""
+    import av
+
+    fifo = av.audio.fifo.AudioFifo()
+    frames = container.decode(audio=0)
+    while True:
+        try:
+            frame = next(frames)
+        except StopIteration:
+            break
+        except av.error.InvalidDataError:
+            continue
+        frame.pts = None  # bỏ qua kiểm tra timestamp
+        fifo.write(frame)
+        if fifo.samples >= _GROUP_SAMPLES:
+            yield fifo.read()
+    if fifo.samples > 0:
+        yield fifo.read()
+
+
+def decode_to_pcm(source: Union[str, BinaryIO], output: BinaryIO) -> int:
+    """
+    Giải mã audio (mp3, m4a, wav...) theo luồng thành PCM float32 16 kHz mono và ghi lần lượt vào output,
+    không giữ toàn bộ audio trong bộ nhớ. Giá trị sample giống hệt faster_whisper.audio.decode_audio.
+
+    Args:
+        source: Đường dẫn hoặc file object (ví dụ file upload) chứa audio.
+        output: File object nhị phân để ghi PCM (float32 little-endian).
+
+    Returns:
+        int: Số sample đã ghi.
+    """
+    import av
+    import numpy as np
+
+    resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=SAMPLING_RATE)
+    samples = 0
+    with av.open(source, mode="r", metadata_errors="ignore") as container:
+        # Thêm None vào cuối để lấy phần còn lại trong resampler
+        for group in itertools.chain(_decoded_frames(container), [None]):
+            for frame in resampler.resample(group):
+                pcm = frame.to_ndarray().reshape(-1).astype("<f4") / np.float32(32768.0)
+                output.write(pcm.tobytes())
+                samples += len(pcm)
+    # Giải phóng các object của resampler (xem faster-whisper issue #390)
+    del resampler
+    gc.collect()
+    return samples
+
+
+class PcmCache:
+    """
+    Lưu audio đã giải mã (PCM float32 16 kHz mono) trên đĩa theo hash nội dung file audio, mỗi khóa một file.
+    Khi đọc, file được memory-map (chỉ đọc) nên Whisper, VAD và các worker song song dùng chung dữ liệu
+    qua page cache mà không phải giải mã hay sao chép lại. File hết hạn sau ttl giây kể từ lần dùng cuối
+    và tổng dung lượng bị giới hạn bởi max_bytes (file lâu không dùng nhất bị xóa trước).
+    """
+
+    SUFFIX = ".f32"
+
+    def __init__(self, directory: str, max_bytes: int = 4 * 1024 * 1024 * 1024, ttl: int = 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._decode_locks = {}
+
+    def path(self, audio_hash: str) -> str:
+        return os.path.join(self.directory, f"{audio_hash}{self.SUFFIX}")
+
+    def get(self, audio_hash: str) -> Optional["np.ndarray"]:
+        """Trả về PCM đã giải mã (np.memmap chỉ đọc) hoặc None nếu chưa có."""
+        import numpy as np
+
+        path = self.path(audio_hash)
+        try:
+            if os.path.getsize(path) == 0:
+                return np.zeros(0, dtype=np.float32)
+            audio = np.memmap(path, dtype="<f4", mode="r")
+            os.utime(path)  # đánh dấu vừa được dùng để phục vụ TTL/LRU
+        except FileNotFoundError:
+            return None
+        return audio
+
+    def load(self, source: Union[str, BinaryIO], audio_hash: str) -> "np.ndarray":
+        """
+        Trả về PCM của audio: đọc từ cache, hoặc giải mã source một lần vào cache rồi memory-map.
+        Các lời gọi đồng thời cho cùng một audio chỉ giải mã một lần.
+        """
+        audio = self.get(audio_hash)
+        CACHE_LOOKUPS.inc(cache="pcm", result="hit" if audio is not None else "miss")
+        if audio is not None:
+            return audio
+
+        with self._lock:
+            decode_lock = self._decode_locks.setdefault(audio_hash, threading.Lock())
+        try:
+            with decode_lock:
+                audio = self.get(audio_hash)
+                if audio is not None:
+                    return audio
+                path = self.path(audio_hash)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                try:
+                    with span("audio_decode"), open(temp_path, "wb") as f:
+                        decode_to_pcm(source, f)
+                    os.replace(temp_path, path)  # ghi nguyên tử, không để lại file hỏng khi lỗi giữa chừng
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                self._evict(keep=path)
+                return self.get(audio_hash)
+        finally:
+            with self._lock:
+                self._decode_locks.pop(audio_hash, None)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        with self._lock:
+            now = time.time()
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for mtime, size, path in sorted(entries):
+                if path == keep or (total <= self.max_bytes and now - mtime <= self.ttl):
+                    continue
+                try:
+                    # Trên Linux, các memmap đang mở vẫn đọc được sau khi file bị xóa
+                    os.remove(path)
+                except (FileNotFoundError, PermissionError):
+                    continue
+                total -= size
+
+    def stats(self) -> dict:
+        files = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(self.SUFFIX)]
+        sizes = [os.path.getsize(p) for p in files if os.path.exists(p)]
+        return {
+            "entries": len(sizes),
+            "bytes": sum(sizes),
+            "audio_seconds": round(sum(sizes) / 4 / SAMPLING_RATE, 1),
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl
+        }
+
+
+_cache: Optional[PcmCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_pcm_cache() -> Optional[PcmCache]:
+    """Trả về cache PCM dùng chung theo config, hoặc None nếu cache bị tắt."""
+    global _cache
+    if not config.PCM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = PcmCache(config.PCM_CACHE_DIR, config.PCM_CACHE_MAX_BYTES, config.PCM_CACHE_TTL)
+        return _cache
+
+
+def load_audio(source: Union[str, BinaryIO], audio_hash: Optional[str] = None) -> "np.ndarray":
+    """
+    Trả về audio PCM float32 16 kHz mono để đưa thẳng vào Whisper/VAD.
+    Nếu cache PCM bật, audio chỉ được giải mã một lần cho mỗi hash nội dung và kết quả là np.memmap
+    dùng chung giữa các lần transcribe (thử lại, tham số khác, các shard song song); nếu tắt,
+    audio được giải mã vào bộ nhớ.
+
+    Args:
+        source: Đường dẫn hoặc file object chứa audio.
+        audio_hash (str): SHA-256 của file audio nếu đã tính sẵn.
+
+    Returns:
+        np.ndarray: Mảng float32 các sample.
+    """
+    cache = get_pcm_cache()
+    if cache is None:
+        from faster_whisper.audio import decode_audio
+
+        with span("audio_decode"):
+            return decode_audio(source, sampling_rate=SAMPLING_RATE)
+    if audio_hash is None:
+        audio_hash = hash_audio_file(source) if isinstance(source, str) else hash_audio_stream(source)
+    return cache.load(source, audio_hash)
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from app import config
+from app.modules.schema import MeetingMinutes
+
+
+def chunk_key(chunk: str) -> str:
+    """Khóa checkpoint của một chunk: SHA-256 của nội dung chunk."""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Lưu kết quả trích xuất của từng chunk theo job (SQLite trên đĩa) ngay khi chunk hoàn thành, để một lần
+    thử lại/tiếp tục cùng job chỉ phải xử lý các chunk còn thiếu rồi hợp nhất.
+    Khác với cache LLM (dùng chung, khóa theo prompt/model, có thể tắt hoặc bị xóa khi đầy), checkpoint thuộc về
+    một job, được giữ cho tới khi job hoàn thành (hoặc hết hạn sau ttl_seconds) và lưu kèm metadata của job
+    (ví dụ lịch chia chunk) để lần tiếp tục chia transcript giống hệt lần đầu.
+    Nhiều lần chạy có thể dùng chung một job_id (ví dụ cùng một file audio): store đếm số lần chạy đang giữ job
+    (trong process) để một lần chạy xong không xóa checkpoint mà lần chạy khác vẫn đang dùng.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._holders: Dict[str, int] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_checkpoints ("
+            " job_id TEXT NOT NULL,"
+            " chunk_key TEXT NOT NULL,"
+            " chunk_index INTEGER NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (job_id, chunk_key))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_meta ("
+            " job_id TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (job_id, name))"
+        )
+        self._expire(time.time())
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds:
+            cutoff = now - self.ttl_seconds
+            self._conn.execute("DELETE FROM chunk_checkpoints WHERE created_at < ?", (cutoff,))
+            self._conn.execute("DELETE FROM job_meta WHERE created_at < ?", (cutoff,))
+
+    def get(self, job_id: str, chunk: str) -> Optional[str]:
+        """Kết quả đã lưu (chuỗi JSON) của chunk trong job, hoặc None."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM chunk_checkpoints WHERE job_id = ? AND chunk_key = ?",
+                                     (job_id, chunk_key(chunk))).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, job_id: str, chunk_index: int, chunk: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_checkpoints (job_id, chunk_key, chunk_index, value, created_at)"
+                " VALUES (?, ?, ?, ?, ?)", (job_id, chunk_key(chunk), chunk_index, value, time.time())
+            )
+
+    def get_meta(self, job_id: str, name: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM job_meta WHERE job_id = ? AND name = ?",
+                                     (job_id, name)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_meta(self, job_id: str, name: str, value: dict) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO job_meta (job_id, name, value, created_at) VALUES (?, ?, ?, ?)",
+                               (job_id, name, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def count(self, job_id: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunk_checkpoints WHERE job_id = ?",
+                                      (job_id,)).fetchone()[0]
+
+    def hold(self, job_id: str) -> None:
+        """Đánh dấu một lần chạy đang dùng checkpoint của job."""
+        with self._lock:
+            self._holders[job_id] = self._holders.get(job_id, 0) + 1
+
+    def release(self, job_id: str) -> None:
+        with self._lock:
+            remaining = self._holders.get(job_id, 0) - 1
+            if remaining > 0:
+                self._holders[job_id] = remaining
+            else:
+                self._holders.pop(job_id, None)
+
+    def holders(self, job_id: str) -> int:
+        """Số lần chạy đang dùng checkpoint của job."""
+        with self._lock:
+            return self._holders.get(job_id, 0)
+
+    def clear(self, job_id: str) -> None:
+        """Xóa checkpoint và metadata của job (sau khi job hoàn thành)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM chunk_checkpoints WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM job_meta WHERE job_id = ?", (job_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.time())
+            jobs, chunks = self._conn.execute(
+                "SELECT COUNT(DISTINCT job_id), COUNT(*) FROM chunk_checkpoints").fetchone()
+        return {"jobs": jobs, "chunks": chunks, "ttl_seconds": self.ttl_seconds}
+
+
+class JobCheckpoint:
+    """
+    Checkpoint của một job: tra/lưu MeetingMinutes của từng chunk và đếm số chunk được dùng lại (thread-safe).
+
+    Args:
+        store (CheckpointStore): Nơi lưu checkpoint.
+        job_id (str): Mã job; dùng lại cùng job_id để tiếp tục job bị lỗi.
+    """
+
+    def __init__(self, store: CheckpointStore, job_id: str):
+        self.store = store
+        self.job_id = job_id
+        self.resumed = 0
+        self.saved = 0
+        self._held = False
+        self._lock = threading.Lock()
+
+    def get(self, chunk: str) -> Optional[MeetingMinutes]:
+        value = self.store.get(self.job_id, chunk)
+        if value is None:
+            return None
+        try:
+            minutes = MeetingMinutes.model_validate_json(value)
+        except ValueError:
+            # Schema đã thay đổi: coi như chưa có, chunk sẽ được xử lý lại
+            return None
+        with self._lock:
+            self.resumed += 1
+        return minutes
+
+    def save(self, chunk_index: int, chunk: str, minutes: MeetingMinutes) -> None:
+        self.store.set(self.job_id, chunk_index, chunk, minutes.model_dump_json())
+        with self._lock:
+            self.saved += 1
+
+    def get_meta(self, name: str) -> Optional[dict]:
+        return self.store.get_meta(self.job_id, name)
+
+    def set_meta(self, name: str, value: dict) -> None:
+        self.store.set_meta(self.job_id, name, value)
+
+    @property
+    def completed(self) -> int:
+        """Số chunk của job đã có checkpoint."""
+        return self.store.count(self.job_id)
+
+    def acquire(self) -> None:
+        """Bắt đầu một lần chạy dùng checkpoint (gọi release khi xong, kể cả khi lỗi)."""
+        with self._lock:
+            if not self._held:
+                self._held = True
+                self.store.hold(self.job_id)
+
+    def release(self) -> None:
+        with self._lock:
+            if self._held:
+                self._held = False
+                self.store.release(self.job_id)
+
+    def clear(self) -> bool:
+        """
+        Xóa checkpoint của job sau khi hoàn thành, trừ khi một lần chạy khác cùng job_id vẫn đang giữ nó
+        (lần chạy đó sẽ xóa khi xong). Trả về True nếu đã xóa.
+        """
+        if self.store.holders(self.job_id) > (1 if self._held else 0):
+            return False
+        self.store.clear(self.job_id)
+        return True
+
+    def to_headers(self) -> dict:
+        return {
+            "X-Summary-Job-Id": self.job_id,
+            "X-Checkpoint-Resumed-Chunks": str(self.resumed)
+        }
+
+
+_store: Optional[CheckpointStore] = None
+_store_lock = threading.Lock()
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """Trả về kho checkpoint dùng chung theo config, hoặc None nếu checkpoint bị tắt."""
+    global _store
+    if not config.CHECKPOINT_ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = CheckpointStore(config.CHECKPOINT_PATH, config.CHECKPOINT_TTL)
+        return _store
+
+
+def open_checkpoint(job_id: Optional[str] = None) -> Optional[JobCheckpoint]:
+    """
+    Mở checkpoint của job_id (tạo mã mới nếu không có), hoặc None nếu checkpoint bị tắt.
+    """
+    store = get_checkpoint_store()
+    if store is None:
+        return None
+    return JobCheckpoint(store, job_id or uuid.uuid4().hex)
@@ -0,0 +1,117 @@
+from statistics import mean
+from typing import List
+
+from app.modules.segment_store import SegmentStore
+from app.modules.tokenizer import count_tokens
+from app.config import LLM_MODEL_NAME
+
+
+def split_transcript_by_tokens(text: str, max_tokens: int = 1500, overlap_tokens: int = 150,
+                               model_name: str = LLM_MODEL_NAME) -> List[str]:
+    """
+    Chia transcript thành các chunk theo ngân sách token thay vì theo số dòng.
+    Mỗi dòng (một đoạn Whisper) được giữ nguyên và gom vào chunk cho tới khi đạt max_tokens;
+    chỉ những dòng dài hơn ngân sách mới bị cắt tiếp theo câu/từ.
+
+    Args:
+        text (str): Toàn bộ transcript, mỗi đoạn trên một dòng.
+        max_tokens (int): Số token tối đa của mỗi chunk.
+        overlap_tokens (int): Số token chồng lấn giữa hai chunk liên tiếp.
+        model_name (str): Tên model dùng để đếm token.
+
+    Returns:
+        List[str]: Danh sách các chunk.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens phải nhỏ hơn max_tokens.")
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        separators=["\n", ". ", ", ", " ", ""],
+        chunk_size=max_tokens,
+        chunk_overlap=overlap_tokens,
+        length_function=lambda t: count_tokens(t, model_name),
+        keep_separator=True
+    )
+    return [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+
+
+def split_segments_by_tokens(segments: SegmentStore, max_tokens: int = 1500, overlap_tokens: int = 150,
+                             model_name: str = LLM_MODEL_NAME) -> List[SegmentStore]:
+    """
+    Chia transcript dạng SegmentStore thành các chunk theo ngân sách token, cắt tại ranh giới đoạn Whisper.
+    Mỗi chunk là một view của store (không sao chép), nên vẫn biết khoảng thời gian của chunk
+    (start_time, end_time) và có thể lấy văn bản bằng to_text(). Số token của mỗi đoạn chỉ được đếm một lần.
+    Một đoạn dài hơn max_tokens được giữ nguyên trong một chunk riêng.
+
+    Args:
+        segments (SegmentStore): Transcript theo từng đoạn.
+        max_tokens (int): Số token tối đa của mỗi chunk.
+        overlap_tokens (int): Số token chồng lấn (tính theo các đoạn cuối của chunk trước) giữa hai chunk liên tiếp.
+        model_name (str): Tên model dùng để đếm token.
+
+    Returns:
+        List[SegmentStore]: Danh sách các chunk theo thứ tự thời gian.
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens phải nhỏ hơn max_tokens.")
+
+    line_tokens = [count_tokens(segments.text(i), model_name) + 1 for i in range(len(segments))]  # +1 cho '\n'
+    chunks = []
+    start = 0
+    while start < len(line_tokens):
+        end, total = start, 0
+        while end < len(line_tokens) and (end == start or total + line_tokens[end] <= max_tokens):
+            total += line_tokens[end]
+            end += 1
+        chunks.append(segments[start:end])
+        if end == len(line_tokens):
+            break
+        # Lùi lại một số đoạn để chunk kế tiếp chồng lấn khoảng overlap_tokens token
+        next_start, overlap = end, 0
+        while next_start - 1 > start and overlap + line_tokens[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            overlap += line_tokens[next_start]
+        start = next_start
+    return chunks
+
+
+def read_transcript_in_token_chunks(file_path: str, max_tokens: int = 1500, overlap_tokens: int = 150) -> List[str]:
+    """
+    Đọc file transcript và chia thành các chunk theo ngân sách token (xem split_transcript_by_tokens).
+
+    Args:
+        file_path (str): Đường dẫn tới file transcript.
+        max_tokens (int): Số token tối đa của mỗi chunk.
+        overlap_tokens (int): Số token chồng lấn giữa hai chunk liên tiếp.
+
+    Returns:
+        List[str]: Danh sách các chunk.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return split_transcript_by_tokens(text, max_tokens, overlap_tokens)
+
+
+def chunk_report(chunks: List[str], model_name: str = LLM_MODEL_NAME) -> dict:
+    """
+    Thống kê số chunk và phân bố số token của các chunk (min, trung bình, p50, p95, max).
+    Số chunk chính là số lời gọi LLM cần thực hiện.
+    """
+    tokens = sorted(count_tokens(chunk, model_name) for chunk in chunks)
+    if not tokens:
+        return {"chunks": 0, "total_tokens": 0}
+
+    def percentile(p: float) -> int:
+        return tokens[min(len(tokens) - 1, int(round(p * (len(tokens) - 1))))]
+
+    return {
+        "chunks": len(tokens),
+        "total_tokens": sum(tokens),
+        "min_tokens": tokens[0],
+        "mean_tokens": round(mean(tokens), 1),
+        "p50_tokens": percentile(0.5),
+        "p95_tokens": percentile(0.95),
+        "max_tokens": tokens[-1]
+    }
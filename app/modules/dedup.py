@@ -0,0 +1,190 @@
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app import config
+
+_WORD = re.compile(r"\w+")
+_NUMBER = re.compile(r"\w*\d\w*")
+# Bảng bỏ các dấu kết hợp (U+0300..U+036F) sau khi tách dấu bằng NFD, kèm đ -> d
+_STRIP_MARKS = {**dict.fromkeys(range(0x300, 0x370)), ord("đ"): "d"}
+
+# Hệ số của các hàm băm (a * x + b) mod p dùng cho MinHash (tất định giữa các lần chạy)
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_text(text: str) -> str:
+    """
+    Chuẩn hóa một câu để so sánh gần trùng: bỏ dấu tiếng Việt (kể cả đ -> d), chữ thường,
+    bỏ dấu câu và gộp khoảng trắng.
+    """
+    text = unicodedata.normalize("NFD", text.lower()).translate(_STRIP_MARKS)
+    return " ".join(_WORD.findall(text))
+
+
+def shingles(normalized: str) -> FrozenSet[str]:
+    """Tập shingle của câu đã chuẩn hóa: các từ đơn và các cặp từ liền nhau."""
+    words = normalized.split()
+    return frozenset(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def guard_tokens(text: str, guard_words: FrozenSet[str]) -> FrozenSet[str]:
+    """
+    Các từ mang nghĩa của câu (đã chuẩn hóa như normalize_text): từ phủ định/đổi chiều trong guard_words
+    (so khớp trên chữ thường còn dấu), tên riêng (từ viết hoa không đứng đầu câu) và con số.
+    """
+    tokens = set()
+    for i, word in enumerate(_WORD.findall(unicodedata.normalize("NFC", text))):
+        if word.lower() in guard_words or (i and word[0].isupper()) or _NUMBER.fullmatch(word):
+            tokens.add(normalize_text(word))
+    return frozenset(tokens)
+
+
+def compatible(a_words: Counter, a_guard: FrozenSet[str], b_words: Counter, b_guard: FrozenSet[str]) -> bool:
+    """
+    Hai câu chỉ được gộp nếu mỗi từ mang nghĩa của câu này xuất hiện cùng số lần trong câu kia
+    (ví dụ 'phê duyệt' / 'không phê duyệt', 'tăng' / 'giảm', 'anh An' / 'anh Bình' không bao giờ bị gộp).
+    """
+    return all(a_words[token] == b_words[token] for token in a_guard | b_guard)
+
+
+class NearDuplicateIndex:
+    """
+    Chỉ mục phát hiện câu gần trùng (diễn đạt lại, khác dấu, khác khoảng trắng) trong thời gian gần tuyến tính:
+    mỗi câu được băm MinHash và chia thành các band (LSH), chỉ các câu chung ít nhất một band mới được
+    so sánh Jaccard chính xác trên tập shingle. Câu có số (ngày, số lượng, phần trăm...), tên riêng
+    hoặc từ phủ định/đổi chiều (guard_words) khác nhau không bao giờ bị coi là trùng, dù Jaccard cao.
+
+    Args:
+        threshold (float): Ngưỡng Jaccard (0..1) để coi hai câu là gần trùng.
+        num_perm (int): Số hàm băm MinHash.
+        bands (int): Số band LSH (num_perm phải chia hết cho bands).
+        guard_words (Iterable[str]): Các từ phủ định/đổi chiều (mặc định MERGE_DEDUP_GUARD_WORDS).
+    """
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 64, bands: int = 16,
+                 guard_words: Optional[Iterable[str]] = None):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands.")
+        import numpy as np
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self._rows = num_perm // bands
+        rng = np.random.default_rng(1)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        # Câu đại diện (câu xuất hiện đầu tiên) của mỗi nhóm gần trùng
+        self._items: List[str] = []
+        self._shingles: List[FrozenSet[str]] = []
+        self._words: List[Counter] = []
+        self._guards: List[FrozenSet[str]] = []
+        self.guard_words = frozenset(word.lower() for word in (
+            config.MERGE_DEDUP_GUARD_WORDS if guard_words is None else guard_words))
+        self._exact: Dict[str, int] = {}
+        self._raw: Dict[str, int] = {}
+        self._word_hashes: Dict[str, int] = {}
+        # Khóa bucket gồm các số trong câu và một band chữ ký, nên chỉ các câu có cùng số mới là ứng viên
+        self._buckets: List[Dict[Tuple[Tuple[str, ...], bytes], List[int]]] = [{} for _ in range(bands)]
+        self._np = np
+        self.comparisons = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _signature(self, words: List[str]):
+        np = self._np
+        word_hashes = self._word_hashes
+        for word in words:
+            if word not in word_hashes:
+                word_hashes[word] = zlib.crc32(word.encode("utf-8"))
+        hashes = np.fromiter((word_hashes[w] for w in words), dtype=np.uint64, count=len(words))
+        if not len(hashes):
+            hashes = np.zeros(1, dtype=np.uint64)
+        # Băm các cặp từ liền nhau từ băm của từng từ (trùng lặp không ảnh hưởng tới MinHash)
+        pairs = (hashes[:-1] * np.uint64(1000003) ^ hashes[1:]) & np.uint64(0xFFFFFFFF)
+        hashes = np.concatenate((hashes, pairs))
+        return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME).min(axis=0)
+
+    def _band_keys(self, signature, numbers: Tuple[str, ...]) -> List[Tuple[Tuple[str, ...], bytes]]:
+        data = signature.tobytes()
+        size = len(data) // self.bands
+        return [(numbers, data[i * size:(i + 1) * size]) for i in range(self.bands)]
+
+    def canonical(self, text: str) -> str:
+        """
+        Trả về câu đại diện của nhóm gần trùng chứa text; nếu chưa có nhóm nào, text trở thành đại diện mới.
+        """
+        found = self._raw.get(text)
+        if found is not None:
+            return self._items[found]
+        normalized = normalize_text(text)
+        found = self._exact.get(normalized)
+        if found is not None:
+            self._raw[text] = found
+            return self._items[found]
+
+        words = normalized.split()
+        shingle_set = shingles(normalized)
+        numbers = tuple(sorted(_NUMBER.findall(normalized)))
+        keys = self._band_keys(self._signature(words), numbers)
+        word_counts = Counter(words)
+        guard = guard_tokens(text, self.guard_words)
+        match = self._find(keys, shingle_set, word_counts, guard)
+        if match is not None:
+            self._exact[normalized] = self._raw[text] = match
+            return self._items[match]
+
+        idx = len(self._items)
+        self._items.append(text)
+        self._shingles.append(shingle_set)
+        self._words.append(word_counts)
+        self._guards.append(guard)
+        self._exact[normalized] = self._raw[text] = idx
+        for band, key in zip(self._buckets, keys):
+            band.setdefault(key, []).append(idx)
+        return text
+
+    def _find(self, keys: list, shingle_set: FrozenSet[str], word_counts: Counter,
+              guard: FrozenSet[str]) -> Optional[int]:
+        seen = set()
+        best, best_score = None, 0.0
+        for band, key in zip(self._buckets, keys):
+            for idx in band.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                self.comparisons += 1
+                score = jaccard(shingle_set, self._shingles[idx])
+                if score < self.threshold or not compatible(word_counts, guard, self._words[idx], self._guards[idx]):
+                    continue
+                if best is None or score > best_score or (score == best_score and idx < best):
+                    best, best_score = idx, score
+        return best
+
+    def add(self, text: str) -> bool:
+        """Thêm text vào chỉ mục, trả về True nếu text là câu mới (không gần trùng câu nào đã có)."""
+        count = len(self._items)
+        self.canonical(text)
+        return len(self._items) > count
+
+    def items(self) -> List[str]:
+        """Danh sách câu đại diện theo thứ tự xuất hiện."""
+        return list(self._items)
+
+
+def dedupe(values: List[str], threshold: float = 0.7) -> List[str]:
+    """Loại các phần tử gần trùng, giữ phần tử xuất hiện đầu tiên của mỗi nhóm."""
+    index = NearDuplicateIndex(threshold)
+    for value in values:
+        index.canonical(value)
+    return index.items()
@@ -1,23 +1,34 @@
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
 from inspect import signature
+from typing import BinaryIO, Iterable, List, Optional, Union
+from xml.sax.saxutils import escape
 
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from app import config
 from app.modules.schema import MeetingMinutes
-from docx.shared import Pt, Cm
-import os
+from app.modules.metrics import span
 
+# Đoạn văn đánh dấu vị trí chèn nội dung biên bản trong template
+BODY_MARKER = "{{NOI_DUNG_BIEN_BAN}}"
+DOCUMENT_PART = "word/document.xml"
 
-def export_meeting_minutes_to_docx(meeting_minutes: MeetingMinutes, output_file: str) -> None:
-    """
-    Xuất meeting minutes thành file DOCX với định dạng chuẩn văn bản hành chính Việt Nam,
-    mô phỏng layout như biểu mẫu (có phần tiêu ngữ, số hiệu, chữ ký, ...).
+# Tiền tố thư mục tạm chứa file DOCX của từng lần chạy giao diện
+OUTPUT_DIR_PREFIX = "mmg_"
+
+# Ký tự điều khiển không hợp lệ trong XML
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
 
-    Args:
-        meeting_minutes (MeetingMinutes): Object chứa thông tin biên bản cuộc họp.
-        output_file (str): Đường dẫn file DOCX đầu ra.
-    """
-    document = Document()
+
+def _add_header(document) -> None:
+    """Thêm phần header (tên cơ quan, tiêu ngữ, số hiệu) và tiêu đề chính vào tài liệu."""
+    from docx.shared import Pt, Cm
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
 
     # Thiết lập font mặc định (Times New Roman, size 13)
     style = document.styles['Normal']
@@ -77,6 +88,34 @@ def export_meeting_minutes_to_docx(meeting_minutes: MeetingMinutes, output_file:
     run_title.font.size = Pt(16)
     run_title.bold = True
 
+
+def _add_signature(document) -> None:
+    """Thêm bảng chữ ký (Chủ trì - Thư ký) vào cuối tài liệu."""
+    from docx.shared import Pt, Cm
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    # -------- PHẦN CHỮ KÝ --------
+    # Tạo bảng 2 cột cho chữ ký (Chủ trì - Thư ký)
+    signature_table = document.add_table(rows=1, cols=2)
+    signature_table.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    signature_table.columns[0].width = Cm(8)
+    signature_table.columns[1].width = Cm(8)
+
+    cell_left = signature_table.cell(0, 0).paragraphs[0]
+    cell_left.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run_left = cell_left.add_run("CHỦ TRÌ\n\n\n\n\n(Ký, ghi rõ họ tên)")
+    run_left.font.name = "Times New Roman"
+    run_left.font.size = Pt(13)
+
+    cell_right = signature_table.cell(0, 1).paragraphs[0]
+    cell_right.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run_right = cell_right.add_run("THƯ KÝ\n\n\n\n\n(Ký, ghi rõ họ tên)")
+    run_right.font.name = "Times New Roman"
+    run_right.font.size = Pt(13)
+
+
+def _add_body(document, meeting_minutes: MeetingMinutes) -> None:
+    """Thêm phần nội dung biên bản bằng python-docx (cách dựng tài liệu động, xem export_meeting_minutes_to_docx_dynamic)."""
     # -------- NỘI DUNG BIÊN BẢN --------
     document.add_paragraph("")
 
@@ -174,29 +213,294 @@ def export_meeting_minutes_to_docx(meeting_minutes: MeetingMinutes, output_file:
     document.add_paragraph("")
 
 
-    # -------- PHẦN CHỮ KÝ --------
-    # Tạo bảng 2 cột cho chữ ký (Chủ trì - Thư ký)
-    signature_table = document.add_table(rows=1, cols=2)
-    signature_table.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    signature_table.columns[0].width = Cm(8)
-    signature_table.columns[1].width = Cm(8)
-
-    cell_left = signature_table.cell(0, 0).paragraphs[0]
-    cell_left.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run_left = cell_left.add_run("CHỦ TRÌ\n\n\n\n\n(Ký, ghi rõ họ tên)")
-    run_left.font.name = "Times New Roman"
-    run_left.font.size = Pt(13)
+def export_meeting_minutes_to_docx_dynamic(meeting_minutes: MeetingMinutes,
+                                           output_file: Union[str, BinaryIO]) -> None:
+    """
+    Dựng toàn bộ tài liệu bằng python-docx ở mỗi lần gọi (cách xuất trước khi có template).
+    Dùng làm tham chiếu để kiểm tra và benchmark DocxTemplate.
 
-    cell_right = signature_table.cell(0, 1).paragraphs[0]
-    cell_right.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run_right = cell_right.add_run("THƯ KÝ\n\n\n\n\n(Ký, ghi rõ họ tên)")
-    run_right.font.name = "Times New Roman"
-    run_right.font.size = Pt(13)
+    Args:
+        meeting_minutes (MeetingMinutes): Object chứa thông tin biên bản cuộc họp.
+        output_file (str | BinaryIO): Đường dẫn file DOCX đầu ra hoặc buffer (ví dụ io.BytesIO).
+    """
+    from docx import Document
 
-    # Lưu file DOCX
+    document = Document()
+    _add_header(document)
+    _add_body(document, meeting_minutes)
+    _add_signature(document)
     document.save(output_file)
 
 
+def build_docx_skeleton() -> bytes:
+    """
+    Dựng phần khung tĩnh của biên bản (lề trang, header tiêu ngữ, tiêu đề, bảng chữ ký) bằng python-docx,
+    với một đoạn văn BODY_MARKER đánh dấu vị trí chèn nội dung.
+
+    Returns:
+        bytes: Nội dung file DOCX khung.
+    """
+    from docx import Document
+
+    document = Document()
+    _add_header(document)
+    document.add_paragraph(BODY_MARKER)
+    _add_signature(document)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _run_xml(text: str, bold: bool = False) -> str:
+    text = _INVALID_XML_CHARS.sub("", text)
+    parts = []
+    for i, line in enumerate(text.split("\n")):
+        if i:
+            parts.append("<w:br/>")
+        for j, chunk in enumerate(line.split("\t")):
+            if j:
+                parts.append("<w:tab/>")
+            if chunk:
+                parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    props = "<w:rPr><w:b/></w:rPr>" if bold else ""
+    return f"<w:r>{props}{''.join(parts)}</w:r>"
+
+
+class DocxTemplate:
+    """
+    Template DOCX biên dịch sẵn: phần khung tĩnh (header, tiêu đề, chữ ký, styles, ...) chỉ được dựng/nạp
+    và nén một lần; mỗi tài liệu chỉ sinh XML cho phần nội dung, chèn vào vị trí BODY_MARKER
+    và ghi thêm word/document.xml vào bản sao của file zip đã nén sẵn.
+
+    Args:
+        skeleton (bytes): File DOCX khung chứa một đoạn văn BODY_MARKER (mặc định: build_docx_skeleton()).
+    """
+
+    STYLE_NAMES = ("List Paragraph", "List Bullet", "List Bullet 2")
+
+    def __init__(self, skeleton: Optional[bytes] = None):
+        from docx import Document
+
+        skeleton = skeleton if skeleton is not None else build_docx_skeleton()
+        # Tra style id một lần (python-docx tra theo tên ở mỗi đoạn văn, rất chậm)
+        styles = Document(io.BytesIO(skeleton)).styles
+        self.style_ids = {name: styles[name].style_id for name in self.STYLE_NAMES}
+
+        static = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(skeleton)) as source, \
+                zipfile.ZipFile(static, "w", zipfile.ZIP_DEFLATED) as target:
+            document_xml = source.read(DOCUMENT_PART).decode("utf-8")
+            for item in source.infolist():
+                if item.filename != DOCUMENT_PART:
+                    target.writestr(item, source.read(item.filename))
+        self._static_zip = static.getvalue()
+        self._prefix, self._suffix = self._split_at_marker(document_xml)
+
+    @staticmethod
+    def _split_at_marker(document_xml: str) -> tuple:
+        marker = document_xml.find(BODY_MARKER)
+        if marker < 0:
+            raise ValueError(f"Template DOCX không có đoạn văn đánh dấu {BODY_MARKER}.")
+        start = max(m.start() for m in re.finditer(r"<w:p[ >/]", document_xml[:marker]))
+        end = document_xml.index("</w:p>", marker) + len("</w:p>")
+        return document_xml[:start], document_xml[end:]
+
+    def _paragraph(self, *runs: str, style: Optional[str] = None) -> str:
+        props = f'<w:pPr><w:pStyle w:val="{self.style_ids[style]}"/></w:pPr>' if style else ""
+        if not props and not runs:
+            return "<w:p/>"
+        return f"<w:p>{props}{''.join(runs)}</w:p>"
+
+    def render_body(self, meeting_minutes: MeetingMinutes) -> str:
+        """Sinh XML phần nội dung biên bản (cùng bố cục với _add_body)."""
+        p = self._paragraph
+        m = meeting_minutes
+        out = [p()]
+        if m.gio_hop:
+            out.append(p(_run_xml("Thời gian bắt đầu: ", True), _run_xml(m.gio_hop)))
+        if m.dia_diem:
+            out.append(p(_run_xml("Địa điểm: ", True), _run_xml(m.dia_diem)))
+        out.append(p())
+        out.append(p(_run_xml("Thành phần cuộc họp: ", True), style="List Paragraph"))
+        if m.chu_tri:
+            out.append(p(_run_xml(f"-Chủ trì: {m.chu_tri}"), style="List Bullet"))
+        if m.nguoi_ghi_chep:
+            out.append(p(_run_xml(f"-Thư kí: {m.nguoi_ghi_chep}"), style="List Bullet"))
+        if m.thanh_vien_tham_du:
+            out.append(p(_run_xml("- Các thành viên tham dự: " + ", ".join(m.thanh_vien_tham_du)),
+                         style="List Bullet"))
+        if m.muc_tieu_cuoc_hop:
+            out.append(p(_run_xml("Nội dung, mục tiêu cuộc họp: ", True), _run_xml(m.muc_tieu_cuoc_hop)))
+        out.append(p())
+        if m.chuong_trinh_nghi_su:
+            out.append(p(_run_xml("Chương trình nghị sự: ", True)))
+            out.extend(p(_run_xml(item), style="List Bullet") for item in m.chuong_trinh_nghi_su)
+            out.append(p())
+        if m.noi_dung_thao_luan:
+            out.append(p(_run_xml("Nội dung thảo luận: ", True)))
+            for topic, points in m.noi_dung_thao_luan.items():
+                out.append(p(_run_xml(topic), style="List Bullet"))
+                out.extend(p(_run_xml(point), style="List Bullet 2") for point in points)
+        out.append(p())
+        if m.cac_quyet_dinh:
+            out.append(p(_run_xml("Các quyết định:", True)))
+            out.extend(p(_run_xml(decision), style="List Bullet") for decision in m.cac_quyet_dinh)
+        out.append(p())
+        if m.ket_luan:
+            out.append(p(_run_xml("Kết luận: ", True), _run_xml(m.ket_luan)))
+        out.append(p())
+        if m.tai_lieu_dinh_kem:
+            out.append(p(_run_xml("Tài liệu đính kèm: ", True)))
+            out.extend(p(_run_xml(item), style="List Bullet") for item in m.tai_lieu_dinh_kem)
+        else:
+            out.append(p(_run_xml("Tài liệu đính kèm: Không có")))
+        out.append(p())
+        if m.ghi_chu:
+            out.append(p(_run_xml("Ghi chú: ", True), _run_xml(m.ghi_chu)))
+        else:
+            out.append(p(_run_xml("Ghi chú: Không có")))
+        out.append(p())
+        return "".join(out)
+
+    def render(self, meeting_minutes: MeetingMinutes) -> bytes:
+        """Tạo file DOCX (bytes) cho một biên bản."""
+        document_xml = self._prefix + self.render_body(meeting_minutes) + self._suffix
+        buffer = io.BytesIO(self._static_zip)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(DOCUMENT_PART, document_xml.encode("utf-8"))
+        return buffer.getvalue()
+
+
+_template: Optional[DocxTemplate] = None
+_template_lock = threading.Lock()
+
+
+def get_docx_template() -> DocxTemplate:
+    """
+    Template dùng chung của process, dựng (hoặc nạp từ DOCX_TEMPLATE_PATH) ở lần xuất đầu tiên.
+    """
+    global _template
+    with _template_lock:
+        if _template is None:
+            skeleton = None
+            if config.DOCX_TEMPLATE_PATH:
+                with open(config.DOCX_TEMPLATE_PATH, "rb") as f:
+                    skeleton = f.read()
+            _template = DocxTemplate(skeleton)
+        return _template
+
+
+def export_meeting_minutes_to_docx(meeting_minutes: MeetingMinutes, output_file: Union[str, BinaryIO]) -> None:
+    """
+    Xuất meeting minutes thành file DOCX với định dạng chuẩn văn bản hành chính Việt Nam,
+    mô phỏng layout như biểu mẫu (có phần tiêu ngữ, số hiệu, chữ ký, ...).
+    Phần khung tĩnh lấy từ template biên dịch sẵn (get_docx_template), chỉ phần nội dung được sinh mới.
+
+    Args:
+        meeting_minutes (MeetingMinutes): Object chứa thông tin biên bản cuộc họp.
+        output_file (str | BinaryIO): Đường dẫn file DOCX đầu ra hoặc buffer (ví dụ io.BytesIO).
+    """
+    with span("docx_build"):
+        content = get_docx_template().render(meeting_minutes)
+    with span("docx_save"):
+        if isinstance(output_file, str):
+            with open(output_file, "wb") as f:
+                f.write(content)
+        else:
+            output_file.write(content)
+
+
+def export_meeting_minutes_to_docx_bytes(meeting_minutes: MeetingMinutes) -> bytes:
+    """
+    Xuất meeting minutes thành file DOCX trong bộ nhớ (không ghi ra đĩa).
+
+    Args:
+        meeting_minutes (MeetingMinutes): Object chứa thông tin biên bản cuộc họp.
+
+    Returns:
+        bytes: Nội dung file DOCX.
+    """
+    with span("docx_build"):
+        return get_docx_template().render(meeting_minutes)
+
+
+def remove_stale_output_dirs(ttl: Optional[int] = None) -> int:
+    """
+    Xóa các thư mục tạm của lần chạy trước (tiền tố OUTPUT_DIR_PREFIX trong config.TEMP_DIR) cũ hơn ttl giây.
+
+    Args:
+        ttl (int): Tuổi tối đa tính theo thời điểm sửa đổi (mặc định config.OUTPUT_DIR_TTL).
+
+    Returns:
+        int: Số thư mục đã xóa.
+    """
+    ttl = config.OUTPUT_DIR_TTL if ttl is None else ttl
+    root = config.TEMP_DIR or tempfile.gettempdir()
+    cutoff = time.time() - ttl
+    removed = 0
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(OUTPUT_DIR_PREFIX):
+            continue
+        try:
+            if not entry.is_dir(follow_symlinks=False) or entry.stat().st_mtime > cutoff:
+                continue
+            shutil.rmtree(entry.path)
+            removed += 1
+        except OSError:
+            # Thư mục đang được lần chạy khác dùng hoặc đã bị xóa
+            continue
+    return removed
+
+
+def export_to_temp_docx(meeting_minutes: MeetingMinutes, file_name: str = "meeting_minutes.docx") -> str:
+    """
+    Xuất meeting minutes ra file DOCX trong thư mục tạm riêng của lần chạy và trả về đường dẫn.
+    Mỗi lần gọi dọn các thư mục của lần chạy trước đã quá config.OUTPUT_DIR_TTL giây.
+
+    Args:
+        meeting_minutes (MeetingMinutes): Object chứa thông tin biên bản cuộc họp.
+        file_name (str): Tên file DOCX trong thư mục tạm.
+
+    Returns:
+        str: Đường dẫn file DOCX được tạo ra.
+    """
+    remove_stale_output_dirs()
+    output_docx = os.path.join(tempfile.mkdtemp(prefix=OUTPUT_DIR_PREFIX, dir=config.TEMP_DIR), file_name)
+    export_meeting_minutes_to_docx(meeting_minutes, output_docx)
+    return output_docx
+
+
+def export_meeting_minutes_bulk(minutes_list: Iterable[MeetingMinutes],
+                                output_dir: Optional[str] = None) -> List[Union[bytes, str]]:
+    """
+    Xuất nhiều biên bản với cùng một template.
+
+    Args:
+        minutes_list (Iterable[MeetingMinutes]): Các biên bản cần xuất.
+        output_dir (str): Nếu có, mỗi biên bản được ghi ra output_dir/meeting_minutes_<i>.docx.
+
+    Returns:
+        List[bytes | str]: Nội dung các file DOCX, hoặc đường dẫn các file nếu có output_dir.
+    """
+    template = get_docx_template()
+    results = []
+    with span("docx_bulk"):
+        for i, meeting_minutes in enumerate(minutes_list, start=1):
+            content = template.render(meeting_minutes)
+            if output_dir is None:
+                results.append(content)
+                continue
+            path = os.path.join(output_dir, f"meeting_minutes_{i}.docx")
+            with open(path, "wb") as f:
+                f.write(content)
+            results.append(path)
+    return results
+
+
 # --- Phần test chạy độc lập ---
 if __name__ == "__main__":
     # Giả sử bạn có một đối tượng MeetingMinutes mẫu
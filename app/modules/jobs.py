@@ -0,0 +1,367 @@
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from app import config
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class QueueFullError(Exception):
+    """Hàng đợi job đã đầy, client cần thử lại sau."""
+
+
+@dataclass
+class Job:
+    """Thông tin một job chạy nền (transcribe hoặc summarize)."""
+    id: str
+    kind: str
+    future: Future
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+    # Bước đầu của job nhiều bước (xem JobManager.submit_then); future chỉ chạy sau khi bước này xong
+    upstream: Optional[Future] = None
+
+    @property
+    def status(self) -> str:
+        if self.future.cancelled() or (self.cancel_requested and self.future.done()):
+            return JobStatus.CANCELLED
+        if self.future.done():
+            return JobStatus.FAILED if self.future.exception() is not None else JobStatus.SUCCEEDED
+        if self.future.running() or (self.upstream is not None and self.upstream.running()):
+            return JobStatus.RUNNING
+        return JobStatus.PENDING
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.status == JobStatus.FAILED:
+            return str(self.future.exception())
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+
+
+def _init_whisper_worker() -> None:
+    """Nạp sẵn model Whisper trong mỗi process worker."""
+    if config.WHISPER_WARMUP_ON_STARTUP:
+        from app.modules.model_registry import get_model_registry
+        get_model_registry().warm_up(config.WHISPER_MODEL_SIZE, config.WHISPER_DEVICE, config.WHISPER_COMPUTE_TYPE)
+
+
+class JobManager:
+    """
+    Quản lý các job chạy nền với hai pool worker có giới hạn:
+      - Pool process cho Whisper (CPU-bound, không giữ GIL của process API).
+      - Pool thread cho các lời gọi LLM (I/O-bound).
+    Số job đang chờ/chạy bị giới hạn bởi max_queue_depth; vượt quá sẽ raise QueueFullError.
+    """
+
+    POOL_WHISPER = "whisper"
+    POOL_LLM = "llm"
+
+    def __init__(self, whisper_workers: int = 1, llm_workers: int = 4,
+                 max_queue_depth: int = 16, result_ttl: float = 3600):
+        self.max_queue_depth = max_queue_depth
+        self.result_ttl = result_ttl
+        self._whisper_workers = whisper_workers
+        self._whisper_pool: Optional[ProcessPoolExecutor] = None
+        self._llm_pool = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="llm-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _get_pool(self, pool: str):
+        if pool == self.POOL_LLM:
+            return self._llm_pool
+        if pool == self.POOL_WHISPER:
+            if self._whisper_pool is None:
+                # Dùng "spawn" để worker không kế thừa thread/model của process API
+                self._whisper_pool = ProcessPoolExecutor(
+                    max_workers=self._whisper_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_whisper_worker
+                )
+            return self._whisper_pool
+        raise ValueError(f"Pool '{pool}' không hợp lệ.")
+
+    def _active_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.future.done())
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, fn: Callable, *args, pool: str = POOL_LLM,
+               cleanup: Optional[Callable[[], None]] = None, **kwargs) -> Job:
+        """
+        Đưa một tác vụ vào pool tương ứng và trả về Job để theo dõi.
+
+        Args:
+            kind (str): Loại job (ví dụ: 'transcribe', 'summarize-file').
+            fn (Callable): Hàm thực thi. Với pool Whisper, hàm và tham số phải pickle được.
+            pool (str): 'whisper' hoặc 'llm'.
+            cleanup (Callable): Hàm dọn dẹp (ví dụ: xóa file tạm) gọi khi job kết thúc.
+
+        Returns:
+            Job: Job vừa được tạo.
+
+        Raises:
+            QueueFullError: Nếu số job đang chờ/chạy đã đạt max_queue_depth.
+        """
+        with self._lock:
+            self._purge_expired()
+            if self._active_count() >= self.max_queue_depth:
+                raise QueueFullError("Hàng đợi job đã đầy, vui lòng thử lại sau.")
+            future = self._get_pool(pool).submit(fn, *args, **kwargs)
+            job = Job(id=uuid.uuid4().hex, kind=kind, future=future)
+            self._jobs[job.id] = job
+
+        def _on_done(_future: Future) -> None:
+            job.finished_at = time.time()
+            if cleanup is not None:
+                cleanup()
+
+        future.add_done_callback(_on_done)
+        return job
+
+    def submit_then(self, kind: str, fn: Callable, *args, then: Callable[[object], object],
+                    pool: str = POOL_WHISPER, then_pool: str = POOL_LLM,
+                    cleanup: Optional[Callable[[], None]] = None, **kwargs) -> Job:
+        """
+        Job hai bước: chạy fn trong pool, rồi chạy then(kết quả của fn) trong then_pool; kết quả của job là kết quả
+        của then. Ví dụ transcribe trong pool Whisper (process) rồi tóm tắt trong pool LLM (thread), để mỗi bước
+        chịu đúng giới hạn worker của pool tương ứng.
+
+        Args:
+            kind (str): Loại job.
+            fn (Callable): Bước đầu. Với pool Whisper, hàm và tham số phải pickle được.
+            then (Callable): Bước sau, nhận kết quả của fn.
+            pool (str): Pool của bước đầu.
+            then_pool (str): Pool của bước sau.
+            cleanup (Callable): Hàm dọn dẹp gọi khi bước đầu kết thúc (bước sau chỉ dùng kết quả của fn).
+
+        Returns:
+            Job: Job vừa được tạo.
+
+        Raises:
+            QueueFullError: Nếu số job đang chờ/chạy đã đạt max_queue_depth.
+        """
+        with self._lock:
+            self._purge_expired()
+            if self._active_count() >= self.max_queue_depth:
+                raise QueueFullError("Hàng đợi job đã đầy, vui lòng thử lại sau.")
+            first = self._get_pool(pool).submit(fn, *args, **kwargs)
+            future = Future()
+            job = Job(id=uuid.uuid4().hex, kind=kind, future=future, upstream=first)
+            self._jobs[job.id] = job
+
+        def _forward(source: Future) -> None:
+            if source.cancelled():
+                future.set_exception(CancelledError())
+            elif source.exception() is not None:
+                future.set_exception(source.exception())
+            else:
+                future.set_result(source.result())
+
+        def _on_first_done(_first: Future) -> None:
+            if cleanup is not None:
+                cleanup()
+            # Job đã bị hủy khi bước đầu còn chờ: không chạy bước sau
+            if not future.set_running_or_notify_cancel():
+                return
+            if _first.cancelled() or _first.exception() is not None or job.cancel_requested:
+                _forward(_first)
+                return
+            try:
+                second = self._get_pool(then_pool).submit(then, _first.result())
+            except RuntimeError as e:
+                # Pool đã bị tắt (shutdown)
+                future.set_exception(e)
+                return
+            second.add_done_callback(_forward)
+
+        def _on_done(_future: Future) -> None:
+            job.finished_at = time.time()
+            if _future.cancelled():
+                first.cancel()
+
+        future.add_done_callback(_on_done)
+        first.add_done_callback(_on_first_done)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Hủy job. Job đang chờ sẽ bị hủy ngay; job đang chạy sẽ được đánh dấu hủy
+        và kết quả bị bỏ qua khi chạy xong.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+        upstream_running = job.upstream is not None and job.upstream.running()
+        if (upstream_running or not job.future.cancel()) and not job.future.done():
+            job.cancel_requested = True
+        return job
+
+    def result(self, job_id: str):
+        """Trả về kết quả của job đã hoàn thành thành công."""
+        job = self.get(job_id)
+        if job is None or job.status != JobStatus.SUCCEEDED:
+            return None
+        return job.future.result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return {
+                "max_queue_depth": self.max_queue_depth,
+                "active": self._active_count(),
+                "jobs": counts
+            }
+
+    def shutdown(self) -> None:
+        self._llm_pool.shutdown(wait=False, cancel_futures=True)
+        if self._whisper_pool is not None:
+            self._whisper_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Trả về JobManager dùng chung, khởi tạo theo config ở lần gọi đầu tiên."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager(
+                whisper_workers=config.JOB_WHISPER_WORKERS,
+                llm_workers=config.JOB_LLM_WORKERS,
+                max_queue_depth=config.JOB_MAX_QUEUE_DEPTH,
+                result_ttl=config.JOB_RESULT_TTL
+            )
+        return _manager
+
+
+def shutdown_job_manager() -> None:
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.shutdown()
+            _manager = None
+
+
+# ---------------------
+# Các tác vụ chạy trong worker
+# ---------------------
+def run_transcription_job(audio_path: str, model_size: Optional[str] = None, beam_size: Optional[int] = None,
+                          audio_hash: Optional[str] = None) -> dict:
+    """
+    Tác vụ transcribe chạy trong process worker, trả về kết quả dạng JSON.
+    model_size/beam_size mặc định theo config; audio_hash (nếu đã tính) để dùng lại cache PCM/transcript.
+    """
+    from app.modules.preprocessing import transcribe_audio
+
+    segments, info = transcribe_audio(
+        input_audio=audio_path,
+        model_size=model_size or config.WHISPER_MODEL_SIZE,
+        device=config.WHISPER_DEVICE,
+        compute_type=config.WHISPER_COMPUTE_TYPE,
+        beam_size=beam_size or config.WHISPER_BEAM_SIZE,
+        vad_filter=config.WHISPER_USE_VAD,
+        audio_hash=audio_hash,
+        # Job đã chạy trong một process của pool Whisper (JOB_WHISPER_WORKERS) với model đã nạp sẵn:
+        # không tạo thêm pool shard lồng bên trong (mỗi shard sẽ nạp model riêng)
+        num_workers=1
+    )
+    return {
+        "transcript": segments.to_list(),
+        "info": {
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "filtered": getattr(info, "filtered", None)
+        }
+    }
+
+
+def run_two_pass_final_job(final: dict, summarizer=None) -> dict:
+    """
+    Bước sau của transcribe hai lượt, chạy trong thread worker: nhận transcript cuối (kết quả của
+    run_transcription_job trong pool Whisper) và cập nhật biên bản bằng IncrementalSummarizer của bản nháp
+    (chỉ gửi lại tới LLM các chunk có nội dung thay đổi).
+    """
+    from app.modules.segment_store import SegmentStore
+
+    result = {"stage": "final", **final}
+    if summarizer is not None:
+        segments = SegmentStore.from_segments(final["transcript"])
+        result["meeting_minutes"] = summarizer.summarize(segments).model_dump()
+        result["chunks"] = summarizer.chunk_count
+        result["chunks_resummarized"] = summarizer.chunks_summarized
+    return result
+
+
+def run_summarize_file_job(transcript: str, chunk_size: int, chunk_overlap: int, max_concurrency: int = 1,
+                           chunk_tokens: int = 0, chunk_overlap_tokens: int = 0,
+                           keep_ratio: Optional[float] = None, deadline_seconds: Optional[float] = None,
+                           checkpoint_id: Optional[str] = None) -> dict:
+    """
+    Tác vụ tạo meeting minutes từ nội dung file transcript (đã đọc vào bộ nhớ), chạy trong thread worker.
+    Với checkpoint_id, kết quả từng chunk được lưu checkpoint để job sau cùng checkpoint_id tiếp tục nếu job này lỗi.
+    """
+    from app.modules.checkpoint import open_checkpoint
+    from app.modules.salience import get_salience_filter
+    from app.modules.scheduler import get_deadline_scheduler
+    from app.modules.summarizer import process_transcript
+
+    return process_transcript(
+        transcript, chunk_size=chunk_size, chunk_overlap=chunk_overlap, max_concurrency=max_concurrency,
+        chunk_tokens=chunk_tokens, chunk_overlap_tokens=chunk_overlap_tokens,
+        salience=get_salience_filter(keep_ratio),
+        scheduler=get_deadline_scheduler(deadline_seconds, max_concurrency),
+        checkpoint=open_checkpoint(checkpoint_id) if checkpoint_id else None
+    ).model_dump()
+
+
+def run_summarize_job(transcript: str) -> dict:
+    """Tác vụ tạo meeting minutes từ transcript dạng văn bản, chạy trong thread worker."""
+    from app.modules.summarizer import generate_meeting_minutes
+
+    return generate_meeting_minutes(transcript).model_dump()
+
+
+def remove_path(path: str) -> None:
+    """Xóa file hoặc thư mục tạm (bỏ qua nếu không tồn tại)."""
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
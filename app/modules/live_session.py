@@ -0,0 +1,183 @@
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from app import config
+from app.modules.preprocessing import transcribe_audio
+from app.modules.schema import MeetingMinutes
+from app.modules.segment_store import SegmentStore
+from app.modules.summarizer import MeetingMinutesAccumulator, summarize_chunks
+from app.modules.tokenizer import count_tokens
+
+
+class LiveMeetingSession:
+    """
+    Phiên họp trực tiếp: nhận audio theo từng phần trong lúc họp và cập nhật biên bản liên tục.
+
+    - Mỗi lần append_audio() chỉ transcribe phần audio mới; timestamp được dịch theo tổng thời lượng đã nhận.
+    - Các dòng transcript được gom thành chunk theo ngân sách token; chỉ những chunk vừa đủ
+      ngân sách mới được gửi tới LLM, kết quả được cộng dồn vào trạng thái hợp nhất của phiên.
+    - finish() xử lý phần transcript còn lại, nên biên bản cuối cùng có ngay sau khi cuộc họp kết thúc.
+    - status()/minutes() trả về bản chụp trạng thái được tạo trong lock ở cuối mỗi lần cập nhật,
+      nên đọc trạng thái không phải chờ một append_audio() đang chạy.
+    """
+
+    def __init__(self, session_id: str, max_tokens: int = 1500, overlap_tokens: int = 150,
+                 max_concurrency: int = 1):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens phải nhỏ hơn max_tokens.")
+        self.session_id = session_id
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_concurrency = max_concurrency
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.audio_seconds = 0.0
+        self.segments = SegmentStore()
+        self.finished = False
+        self._line_tokens: List[int] = []
+        self._next_line = 0  # dòng đầu tiên của chunk kế tiếp
+        self._covered_until = 0  # các dòng trước chỉ số này đã được gửi tới LLM
+        self._chunks_summarized = 0
+        self._accumulator = MeetingMinutesAccumulator()
+        self._lock = threading.Lock()
+        self._minutes: Optional[MeetingMinutes] = None
+        self._status = self._snapshot()
+
+    def _take_ready_chunks(self, final: bool) -> List[str]:
+        """Tách các chunk đã đủ ngân sách token (hoặc phần còn lại nếu final=True)."""
+        chunks = []
+        while self._next_line < len(self.segments):
+            start = self._next_line
+            end = start
+            total = 0
+            while end < len(self.segments) and (end == start or total + self._line_tokens[end] <= self.max_tokens):
+                total += self._line_tokens[end]
+                end += 1
+            if end == len(self.segments) and not final:
+                # Chunk chưa đủ ngân sách: chờ thêm audio
+                break
+            if end <= self._covered_until:
+                break
+            chunks.append(self.segments[start:end].to_text())
+            self._covered_until = end
+            if end == len(self.segments):
+                self._next_line = end
+                break
+            # Lùi lại một số dòng để chunk kế tiếp chồng lấn khoảng overlap_tokens token
+            next_line = end
+            overlap = 0
+            while next_line - 1 > start and overlap + self._line_tokens[next_line - 1] <= self.overlap_tokens:
+                next_line -= 1
+                overlap += self._line_tokens[next_line]
+            self._next_line = next_line
+        return chunks
+
+    def _summarize(self, chunks: List[str]) -> None:
+        if not chunks:
+            return
+        for minutes in summarize_chunks(chunks, max_concurrency=self.max_concurrency):
+            self._accumulator.add(minutes)
+        self._chunks_summarized += len(chunks)
+
+    def append_audio(self, audio_path: str) -> dict:
+        """
+        Transcribe một phần audio mới, nối vào transcript của phiên và tóm tắt các chunk vừa hoàn thành.
+
+        Args:
+            audio_path (str): Đường dẫn tới file audio của phần mới.
+
+        Returns:
+            dict: Trạng thái phiên sau khi cập nhật.
+        """
+        with self._lock:
+            if self.finished:
+                raise ValueError("Phiên họp đã kết thúc.")
+            segments, info = transcribe_audio(
+                input_audio=audio_path,
+                model_size=config.WHISPER_MODEL_SIZE,
+                device=config.WHISPER_DEVICE,
+                compute_type=config.WHISPER_COMPUTE_TYPE,
+                beam_size=config.WHISPER_BEAM_SIZE,
+                vad_filter=config.WHISPER_USE_VAD
+            )
+            offset = self.audio_seconds
+            for seg in segments:
+                if not seg["text"]:
+                    continue
+                self.segments.append(seg["start"] + offset, seg["end"] + offset, seg["text"])
+                self._line_tokens.append(count_tokens(seg["text"]) + 1)  # +1 cho ký tự xuống dòng
+            duration = getattr(info, "duration", None)
+            if duration is None:
+                duration = segments.end_time or 0.0
+            self.audio_seconds += duration
+
+            self._summarize(self._take_ready_chunks(final=False))
+            self.updated_at = time.time()
+            self._publish()
+            return self._status
+
+    def finish(self) -> MeetingMinutes:
+        """Tóm tắt phần transcript còn lại, đóng phiên và trả về biên bản cuối cùng."""
+        with self._lock:
+            if not self.finished:
+                self._summarize(self._take_ready_chunks(final=True))
+                self.finished = True
+                self.updated_at = time.time()
+                self._publish()
+            return self._minutes
+
+    def _publish(self) -> None:
+        """Tạo bản chụp biên bản và trạng thái hiện tại; chỉ gọi khi đang giữ self._lock."""
+        self._minutes = self._accumulator.result() if self._accumulator.count else None
+        self._status = self._snapshot()
+
+    def _snapshot(self) -> dict:
+        minutes = self._minutes
+        return {
+            "session_id": self.session_id,
+            "finished": self.finished,
+            "audio_seconds": round(self.audio_seconds, 2),
+            "segments": len(self.segments),
+            "chunks_summarized": self._chunks_summarized,
+            "pending_segments": len(self.segments) - self._covered_until,
+            "meeting_minutes": minutes.model_dump() if minutes is not None else None
+        }
+
+    def minutes(self) -> Optional[MeetingMinutes]:
+        """Biên bản tại lần cập nhật gần nhất (None nếu chưa có chunk nào được tóm tắt)."""
+        return self._minutes
+
+    def status(self) -> dict:
+        """Trạng thái phiên tại lần cập nhật gần nhất."""
+        return self._status
+
+
+class LiveSessionManager:
+    """Quản lý các phiên họp trực tiếp; phiên không hoạt động quá session_ttl giây sẽ bị xóa."""
+
+    def __init__(self, session_ttl: float = 4 * 3600):
+        self.session_ttl = session_ttl
+        self._sessions: Dict[str, LiveMeetingSession] = {}
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs) -> LiveMeetingSession:
+        with self._lock:
+            now = time.time()
+            for session_id in [sid for sid, s in self._sessions.items() if now - s.updated_at > self.session_ttl]:
+                del self._sessions[session_id]
+            session = LiveMeetingSession(uuid.uuid4().hex, **kwargs)
+            self._sessions[session.session_id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[LiveMeetingSession]:
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+live_sessions = LiveSessionManager(session_ttl=config.LIVE_SESSION_TTL)
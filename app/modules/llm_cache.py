@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app import config
+
+
+def make_cache_key(*parts: str) -> str:
+    """Tạo khóa cache (SHA-256) từ các thành phần: nội dung chunk, prompt, tên model, phiên bản schema."""
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        # Ghi độ dài trước mỗi phần để ("ab", "c") và ("a", "bc") cho ra khóa khác nhau
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def schema_version(model_cls) -> str:
+    """Phiên bản schema: hash của JSON schema, thay đổi khi các trường của model thay đổi."""
+    schema = json.dumps(model_cls.model_json_schema(), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+class CacheUsage:
+    """Đếm số lần hit/miss cache trong phạm vi một request (thread-safe)."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": round(self.hit_rate, 4)}
+
+    def to_headers(self) -> dict:
+        return {
+            "X-LLM-Cache-Hits": str(self.hits),
+            "X-LLM-Cache-Misses": str(self.misses),
+            "X-LLM-Cache-Hit-Rate": f"{self.hit_rate:.4f}"
+        }
+
+
+class LLMCache:
+    """
+    Cache kết quả trích xuất của LLM lưu trên đĩa bằng SQLite, khóa theo nội dung (content-addressed).
+
+    - Mỗi bản ghi có TTL; bản ghi hết hạn được coi như không tồn tại.
+    - Tổng dung lượng bị giới hạn bởi max_bytes, bản ghi lâu không được dùng nhất bị xóa trước (LRU).
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 30 * 24 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Trả về giá trị đã lưu (chuỗi JSON) hoặc None nếu không có/hết hạn."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Lưu giá trị (chuỗi JSON) và loại bỏ bản ghi cũ nếu vượt dung lượng cho phép."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale_keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at ASC"):
+            if total - freed <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes, "ttl_seconds": self.ttl_seconds}
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Trả về cache LLM dùng chung theo config, hoặc None nếu cache bị tắt."""
+    global _cache
+    if not config.LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(config.LLM_CACHE_PATH, config.LLM_CACHE_MAX_BYTES, config.LLM_CACHE_TTL)
+        return _cache
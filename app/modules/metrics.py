@@ -0,0 +1,199 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from app import config
+
+event_logger = logging.getLogger("app.events")
+
+
+def _configure_event_logger() -> None:
+    """
+    Gắn handler (stderr, mỗi sự kiện một dòng JSON) cho logger 'app.events' theo EVENT_LOG_LEVEL, để sự kiện
+    không bị bỏ khi ứng dụng không cấu hình logging. Không làm gì nếu logger đã có handler (đã được cấu hình).
+    """
+    if event_logger.handlers:
+        return
+    if config.EVENT_LOG_LEVEL == "OFF":
+        event_logger.disabled = True
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    event_logger.addHandler(handler)
+    event_logger.setLevel(config.EVENT_LOG_LEVEL)
+    # Không chuyển tiếp lên root logger để sự kiện không bị in hai lần khi root cũng có handler
+    event_logger.propagate = False
+
+
+_configure_event_logger()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+class Counter:
+    """Bộ đếm tăng dần theo nhãn (thread-safe)."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        """Giá trị hiện tại của bộ đếm với đúng bộ nhãn này (0 nếu chưa có)."""
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{_format_labels(key)} {value}"
+
+
+class Histogram:
+    """Histogram theo nhãn với các bucket cố định (thread-safe)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._counts: Dict[LabelKey, list] = {}
+        self._sums: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += 1  # bucket +Inf
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> Iterator[str]:
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                for bound, count in zip(self.buckets, counts):
+                    yield f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {count}"
+                yield f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {counts[-1]}"
+                yield f"{self.name}_sum{_format_labels(key)} {self._sums[key]}"
+                yield f"{self.name}_count{_format_labels(key)} {counts[-1]}"
+
+
+class MetricsRegistry:
+    """Tập hợp các metric của process, xuất ra định dạng text của Prometheus."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, description))
+
+    def histogram(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, description, buckets))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram("mmg_stage_duration_seconds", "Thời gian xử lý của từng bước trong pipeline")
+STAGE_FAILURES = registry.counter("mmg_stage_failures_total", "Số lần một bước trong pipeline bị lỗi")
+CHUNKS = registry.counter("mmg_chunks_total", "Số chunk transcript được tạo ra để gửi tới LLM")
+LLM_CALLS = registry.counter("mmg_llm_calls_total", "Số lời gọi LLM")
+LLM_TOKENS = registry.counter("mmg_llm_tokens_total", "Số token gửi tới/nhận từ LLM (kind=prompt|completion)")
+CACHE_LOOKUPS = registry.counter("mmg_cache_lookups_total", "Số lần tra cache (cache=llm|transcript, result=hit|miss)")
+FILTERED_SEGMENTS = registry.counter("mmg_filtered_segments_total", "Số đoạn transcript bị loại trước khi gửi tới LLM (theo reason)")
+FILTERED_TOKENS = registry.counter("mmg_filtered_tokens_total", "Số token transcript bị loại trước khi gửi tới LLM (theo reason)")
+SALIENCE_DROPPED_TOKENS = registry.counter("mmg_salience_dropped_tokens_total", "Số token transcript bị bộ lọc salience bỏ trước khi chia chunk")
+
+# Bảng thời gian của request hiện tại: {stage: [tổng số giây, số lần]}
+_request_timings: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_timings", default=None)
+_timings_lock = threading.Lock()
+
+
+def start_request_timings() -> contextvars.Token:
+    """Bắt đầu ghi thời gian các bước cho request hiện tại."""
+    return _request_timings.set({})
+
+
+def end_request_timings(token: contextvars.Token) -> dict:
+    """Kết thúc ghi thời gian và trả về bảng {stage: [giây, số lần]} của request."""
+    timings = _request_timings.get() or {}
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings: dict) -> str:
+    """Định dạng bảng thời gian theo header Server-Timing (đơn vị mili giây)."""
+    return ", ".join(f'{stage};dur={seconds * 1000:.1f};desc="x{count}"'
+                     for stage, (seconds, count) in timings.items())
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Ghi nhận thời gian của một bước vào histogram và vào bảng thời gian của request (nếu có)."""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        with _timings_lock:
+            entry = timings.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+
+@contextmanager
+def span(stage: str):
+    """Đo thời gian một bước; nếu bước bị lỗi thì tăng bộ đếm lỗi của bước đó."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def emit_event(event: str, **fields) -> None:
+    """Ghi một sự kiện có cấu trúc (JSON) qua logger 'app.events'."""
+    if event_logger.isEnabledFor(logging.INFO):
+        event_logger.info(json.dumps({"event": event, **fields}, ensure_ascii=False, default=str))
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, NamedTuple, Tuple
+
+from app import config
+from app.modules.metrics import observe_stage
+
+if TYPE_CHECKING:
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+
+class LoadedWhisperModel(NamedTuple):
+    """Model Faster Whisper đã được nạp cùng pipeline batched tương ứng."""
+    model: "WhisperModel"
+    pipeline: "BatchedInferencePipeline"
+
+
+ModelKey = Tuple[str, str, str, int]
+
+
+class WhisperModelRegistry:
+    """
+    Registry dùng chung trong toàn process, giữ các model Faster Whisper đã nạp
+    theo khóa (model_size, device, compute_type, cpu_threads).
+
+    - Model được nạp một lần và tái sử dụng cho mọi request.
+    - Giới hạn số model giữ trong bộ nhớ (LRU), model ít dùng nhất bị loại khi vượt giới hạn.
+    - Thread-safe: nhiều request đồng thời cùng khóa chỉ nạp model đúng một lần.
+    """
+
+    def __init__(self, max_models: int = 1):
+        if max_models < 1:
+            raise ValueError("max_models phải lớn hơn hoặc bằng 1.")
+        self.max_models = max_models
+        self._entries: "OrderedDict[ModelKey, LoadedWhisperModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._loads = 0
+        self._total_load_seconds = 0.0
+        self._load_seconds: Dict[ModelKey, float] = {}
+
+    def get(self, model_size: str, device: str, compute_type: str, cpu_threads: int = 0) -> LoadedWhisperModel:
+        """
+        Lấy model (và pipeline) đã nạp cho khóa tương ứng, nạp mới nếu chưa có.
+
+        Args:
+            model_size (str): Kích thước model (ví dụ: 'medium').
+            device (str): Thiết bị chạy inference ('cpu', 'cuda').
+            compute_type (str): Kiểu tính toán ('int8', 'float16', ...).
+            cpu_threads (int): Số thread CPU cho model (0 = mặc định của CTranslate2).
+
+        Returns:
+            LoadedWhisperModel: Model và BatchedInferencePipeline đã sẵn sàng.
+        """
+        key = (model_size, device, compute_type, cpu_threads)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Chỉ một thread nạp model cho mỗi khóa, các thread khác chờ và dùng lại kết quả
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry
+                self._misses += 1
+
+            start = time.perf_counter()
+            # faster-whisper (ctranslate2, onnxruntime, ...) chỉ được import khi nạp model lần đầu
+            from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+            model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+            entry = LoadedWhisperModel(model=model, pipeline=BatchedInferencePipeline(model=model))
+            elapsed = time.perf_counter() - start
+            observe_stage("model_load", elapsed)
+
+            with self._lock:
+                self._entries[key] = entry
+                self._load_seconds[key] = elapsed
+                self._loads += 1
+                self._total_load_seconds += elapsed
+                while len(self._entries) > self.max_models:
+                    evicted_key, _ = self._entries.popitem(last=False)
+                    self._key_locks.pop(evicted_key, None)
+                    self._load_seconds.pop(evicted_key, None)
+                    self._evictions += 1
+        return entry
+
+    def warm_up(self, model_size: str, device: str, compute_type: str, cpu_threads: int = 0) -> None:
+        """Nạp trước model để request đầu tiên không phải chịu chi phí cold start."""
+        self.get(model_size, device, compute_type, cpu_threads)
+
+    def clear(self) -> None:
+        """Giải phóng toàn bộ model đang giữ trong registry."""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+            self._load_seconds.clear()
+
+    def stats(self) -> dict:
+        """
+        Trả về thống kê của registry: số lần hit/miss, số lần loại bỏ,
+        danh sách model đang nạp và thời gian nạp (giây) của từng model.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "max_models": self.max_models,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "loads": self._loads,
+                "evictions": self._evictions,
+                "loaded": [
+                    {
+                        "model_size": key[0],
+                        "device": key[1],
+                        "compute_type": key[2],
+                        "cpu_threads": key[3],
+                        "load_seconds": round(self._load_seconds.get(key, 0.0), 3)
+                    }
+                    for key in self._entries
+                ],
+                "total_load_seconds": round(self._total_load_seconds, 3)
+            }
+
+
+# Registry mặc định dùng chung cho toàn bộ process
+_registry = WhisperModelRegistry(max_models=config.WHISPER_MODEL_CACHE_SIZE)
+
+
+def get_model_registry() -> WhisperModelRegistry:
+    """Trả về registry model Whisper dùng chung của process."""
+    return _registry
+
+
+def get_whisper_pipeline(model_size: str, device: str, compute_type: str,
+                         cpu_threads: int = 0) -> "BatchedInferencePipeline":
+    """Lấy BatchedInferencePipeline đã nạp sẵn từ registry dùng chung."""
+    return _registry.get(model_size, device, compute_type, cpu_threads).pipeline
@@ -1,6 +1,19 @@
+import multiprocessing
 import os
 import re
-from faster_whisper import WhisperModel, BatchedInferencePipeline
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
+from app.modules.audio_ingest import SAMPLING_RATE, load_audio
+from app.modules.metrics import CACHE_LOOKUPS, span
+from app.modules.model_registry import get_whisper_pipeline
+from app.modules.segment_store import SegmentStore
+from app.modules.transcript_cache import (
+    CachedTranscriptionInfo, get_transcript_cache, hash_audio_file, hash_audio_stream, make_transcript_key
+)
+from app.modules.transcript_filter import TranscriptFilter, get_transcript_filter, merge_filter_stats
+
+AudioSource = Union[str, BinaryIO]
 
 def clean_text(text: str) -> str:
     """
@@ -13,79 +26,430 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
-def preprocess_transcript(segments: list) -> list:
+def preprocess_segment(segment) -> dict:
     """
-    Tiền xử lý từng đoạn transcript, trả về danh sách các dictionary với các thông tin:
+    Tiền xử lý một đoạn transcript do Faster Whisper trả về, trả về dictionary gồm:
       - start: thời gian bắt đầu đoạn
       - end: thời gian kết thúc đoạn
       - text: nội dung đã được làm sạch
     """
-    processed_segments = []
+    return {
+        'start': segment.start,
+        'end': segment.end,
+        'text': clean_text(segment.text)
+    }
+
+
+def filter_segments(segments, transcript_filter: Optional[TranscriptFilter] = None) -> Iterator[dict]:
+    """
+    Tiền xử lý từng đoạn do Faster Whisper trả về (xem preprocess_segment) và bỏ các đoạn bị transcript_filter
+    loại (hallucination, vòng lặp, từ đệm, đoạn không có lời nói); đoạn bị cắt bớt được trả về với phần còn lại.
+    """
     for segment in segments:
-        processed_segments.append({
-            'start': segment.start,
-            'end': segment.end,
-            'text': clean_text(segment.text)
-        })
+        processed = preprocess_segment(segment)
+        if transcript_filter is not None:
+            processed['text'] = transcript_filter.apply(processed['text'],
+                                                        getattr(segment, 'avg_logprob', None),
+                                                        getattr(segment, 'no_speech_prob', None))
+            if not processed['text']:
+                continue
+        yield processed
+
+
+def preprocess_transcript(segments, transcript_filter: Optional[TranscriptFilter] = None) -> SegmentStore:
+    """
+    Tiền xử lý từng đoạn transcript và lưu vào SegmentStore (không tạo dict cho từng đoạn);
+    mỗi phần tử khi đọc ra gồm các thông tin:
+      - start: thời gian bắt đầu đoạn
+      - end: thời gian kết thúc đoạn
+      - text: nội dung đã được làm sạch
+    Nếu có transcript_filter, các đoạn bị bộ lọc loại sẽ bị bỏ (xem filter_segments).
+    """
+    processed_segments = SegmentStore()
+    for segment in filter_segments(segments, transcript_filter):
+        processed_segments.append(segment['start'], segment['end'], segment['text'])
     return processed_segments
 
 
-def transcribe_audio(input_audio: str = 'audio.mp3',
+def _with_filter_stats(info, transcript_filter: Optional[TranscriptFilter]):
+    """Thông tin transcription kèm thống kê lọc (dict được cập nhật dần khi duyệt các đoạn)."""
+    if transcript_filter is None:
+        return info
+    return CachedTranscriptionInfo(
+        language=info.language,
+        language_probability=info.language_probability,
+        duration=getattr(info, "duration", None),
+        duration_after_vad=getattr(info, "duration_after_vad", None),
+        filtered=transcript_filter.stats
+    )
+
+
+def _check_audio(input_audio: AudioSource) -> None:
+    if isinstance(input_audio, str) and not os.path.exists(input_audio):
+        raise FileNotFoundError(f"File '{input_audio}' không tồn tại.")
+
+
+def _hash_audio(input_audio: AudioSource) -> str:
+    return hash_audio_file(input_audio) if isinstance(input_audio, str) else hash_audio_stream(input_audio)
+
+
+def transcribe_audio_stream(input_audio: AudioSource = 'audio.mp3',
+                            model_size: str = 'base',
+                            device: str = 'cpu',
+                            compute_type: str = 'int8',
+                            beam_size: int = 5,
+                            vad_filter: bool = True,
+                            batch_size: int = 32,
+                            use_cache: bool = True,
+                            audio_hash: Optional[str] = None) -> tuple:
+    """
+    Chuyển đổi file audio thành transcript dạng luồng: các đoạn được tiền xử lý và trả về
+    ngay khi Faster Whisper giải mã xong, không chờ toàn bộ file.
+    Nếu audio (cùng tham số Whisper) đã được transcribe trước đó, transcript được lấy từ cache
+    trên đĩa mà không chạy lại Whisper; ngược lại transcript sẽ được lưu vào cache khi giải mã xong.
+
+    Args:
+        input_audio: Đường dẫn tới file audio (ví dụ: audio.mp3) hoặc file object (ví dụ file upload).
+        model_size (str): Kích thước model sử dụng.
+        device (str): Thiết bị chạy inference.
+        compute_type (str): Kiểu tính toán.
+        beam_size (int): Số lượng beam cho quá trình transcribe.
+        vad_filter (bool): Bật VAD filter để loại bỏ phần không có lời nói.
+        batch_size (int): Số đoạn audio giải mã trong một batch. Batch nhỏ hơn cho đoạn đầu tiên sớm hơn.
+        use_cache (bool): Dùng cache transcript theo hash nội dung audio (mặc định True).
+        audio_hash (str): SHA-256 của file audio nếu đã tính sẵn (ví dụ khi lưu file upload).
+
+    Returns:
+        tuple: (segment_iterator, info) trong đó segment_iterator là generator các đoạn transcript
+               đã tiền xử lý (dictionary start/end/text), info chứa thông tin về quá trình transcription.
+
+    Raises:
+        FileNotFoundError: Nếu file audio không tồn tại.
+    """
+    _check_audio(input_audio)
+
+    transcript_filter = get_transcript_filter()
+    cache = get_transcript_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        audio_hash = audio_hash or _hash_audio(input_audio)
+        cache_key = make_transcript_key(audio_hash, model_size, compute_type, beam_size, vad_filter,
+                                        transcript_filter.signature if transcript_filter is not None else None)
+        cached = cache.get(cache_key)
+        CACHE_LOOKUPS.inc(cache="transcript", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            # SegmentStore (memory-map từ cache) duyệt được như generator các dict
+            return cached
+
+    # Lấy model Faster Whisper đã nạp sẵn từ registry (chỉ nạp ở lần gọi đầu tiên)
+    batched_model = get_whisper_pipeline(model_size, device, compute_type)
+
+    # Cấu hình tham số cho quá trình transcription
+    transcription_kwargs = {"beam_size": beam_size}
+    if vad_filter:
+        transcription_kwargs["vad_filter"] = True
+
+    # Audio được giải mã một lần vào cache PCM (memory-map) và dùng lại cho các lần transcribe sau
+    audio = load_audio(input_audio, audio_hash)
+    segments, info = batched_model.transcribe(audio, **transcription_kwargs, batch_size=batch_size)
+    info = _with_filter_stats(info, transcript_filter)
+    if cache is None:
+        return filter_segments(segments, transcript_filter), info
+
+    def _stream_and_cache():
+        processed_segments = SegmentStore()
+        for processed in filter_segments(segments, transcript_filter):
+            processed_segments.append(processed["start"], processed["end"], processed["text"])
+            yield processed
+        # Chỉ lưu cache khi toàn bộ file đã được giải mã
+        cache.set(cache_key, processed_segments, info)
+
+    return _stream_and_cache(), info
+
+
+def transcribe_audio(input_audio: AudioSource = 'audio.mp3',
                      model_size: str = 'base',
                      device: str = 'cpu',
                      compute_type: str = 'int8',
-                     beam_size: int = '5',
-                     vad_filter: bool = True) -> tuple:
+                     beam_size: int = 5,
+                     vad_filter: bool = True,
+                     use_cache: bool = True,
+                     audio_hash: Optional[str] = None,
+                     num_workers: int = 1) -> tuple:
     """
     Thực hiện chuyển đổi file audio thành transcript sử dụng Faster Whisper.
 
     Args:
-        input_audio (str): Đường dẫn tới file audio (ví dụ: audio.mp3).
+        input_audio: Đường dẫn tới file audio (ví dụ: audio.mp3) hoặc file object (ví dụ file upload).
         model_size (str): Kích thước model sử dụng (mặc định lấy từ config).
         device (str): Thiết bị chạy inference (mặc định lấy từ config).
         compute_type (str): Kiểu tính toán (mặc định lấy từ config).
         beam_size (int): Số lượng beam cho quá trình transcribe (mặc định lấy từ config).
         vad_filter (bool): Bật VAD filter để loại bỏ phần không có lời nói (mặc định lấy từ config).
+        use_cache (bool): Dùng cache transcript theo hash nội dung audio (mặc định True).
+        audio_hash (str): SHA-256 của file audio nếu đã tính sẵn.
+        num_workers (int): Số process transcribe song song. Lớn hơn 1 sẽ chia audio thành các shard
+                           tại các khoảng lặng (xem transcribe_audio_sharded).
 
     Returns:
-        tuple: (processed_segments, info) trong đó processed_segments là danh sách transcript đã tiền xử lý,
-               info chứa thông tin chi tiết về quá trình transcription (ví dụ: ngôn ngữ, xác suất,...).
+        tuple: (processed_segments, info) trong đó processed_segments là SegmentStore chứa transcript
+               đã tiền xử lý (duyệt/truy cập theo chỉ số trả về dict {'start', 'end', 'text'}), info chứa thông tin chi tiết về quá trình transcription (ví dụ: ngôn ngữ, xác suất,...).
 
     Raises:
         FileNotFoundError: Nếu file audio không tồn tại.
     """
-    if not os.path.exists(input_audio):
-        raise FileNotFoundError(f"File '{input_audio}' không tồn tại.")
+    if num_workers > 1:
+        return transcribe_audio_sharded(
+            input_audio=input_audio,
+            model_size=model_size,
+            device=device,
+            compute_type=compute_type,
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            num_workers=num_workers,
+            use_cache=use_cache,
+            audio_hash=audio_hash
+        )
 
-    # Khởi tạo model Faster Whisper với các tham số lấy từ config
-    model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    with span("whisper_transcribe"):
+        segments, info = transcribe_audio_stream(
+            input_audio=input_audio,
+            model_size=model_size,
+            device=device,
+            compute_type=compute_type,
+            beam_size=beam_size,
+            vad_filter=vad_filter,
+            use_cache=use_cache,
+            audio_hash=audio_hash
+        )
+        # Gom các đoạn vào SegmentStore để dùng lại nhiều lần (cache hit đã là SegmentStore)
+        if not isinstance(segments, SegmentStore):
+            segments = SegmentStore.from_segments(segments)
+    return segments, info
 
-    # Cấu hình tham số cho quá trình transcription
-    transcription_kwargs = {"beam_size": beam_size}
-    if vad_filter:
-        transcription_kwargs["vad_filter"] = True
 
-    # Chạy quá trình transcription
-    batched_model = BatchedInferencePipeline(model=model)
-    segments, info = batched_model.transcribe(input_audio, **transcription_kwargs, batch_size=32)
-    segments = list(segments)  # Ép generator thành list để dễ xử lý lại sau này
-    processed_segments = preprocess_transcript(segments)
+def transcribe_audio_two_pass(input_audio: AudioSource = 'audio.mp3',
+                              model_size: str = 'base',
+                              device: str = 'cpu',
+                              compute_type: str = 'int8',
+                              beam_size: int = 5,
+                              vad_filter: bool = True,
+                              use_cache: bool = True,
+                              audio_hash: Optional[str] = None,
+                              num_workers: int = 1,
+                              draft_model_size: str = 'base',
+                              draft_beam_size: int = 1) -> Iterator[Tuple[str, SegmentStore, object]]:
+    """
+    Transcribe hai lượt: lượt nháp dùng model nhỏ với giải mã tham lam (draft_beam_size=1) để có transcript
+    sớm, sau đó lượt cuối dùng model và beam_size đã cấu hình cho transcript chính xác hơn.
+    Audio chỉ được giải mã một lần (cache PCM) cho cả hai lượt. Lượt cuối chỉ chạy khi generator được
+    duyệt tiếp, nên có thể lấy bản nháp trong request và chạy lượt cuối trong job nền.
+
+    Args:
+        input_audio: Đường dẫn tới file audio. Không dùng file upload vì lượt cuối có thể chạy sau khi request kết thúc.
+        model_size, device, compute_type, beam_size, vad_filter, use_cache, num_workers: Tham số của lượt cuối
+            (xem transcribe_audio).
+        audio_hash (str): SHA-256 của file audio nếu đã tính sẵn.
+        draft_model_size (str): Model của lượt nháp.
+        draft_beam_size (int): Số beam của lượt nháp (1 = giải mã tham lam).
+
+    Yields:
+        tuple: ('draft', segments, info) rồi ('final', segments, info) với segments là SegmentStore.
+    """
+    _check_audio(input_audio)
+    if audio_hash is None:
+        audio_hash = _hash_audio(input_audio)
+
+    with span("whisper_draft"):
+        segments, info = transcribe_audio(
+            input_audio=input_audio, model_size=draft_model_size, device=device, compute_type=compute_type,
+            beam_size=draft_beam_size, vad_filter=vad_filter, use_cache=use_cache, audio_hash=audio_hash,
+            num_workers=num_workers
+        )
+    yield "draft", segments, info
+
+    segments, info = transcribe_audio(
+        input_audio=input_audio, model_size=model_size, device=device, compute_type=compute_type,
+        beam_size=beam_size, vad_filter=vad_filter, use_cache=use_cache, audio_hash=audio_hash,
+        num_workers=num_workers
+    )
+    yield "final", segments, info
+
+
+def plan_audio_shards(speech_chunks: List[dict], total_samples: int, num_shards: int) -> List[Tuple[int, int]]:
+    """
+    Chia audio thành num_shards đoạn có độ dài xấp xỉ nhau, điểm cắt được đặt tại giữa
+    khoảng lặng (giữa hai vùng có lời nói do VAD phát hiện) gần nhất với điểm chia đều.
+
+    Args:
+        speech_chunks (List[dict]): Các vùng có lời nói {'start', 'end'} (đơn vị: sample), theo thứ tự.
+        total_samples (int): Tổng số sample của audio.
+        num_shards (int): Số shard mong muốn.
+
+    Returns:
+        List[Tuple[int, int]]: Danh sách (start_sample, end_sample) của từng shard.
+    """
+    gaps = [(prev["end"] + nxt["start"]) // 2 for prev, nxt in zip(speech_chunks, speech_chunks[1:])
+            if nxt["start"] > prev["end"]]
+    if num_shards <= 1 or not gaps:
+        return [(0, total_samples)]
+
+    boundaries = []
+    for k in range(1, num_shards):
+        target = total_samples * k // num_shards
+        cut = min(gaps, key=lambda g: abs(g - target))
+        if (not boundaries or cut > boundaries[-1]) and 0 < cut < total_samples:
+            boundaries.append(cut)
+    edges = [0] + boundaries + [total_samples]
+    return list(zip(edges, edges[1:]))
+
+
+def _shard_audio(audio, start: int, end: int):
+    """Dữ liệu gửi cho worker: (đường dẫn, start, end) nếu audio là memmap (worker tự memory-map, không sao chép),
+    ngược lại là đoạn mảng của shard."""
+    import numpy as np
+
+    if isinstance(audio, np.memmap) and audio.filename:
+        return audio.filename, start, end
+    return audio[start:end]
+
+
+def _open_shard_audio(audio):
+    import numpy as np
+
+    if isinstance(audio, tuple):
+        path, start, end = audio
+        return np.memmap(path, dtype="<f4", mode="r")[start:end]
+    return audio
+
+
+def _transcribe_shard(audio, offset: float, model_size: str, device: str, compute_type: str,
+                      beam_size: int, vad_filter: bool, cpu_threads: int) -> Tuple[SegmentStore, str, float, Optional[dict]]:
+    """
+    Transcribe một shard trong process worker, timestamp được dịch về dòng thời gian của cả file.
+    Trả về (segments, ngôn ngữ, xác suất ngôn ngữ, thống kê lọc của shard hoặc None).
+    """
+    batched_model = get_whisper_pipeline(model_size, device, compute_type, cpu_threads)
+    transcription_kwargs = {"beam_size": beam_size, "vad_filter": bool(vad_filter)}
+    segments, info = batched_model.transcribe(_open_shard_audio(audio), **transcription_kwargs, batch_size=32)
+    transcript_filter = get_transcript_filter()
+    processed = SegmentStore()
+    for segment in filter_segments(segments, transcript_filter):
+        processed.append(segment['start'] + offset, segment['end'] + offset, segment['text'])
+    return (processed, info.language, info.language_probability,
+            transcript_filter.stats if transcript_filter is not None else None)
+
+
+_shard_pool: Optional[ProcessPoolExecutor] = None
+_shard_pool_workers = 0
+_shard_pool_lock = threading.Lock()
+
+
+def _get_shard_pool(num_workers: int) -> ProcessPoolExecutor:
+    """Pool process dùng lại giữa các lần gọi để model trong mỗi worker chỉ nạp một lần."""
+    global _shard_pool, _shard_pool_workers
+    with _shard_pool_lock:
+        if _shard_pool is None or _shard_pool_workers != num_workers:
+            if _shard_pool is not None:
+                _shard_pool.shutdown(wait=False)
+            _shard_pool = ProcessPoolExecutor(max_workers=num_workers,
+                                              mp_context=multiprocessing.get_context("spawn"))
+            _shard_pool_workers = num_workers
+        return _shard_pool
+
+
+def transcribe_audio_sharded(input_audio: AudioSource = 'audio.mp3',
+                             model_size: str = 'base',
+                             device: str = 'cpu',
+                             compute_type: str = 'int8',
+                             beam_size: int = 5,
+                             vad_filter: bool = True,
+                             num_workers: int = 2,
+                             use_cache: bool = True,
+                             audio_hash: Optional[str] = None) -> tuple:
+    """
+    Transcribe file audio dài bằng nhiều process: audio được giải mã một lần (cache PCM memory-map), chia thành các shard
+    tại khoảng lặng (VAD) với độ dài xấp xỉ nhau, mỗi shard được transcribe trong một worker
+    (mỗi worker một model, số thread CPU được chia đều giữa các worker) rồi ghép lại theo
+    dòng thời gian của cả file.
+
+    Args:
+        input_audio: Đường dẫn tới file audio hoặc file object.
+        model_size (str): Kích thước model sử dụng.
+        device (str): Thiết bị chạy inference.
+        compute_type (str): Kiểu tính toán.
+        beam_size (int): Số lượng beam cho quá trình transcribe.
+        vad_filter (bool): Bật VAD filter trong từng shard.
+        num_workers (int): Số process worker (số shard).
+        use_cache (bool): Dùng cache transcript theo hash nội dung audio.
+        audio_hash (str): SHA-256 của file audio nếu đã tính sẵn.
+
+    Returns:
+        tuple: (processed_segments, info) giống transcribe_audio.
+
+    Raises:
+        FileNotFoundError: Nếu file audio không tồn tại.
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    _check_audio(input_audio)
+
+    transcript_filter = get_transcript_filter()
+    cache = get_transcript_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        audio_hash = audio_hash or _hash_audio(input_audio)
+        cache_key = make_transcript_key(audio_hash, model_size, compute_type, beam_size, vad_filter,
+                                        transcript_filter.signature if transcript_filter is not None else None)
+        cached = cache.get(cache_key)
+        CACHE_LOOKUPS.inc(cache="transcript", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+    audio = load_audio(input_audio, audio_hash)
+    with span("vad"):
+        speech_chunks = get_speech_timestamps(audio, VadOptions(), sampling_rate=SAMPLING_RATE)
+    shards = plan_audio_shards(speech_chunks, len(audio), num_workers)
+    cpu_threads = max(1, (os.cpu_count() or 1) // len(shards))
+
+    pool = _get_shard_pool(num_workers)
+    with span("whisper_transcribe"):
+        futures = [
+            pool.submit(_transcribe_shard, _shard_audio(audio, start, end), start / SAMPLING_RATE, model_size, device,
+                        compute_type, beam_size, vad_filter, cpu_threads)
+            for start, end in shards
+        ]
+        results = [future.result() for future in futures]
+
+    processed_segments = SegmentStore.concat(shard_segments for shard_segments, _, _, _ in results)
+    # Ngôn ngữ của cả file: ngôn ngữ của shard dài nhất
+    longest = max(range(len(shards)), key=lambda i: shards[i][1] - shards[i][0])
+    info = CachedTranscriptionInfo(
+        language=results[longest][1],
+        language_probability=results[longest][2],
+        duration=len(audio) / SAMPLING_RATE,
+        duration_after_vad=sum(c["end"] - c["start"] for c in speech_chunks) / SAMPLING_RATE,
+        filtered=merge_filter_stats(stats for *_, stats in results) if transcript_filter is not None else None
+    )
+    if cache is not None:
+        cache.set(cache_key, processed_segments, info)
     return processed_segments, info
 
+def format_transcript(segments) -> str:
+    """
+    Định dạng transcript đã tiền xử lý (SegmentStore hoặc list các dict) thành văn bản, mỗi đoạn trên một dòng.
+    """
+    if isinstance(segments, SegmentStore):
+        return segments.to_text() + "\n" if len(segments) else ""
+    # return "".join(f"[{seg['start']:.2f}s -> {seg['end']:.2f}s] {seg['text']}\n" for seg in segments)
+    return "".join(f"{seg['text']}\n" for seg in segments)
 
-def save_transcript(segments: list, output_file: str) -> None:
+
+def save_transcript(segments, output_file: str) -> None:
     """
-    Lưu transcript đã tiền xử lý vào file văn bản.
-    Mỗi đoạn được lưu theo định dạng:
-      [start_time -> end_time] transcript_text
+    Lưu transcript đã tiền xử lý vào file văn bản (xem format_transcript).
     """
     with open(output_file, 'w', encoding='utf-8') as f:
-        for seg in segments:
-            # f.write(f"[{seg['start']:.2f}s -> {seg['end']:.2f}s] {seg['text']}\n")
-            f.write(f"{seg['text']}\n")
-
+        f.write(format_transcript(segments))
 
-##Error quote
-##Hãy subscribe cho kênh Ghiền Mì Gõ Để không bỏ lỡ những video hấp dẫn
-##Hãy đăng ký kênh để ủng hộ kênh của mình nhé!
 
@@ -0,0 +1,57 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+
+class RateLimiter:
+    """
+    Giới hạn số request và số token gửi tới LLM trong cửa sổ trượt 60 giây.
+    Thread-safe: acquire() sẽ chặn cho tới khi có đủ hạn mức.
+
+    Giá trị None hoặc 0 nghĩa là không giới hạn.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _purge(self, now: float) -> None:
+        while self._events and now - self._events[0][0] >= self.WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def _wait_time(self, now: float, tokens: int) -> float:
+        if not self._events:
+            # Cửa sổ trống: luôn cho phép, kể cả khi một request vượt hạn mức token
+            return 0.0
+        if self.requests_per_minute and len(self._events) >= self.requests_per_minute:
+            return self._events[0][0] + self.WINDOW_SECONDS - now
+        if self.tokens_per_minute and self._tokens_in_window + tokens > self.tokens_per_minute:
+            return self._events[0][0] + self.WINDOW_SECONDS - now
+        return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """
+        Chờ cho tới khi gửi được một request với số token tương ứng, sau đó ghi nhận request.
+
+        Args:
+            tokens (int): Số token (ước lượng) của request.
+        """
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._purge(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+            time.sleep(wait)
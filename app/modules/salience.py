@@ -0,0 +1,169 @@
+import re
+from typing import Iterable, List, Optional, Union
+
+from app import config
+from app.modules.metrics import SALIENCE_DROPPED_TOKENS
+from app.modules.segment_store import SegmentStore
+from app.modules.tokenizer import count_tokens
+from app.modules.transcript_filter import PhraseAutomaton, _normalize
+
+_WORD = re.compile(r"\w+")
+# Tách câu trong một đoạn/dòng sau dấu kết thúc câu
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+# Ngày (15/04/2025, 15/4, 15-04-2025), giờ (10:30, 9h, 9h30) và "ngày/tháng/tuần + số"
+_DATE = re.compile(r"\b\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?\b|\b\d{1,2}(?::\d{2}|h\d{0,2})\b"
+                   r"|\b(?:ngày|tháng|tuần|quý|thứ)\s+\d+\b", re.IGNORECASE)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Tách một đoạn transcript thành các câu (theo dấu . ! ? …), bỏ câu rỗng."""
+    return [sentence for sentence in _SENTENCE_END.split(text.strip()) if sentence]
+
+
+def _has_name(sentence: str) -> bool:
+    """Câu có tên riêng: hai từ viết hoa liền nhau trở lên (ví dụ 'Nguyễn Văn An', 'Ban Giám đốc')."""
+    words = _WORD.findall(sentence)
+    return any(a[0].isupper() and b[0].isupper() and not a.isdigit() and not b.isdigit()
+               for a, b in zip(words, words[1:]))
+
+
+class SalienceFilter:
+    """
+    Lọc trích xuất trước khi gửi transcript tới LLM: chấm điểm từng câu bằng TF-IDF có trọng số từ khóa
+    (tính vector hóa bằng NumPy trên cả transcript) và bỏ các câu ít giá trị nhất (câu đệm, đáp lời...)
+    cho tới khi chỉ còn khoảng keep_ratio số từ của transcript.
+    Câu có ngày/giờ, tên người hoặc từ khóa quyết định (decision_cues) luôn được giữ, kể cả khi vượt keep_ratio.
+    Thứ tự câu được giữ nguyên; số câu/token trước và sau khi lọc được ghi trong stats.
+
+    Args:
+        keep_ratio (float): Tỉ lệ số từ giữ lại (0..1], 1 = không lọc.
+        decision_cues (Iterable[str]): Các cụm từ cho biết câu chứa quyết định/phân công (không phân biệt hoa thường).
+        stop_words (Iterable[str]): Các từ không tính điểm (từ đệm, đáp lời).
+    """
+
+    def __init__(self, keep_ratio: float = 0.6, decision_cues: Iterable[str] = (), stop_words: Iterable[str] = ()):
+        if not 0 < keep_ratio <= 1:
+            raise ValueError("keep_ratio phải nằm trong khoảng (0, 1].")
+        self.keep_ratio = keep_ratio
+        self.cues = PhraseAutomaton(decision_cues)
+        self.stop_words = frozenset(_normalize(word) for word in stop_words)
+        self.stats = {"sentences": 0, "sentences_kept": 0, "protected": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def _protected(self, sentence: str) -> bool:
+        return bool(_DATE.search(sentence) or _has_name(sentence)
+                    or (len(self.cues) and self.cues.spans(_normalize(sentence))))
+
+    def select(self, sentences: List[str]) -> List[bool]:
+        """Trả về cờ giữ/bỏ cho từng câu."""
+        import numpy as np
+
+        count = len(sentences)
+        if self.keep_ratio >= 1:
+            return [True] * count
+        vocabulary = {}
+        rows, cols = [], []
+        lengths = np.zeros(count, dtype=np.int64)
+        for i, sentence in enumerate(sentences):
+            words = [_normalize(word) for word in _WORD.findall(sentence)]
+            lengths[i] = len(words)
+            for word in words:
+                if word not in self.stop_words and not word.isdigit():
+                    rows.append(i)
+                    cols.append(vocabulary.setdefault(word, len(vocabulary)))
+        protected = np.fromiter((self._protected(sentence) for sentence in sentences), dtype=bool, count=count)
+
+        scores = np.zeros(count)
+        if cols:
+            rows_array = np.asarray(rows, dtype=np.int64)
+            cols_array = np.asarray(cols, dtype=np.int64)
+            size = len(vocabulary)
+            # Tần suất của từng (câu, từ), số câu chứa từng từ (df) và số lần xuất hiện trong cả transcript (cf)
+            pairs, tf = np.unique(rows_array * size + cols_array, return_counts=True)
+            pair_rows, pair_cols = pairs // size, pairs % size
+            df = np.bincount(pair_cols, minlength=size)
+            cf = np.bincount(cols_array, minlength=size)
+            idf = np.log((1 + count) / (1 + df)) + 1
+            # Từ khóa của cuộc họp: lặp lại nhiều trong transcript nhưng không xuất hiện ở mọi câu
+            keyword = np.log1p(cf) * idf
+            weights = (1 + np.log(tf)) * idf[pair_cols] * keyword[pair_cols]
+            # Chuẩn hóa theo căn bậc hai độ dài để câu dài không luôn thắng
+            scores = np.bincount(pair_rows, weights=weights, minlength=count) / np.sqrt(np.maximum(lengths, 1))
+
+        budget = self.keep_ratio * lengths.sum() - lengths[protected].sum()
+        keep = protected.copy()
+        if budget > 0:
+            candidates = np.flatnonzero(~protected)
+            order = candidates[np.argsort(-scores[candidates], kind="stable")]
+            # Giữ các câu điểm cao nhất cho tới khi đủ ngân sách số từ
+            before = np.cumsum(lengths[order]) - lengths[order]
+            keep[order[before < budget]] = True
+        self.stats["protected"] += int(protected.sum())
+        return keep.tolist()
+
+    def _record(self, before: str, after: str, sentences: int, kept: int) -> None:
+        tokens_before, tokens_after = count_tokens(before), count_tokens(after)
+        self.stats["sentences"] += sentences
+        self.stats["sentences_kept"] += kept
+        self.stats["tokens_before"] += tokens_before
+        self.stats["tokens_after"] += tokens_after
+        if tokens_before > tokens_after:
+            SALIENCE_DROPPED_TOKENS.inc(tokens_before - tokens_after)
+
+    def filter_text(self, text: str) -> str:
+        """Lọc transcript dạng văn bản (mỗi đoạn một dòng); dòng không còn câu nào bị bỏ."""
+        units = [split_sentences(line) for line in text.splitlines()]
+        result = self._filter_units(units)
+        lines = [" ".join(sentences) for sentences in result]
+        filtered = "\n".join(line for line in lines if line)
+        self._record(text, filtered, sum(map(len, units)), sum(map(len, result)))
+        return filtered
+
+    def filter_segments(self, store: SegmentStore) -> SegmentStore:
+        """Lọc SegmentStore, giữ nguyên thời gian của các đoạn còn lại; đoạn không còn câu nào bị bỏ."""
+        units = [split_sentences(store.text(i)) for i in range(len(store))]
+        result = self._filter_units(units)
+        filtered = SegmentStore()
+        for segment, sentences in zip(store, result):
+            if sentences:
+                filtered.append(segment["start"], segment["end"], " ".join(sentences))
+        self._record(store.to_text(), filtered.to_text(), sum(map(len, units)), sum(map(len, result)))
+        return filtered
+
+    def _filter_units(self, units: List[List[str]]) -> List[List[str]]:
+        flat = [sentence for sentences in units for sentence in sentences]
+        flags = iter(self.select(flat))
+        return [[sentence for sentence in sentences if next(flags)] for sentences in units]
+
+    def apply(self, transcript: Union[str, SegmentStore]) -> Union[str, SegmentStore]:
+        """Lọc transcript (văn bản hoặc SegmentStore), trả về cùng kiểu."""
+        if isinstance(transcript, SegmentStore):
+            return self.filter_segments(transcript)
+        return self.filter_text(transcript)
+
+    @property
+    def reduction(self) -> float:
+        """Tỉ lệ token transcript đã bỏ (0..1)."""
+        before = self.stats["tokens_before"]
+        return 1 - self.stats["tokens_after"] / before if before else 0.0
+
+    def report(self) -> dict:
+        return {**self.stats, "reduction": round(self.reduction, 4)}
+
+    def to_headers(self) -> dict:
+        return {
+            "X-Salience-Tokens-Before": str(self.stats["tokens_before"]),
+            "X-Salience-Tokens-After": str(self.stats["tokens_after"]),
+            "X-Salience-Reduction": f"{self.reduction:.4f}"
+        }
+
+
+def get_salience_filter(keep_ratio: Optional[float] = None) -> Optional[SalienceFilter]:
+    """
+    Tạo SalienceFilter mới theo config (mỗi transcript một bộ lọc vì stats có trạng thái),
+    hoặc None nếu keep_ratio >= 1 (không lọc).
+    """
+    keep_ratio = config.SALIENCE_KEEP_RATIO if keep_ratio is None else keep_ratio
+    if keep_ratio >= 1:
+        return None
+    return SalienceFilter(keep_ratio, config.SALIENCE_DECISION_CUES,
+                          tuple(config.TRANSCRIPT_FILLER_WORDS) + tuple(config.SALIENCE_STOP_WORDS))
@@ -0,0 +1,251 @@
+import math
+import threading
+from typing import Dict, NamedTuple, Optional, Sequence
+
+from app import config
+
+
+class _LatencyModel:
+    """
+    Mô hình độ trễ một lời gọi LLM theo số token prompt: seconds ≈ base + rate * tokens, ước lượng bằng
+    hồi quy tuyến tính trên các trung bình trượt có trọng số mũ (EWMA) của tokens, seconds, tokens² và
+    tokens*seconds, nên thích nghi dần theo độ trễ thực tế gần đây. Khi chưa đủ số đo để tách base và rate,
+    rate lấy theo giá trị mặc định và base bù phần còn lại của độ trễ trung bình.
+    """
+
+    def __init__(self, alpha: float, prior_base: float, prior_rate: float):
+        self.alpha = alpha
+        self.prior_base = prior_base
+        self.prior_rate = prior_rate
+        self.count = 0
+        self._x = self._y = self._xx = self._xy = 0.0
+
+    def observe(self, tokens: float, seconds: float) -> None:
+        if self.count == 0:
+            self._x, self._y, self._xx, self._xy = tokens, seconds, tokens * tokens, tokens * seconds
+        else:
+            a = self.alpha
+            self._x += a * (tokens - self._x)
+            self._y += a * (seconds - self._y)
+            self._xx += a * (tokens * tokens - self._xx)
+            self._xy += a * (tokens * seconds - self._xy)
+        self.count += 1
+
+    def coefficients(self):
+        """(base, rate): giây cố định mỗi lời gọi và giây cho mỗi token prompt."""
+        if self.count == 0:
+            return self.prior_base, self.prior_rate
+        variance = self._xx - self._x * self._x
+        rate = self.prior_rate
+        # Chỉ tin độ dốc ước lượng khi độ dài prompt của các lời gọi đủ khác nhau (độ lệch chuẩn >= 10% trung bình)
+        if variance > (0.1 * self._x) ** 2:
+            rate = max(0.0, (self._xy - self._x * self._y) / variance)
+        base = self._y - rate * self._x
+        if base < 0:
+            base, rate = 0.0, self._y / self._x if self._x else rate
+        return base, rate
+
+    def predict(self, tokens: float) -> float:
+        base, rate = self.coefficients()
+        return base + rate * tokens
+
+    def to_dict(self) -> dict:
+        base, rate = self.coefficients()
+        return {"observations": self.count, "base_seconds": round(base, 4),
+                "seconds_per_1k_tokens": round(rate * 1000, 4),
+                "mean_tokens": round(self._x, 1), "mean_seconds": round(self._y, 4)}
+
+
+class LatencyTracker:
+    """Độ trễ quan sát được của các lời gọi LLM, mỗi model một mô hình EWMA riêng (thread-safe)."""
+
+    def __init__(self, alpha: float = 0.2, prior_base: float = 2.0, prior_seconds_per_1k_tokens: float = 3.0):
+        self.alpha = alpha
+        self.prior_base = prior_base
+        self.prior_rate = prior_seconds_per_1k_tokens / 1000
+        self._models: Dict[str, _LatencyModel] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model: str) -> _LatencyModel:
+        if model not in self._models:
+            self._models[model] = _LatencyModel(self.alpha, self.prior_base, self.prior_rate)
+        return self._models[model]
+
+    def observe(self, model: str, prompt_tokens: int, seconds: float) -> None:
+        with self._lock:
+            self._model(model).observe(prompt_tokens, seconds)
+
+    def predict(self, model: str, prompt_tokens: int) -> float:
+        """Độ trễ dự đoán (giây) của một lời gọi với prompt_tokens token prompt."""
+        with self._lock:
+            return self._model(model).predict(prompt_tokens)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {model: latency.to_dict() for model, latency in self._models.items()}
+
+
+llm_latency = LatencyTracker(config.LLM_LATENCY_EWMA_ALPHA, config.LLM_LATENCY_PRIOR_BASE,
+                             config.LLM_LATENCY_PRIOR_PER_1K_TOKENS)
+
+
+class SchedulePlan(NamedTuple):
+    """Cách chia chunk, mức song song và cách hợp nhất được chọn cho một transcript."""
+    chunk_tokens: int
+    chunk_overlap_tokens: int
+    max_concurrency: int
+    merge_strategy: str
+    reduce_fan_in: int
+    reducer: str
+    chunks: int
+    estimated_seconds: float
+    deadline_seconds: float
+    at_risk: bool
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+    def to_headers(self) -> dict:
+        return {
+            "X-Schedule-Chunk-Tokens": str(self.chunk_tokens),
+            "X-Schedule-Chunks": str(self.chunks),
+            "X-Schedule-Concurrency": str(self.max_concurrency),
+            "X-Schedule-Estimated-Seconds": f"{self.estimated_seconds:.2f}",
+            "X-Schedule-At-Risk": "1" if self.at_risk else "0"
+        }
+
+
+class DeadlineScheduler:
+    """
+    Chọn cách chia chunk, số lời gọi LLM song song và độ sâu hợp nhất để có biên bản trong deadline_seconds,
+    dựa trên độ dài transcript và độ trễ quan sát được của model (LatencyTracker).
+
+    Với mỗi kích thước chunk trong chunk_token_options, thời gian ước lượng gồm:
+      - map: số đợt ceil(số chunk / số lời gọi song song) nhân độ trễ dự đoán của một chunk, không nhỏ hơn
+        thời gian tối thiểu theo hạn mức request/token mỗi phút;
+      - reduce: với reducer 'llm', số tầng hợp nhất theo cây (log_fan_in của số chunk) nhân độ trễ dự đoán
+        của một lời gọi hợp nhất; với reducer 'rule', hợp nhất một lần bằng luật (không gọi LLM).
+    Lịch đầu tiên có thời gian ước lượng trong safety_factor * deadline được chọn, theo thứ tự hạ cấp:
+      1. kích thước gần preferred_chunk_tokens nhất, rồi lần lượt các kích thước lớn hơn (ít chunk, ít lời gọi hơn);
+      2. với reducer 'llm', lặp lại bước 1 với cây hợp nhất nông hơn (fan_in x2, x4), rồi với hợp nhất bằng luật;
+      3. nếu vẫn không kịp: kích thước lớn nhất (ít lời gọi nhất) với hợp nhất bằng luật, at_risk cho biết thời gian
+         ước lượng vượt deadline.
+    Kích thước nhỏ hơn kích thước ưa thích không bao giờ được chọn để kịp deadline.
+    Lịch đã chọn được lưu trong plan sau khi gọi plan_for.
+
+    Args:
+        deadline_seconds (float): Thời gian tối đa mong muốn (giây) để tạo biên bản.
+        max_concurrency (int): Số lời gọi LLM song song tối đa.
+        reducer (str): Reducer mong muốn khi hợp nhất theo cây ('rule' hoặc 'llm').
+        model (str): Tên model để tra độ trễ (mặc định LLM_MODEL_NAME).
+        tracker (LatencyTracker): Nguồn độ trễ quan sát được (mặc định llm_latency dùng chung).
+    """
+
+    def __init__(self, deadline_seconds: float, max_concurrency: int = 4, reducer: str = "rule",
+                 model: Optional[str] = None, tracker: Optional[LatencyTracker] = None,
+                 chunk_token_options: Sequence[int] = (500, 1000, 1500, 2500, 4000, 8000),
+                 preferred_chunk_tokens: int = 1500, overlap_tokens: int = 150, reduce_fan_in: int = 4,
+                 safety_factor: float = 0.8,
+                 requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        if deadline_seconds <= 0:
+            raise ValueError("deadline_seconds phải lớn hơn 0.")
+        self.deadline_seconds = deadline_seconds
+        self.max_concurrency = max(1, max_concurrency)
+        self.reducer = reducer
+        self.model = model or config.LLM_MODEL_NAME
+        self.tracker = tracker if tracker is not None else llm_latency
+        self.chunk_token_options = sorted(chunk_token_options)
+        self.preferred_chunk_tokens = preferred_chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.reduce_fan_in = max(2, reduce_fan_in)
+        self.safety_factor = safety_factor
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.plan: Optional[SchedulePlan] = None
+
+    def _candidate(self, transcript_tokens: int, chunk_tokens: int, prompt_overhead_tokens: int,
+                   reducer: str, fan_in: int) -> SchedulePlan:
+        overlap = min(self.overlap_tokens, chunk_tokens // 10)
+        if transcript_tokens <= chunk_tokens:
+            chunks = 1
+        else:
+            chunks = 1 + math.ceil((transcript_tokens - chunk_tokens) / (chunk_tokens - overlap))
+        prompt_tokens = prompt_overhead_tokens + min(chunk_tokens, transcript_tokens)
+        concurrency = min(self.max_concurrency, chunks)
+        seconds = math.ceil(chunks / concurrency) * self.tracker.predict(self.model, prompt_tokens)
+        # Hạn mức mỗi phút: không thể gửi nhanh hơn số request/token cho phép
+        if self.requests_per_minute:
+            seconds = max(seconds, 60.0 * (chunks - self.requests_per_minute) / self.requests_per_minute)
+        if self.tokens_per_minute:
+            seconds = max(seconds, 60.0 * (chunks * prompt_tokens - self.tokens_per_minute) / self.tokens_per_minute)
+
+        merge_strategy = "flat"
+        if reducer == "llm" and chunks > 1:
+            merge_strategy = "tree"
+            levels = math.ceil(math.log(chunks, fan_in))
+            # Mỗi lời gọi hợp nhất nhận khoảng fan_in biên bản, mỗi biên bản cỡ một phần ba chunk
+            reduce_tokens = prompt_overhead_tokens + fan_in * chunk_tokens // 3
+            seconds += levels * self.tracker.predict(self.model, reduce_tokens)
+        return SchedulePlan(chunk_tokens, overlap, concurrency, merge_strategy, fan_in,
+                            reducer if merge_strategy == "tree" else "rule", chunks, round(seconds, 3),
+                            self.deadline_seconds, False)
+
+    def plan_for(self, transcript_tokens: int, prompt_overhead_tokens: int = 0) -> SchedulePlan:
+        """
+        Chọn lịch cho một transcript transcript_tokens token.
+
+        Args:
+            transcript_tokens (int): Số token của transcript.
+            prompt_overhead_tokens (int): Số token cố định của prompt mỗi lời gọi (ngoài transcript).
+
+        Returns:
+            SchedulePlan: Lịch đã chọn (cũng được lưu trong self.plan).
+        """
+        budget = self.safety_factor * self.deadline_seconds
+        # Chỉ xét các kích thước nhỏ hơn transcript, cộng thêm một kích thước chứa cả transcript trong một chunk
+        options = [size for size in self.chunk_token_options if size < transcript_tokens]
+        options.append(min([size for size in self.chunk_token_options if size >= transcript_tokens]
+                           or [self.chunk_token_options[-1]]))
+        # Bắt đầu từ kích thước gần kích thước ưa thích nhất (cách đều thì lấy kích thước lớn hơn), hạ cấp về chunk lớn hơn
+        start = min(options, key=lambda size: (abs(size - self.preferred_chunk_tokens), -size))
+        sizes = [size for size in options if size >= start]
+        levels = [("rule", self.reduce_fan_in)]
+        if self.reducer == "llm":
+            levels = [("llm", self.reduce_fan_in * factor) for factor in (1, 2, 4)] + levels
+        plan = None
+        for reducer, fan_in in levels:
+            for size in sizes:
+                candidate = self._candidate(transcript_tokens, size, prompt_overhead_tokens, reducer, fan_in)
+                if candidate.estimated_seconds <= budget:
+                    plan = candidate
+                    break
+            if plan is not None:
+                break
+        if plan is None:
+            # Không kịp: ít lời gọi nhất (chunk lớn nhất, hợp nhất bằng luật)
+            plan = self._candidate(transcript_tokens, sizes[-1], prompt_overhead_tokens, "rule", self.reduce_fan_in)
+            plan = plan._replace(at_risk=plan.estimated_seconds > self.deadline_seconds)
+        self.plan = plan
+        return plan
+
+
+def get_deadline_scheduler(deadline_seconds: Optional[float] = None, max_concurrency: Optional[int] = None,
+                           reducer: str = "rule") -> Optional[DeadlineScheduler]:
+    """
+    Tạo DeadlineScheduler theo config, hoặc None nếu không có deadline (deadline_seconds <= 0).
+    """
+    deadline_seconds = config.SUMMARY_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    if not deadline_seconds or deadline_seconds <= 0:
+        return None
+    return DeadlineScheduler(
+        deadline_seconds,
+        max_concurrency=config.LLM_MAX_CONCURRENCY if max_concurrency is None else max_concurrency,
+        reducer=reducer,
+        chunk_token_options=config.SCHEDULER_CHUNK_TOKENS,
+        preferred_chunk_tokens=config.CHUNK_MAX_TOKENS,
+        overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+        reduce_fan_in=config.REDUCE_FAN_IN,
+        safety_factor=config.SCHEDULER_SAFETY_FACTOR,
+        requests_per_minute=config.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute=config.LLM_TOKENS_PER_MINUTE
+    )
@@ -0,0 +1,251 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Định dạng file (little-endian):
+#   header: magic(8) | số đoạn n (u64) | số byte text (u64) | số byte metadata (u64)
+#   start (f64 x n) | end (f64 x n) | offset (u64 x n+1) | text UTF-8 | metadata JSON
+MAGIC = b"MMGSEG01"
+_HEADER = struct.Struct("<8sQQQ")
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+class SegmentStore(Sequence):
+    """
+    Danh sách các đoạn transcript lưu gọn: thời gian bắt đầu/kết thúc trong hai mảng float64,
+    toàn bộ text trong một buffer UTF-8 (mỗi đoạn kết thúc bằng '\\n') với mảng offset.
+
+    - Truy cập store[i] hoặc duyệt store trả về dict {'start', 'end', 'text'} như trước đây,
+      nên có thể dùng thay cho list các dict ở mọi chỗ chỉ đọc transcript.
+    - store[a:b] và between(start, end) trả về view dùng chung bộ nhớ (không sao chép).
+    - Tìm đoạn theo thời gian bằng tìm kiếm nhị phân (các đoạn được sắp theo thời gian).
+    - save()/load() dùng định dạng nhị phân gọn, load() có thể memory-map file thay vì đọc vào bộ nhớ.
+
+    Store tạo bằng SegmentStore() có thể thêm đoạn bằng append()/extend(); view và store nạp từ file là chỉ đọc.
+    """
+
+    def __init__(self):
+        self._starts = array("d")
+        self._ends = array("d")
+        self._offsets = array("Q", [0])
+        self._buffer = bytearray()
+        self._writable = True
+
+    @classmethod
+    def _view(cls, starts, ends, offsets, buffer) -> "SegmentStore":
+        store = cls.__new__(cls)
+        store._starts = starts
+        store._ends = ends
+        store._offsets = offsets  # offset tuyệt đối trong buffer gốc, len = số đoạn + 1
+        store._buffer = buffer
+        store._writable = False
+        return store
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Union[dict, object]]) -> "SegmentStore":
+        """Tạo store từ các dict {'start', 'end', 'text'} hoặc các đoạn có thuộc tính start/end/text."""
+        store = cls()
+        store.extend(segments)
+        return store
+
+    @classmethod
+    def concat(cls, stores: Iterable["SegmentStore"]) -> "SegmentStore":
+        """Nối nhiều store (ví dụ kết quả của các shard) thành một store mới."""
+        result = cls()
+        for store in stores:
+            result._append_store(store)
+        return result
+
+    # ---------------------
+    # Thêm dữ liệu
+    # ---------------------
+    def append(self, start: float, end: float, text: str) -> None:
+        if not self._writable:
+            raise TypeError("SegmentStore này chỉ đọc (view hoặc nạp từ file).")
+        self._starts.append(start)
+        self._ends.append(end)
+        self._buffer += text.encode("utf-8") + b"\n"
+        self._offsets.append(len(self._buffer))
+
+    def extend(self, segments: Iterable[Union[dict, object]]) -> None:
+        for segment in segments:
+            if isinstance(segment, dict):
+                self.append(segment["start"], segment["end"], segment["text"])
+            else:
+                self.append(segment.start, segment.end, segment.text)
+
+    def _append_store(self, other: "SegmentStore") -> None:
+        if not self._writable:
+            raise TypeError("SegmentStore này chỉ đọc (view hoặc nạp từ file).")
+        if not len(other):
+            return
+        self._starts.frombytes(memoryview(other._starts).tobytes())
+        self._ends.frombytes(memoryview(other._ends).tobytes())
+        base = len(self._buffer) - other._offsets[0]
+        self._buffer += memoryview(other._buffer)[other._offsets[0]:other._offsets[-1]]
+        self._offsets.extend(offset + base for offset in memoryview(other._offsets)[1:])
+
+    # ---------------------
+    # Đọc dữ liệu
+    # ---------------------
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def text(self, index: int) -> str:
+        """Nội dung của đoạn thứ index."""
+        return str(memoryview(self._buffer)[self._offsets[index]:self._offsets[index + 1] - 1], "utf-8")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("SegmentStore chỉ hỗ trợ slice liên tục (step = 1).")
+            stop = max(start, stop)
+            return self._view(memoryview(self._starts)[start:stop], memoryview(self._ends)[start:stop],
+                              memoryview(self._offsets)[start:stop + 1], self._buffer)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("SegmentStore index out of range")
+        return {"start": self._starts[index], "end": self._ends[index], "text": self.text(index)}
+
+    def __iter__(self) -> Iterator[dict]:
+        buffer = memoryview(self._buffer)
+        offsets = self._offsets
+        for i, (start, end) in enumerate(zip(self._starts, self._ends)):
+            yield {"start": start, "end": end, "text": str(buffer[offsets[i]:offsets[i + 1] - 1], "utf-8")}
+
+    def to_list(self) -> List[dict]:
+        """Chuyển thành list các dict (ví dụ để trả về JSON)."""
+        return list(self)
+
+    def to_text(self) -> str:
+        """Toàn bộ transcript, mỗi đoạn trên một dòng (giải mã một lần từ buffer, không ghép từng đoạn)."""
+        if not len(self):
+            return ""
+        return str(memoryview(self._buffer)[self._offsets[0]:self._offsets[-1] - 1], "utf-8")
+
+    @property
+    def start_time(self) -> Optional[float]:
+        return self._starts[0] if len(self) else None
+
+    @property
+    def end_time(self) -> Optional[float]:
+        return self._ends[-1] if len(self) else None
+
+    # ---------------------
+    # Tìm kiếm theo thời gian và nội dung
+    # ---------------------
+    def index_range(self, start: float, end: float) -> Tuple[int, int]:
+        """Chỉ số [lo, hi) của các đoạn giao với khoảng thời gian [start, end) (tìm kiếm nhị phân)."""
+        lo = bisect_right(self._ends, start)
+        hi = bisect_left(self._starts, end, lo)
+        return lo, max(lo, hi)
+
+    def between(self, start: float, end: float) -> "SegmentStore":
+        """View các đoạn giao với khoảng thời gian [start, end)."""
+        lo, hi = self.index_range(start, end)
+        return self[lo:hi]
+
+    def locate(self, phrase: str) -> Optional[Tuple[float, float]]:
+        """
+        Khoảng thời gian (start, end) của lần xuất hiện đầu tiên của phrase trong transcript
+        (so khớp chính xác), hoặc None nếu không tìm thấy.
+        """
+        if not len(self) or not phrase:
+            return None
+        needle = phrase.encode("utf-8")
+        base = self._offsets[0]
+        position = bytes(memoryview(self._buffer)[base:self._offsets[-1]]).find(needle)
+        if position < 0:
+            return None
+        position += base
+        first = bisect_right(self._offsets, position) - 1
+        last = bisect_left(self._offsets, position + len(needle)) - 1
+        return self._starts[first], self._ends[max(first, last)]
+
+    # ---------------------
+    # Lưu và nạp file
+    # ---------------------
+    def to_bytes(self, metadata: Optional[dict] = None) -> bytes:
+        """Tuần tự hóa store (kèm metadata JSON tùy chọn) theo định dạng file của SegmentStore."""
+        count = len(self)
+        base = self._offsets[0]
+        text = memoryview(self._buffer)[base:self._offsets[-1]]
+        meta = json.dumps(metadata, ensure_ascii=False).encode("utf-8") if metadata is not None else b""
+        starts = array("d", memoryview(self._starts).tobytes())
+        ends = array("d", memoryview(self._ends).tobytes())
+        offsets = array("Q", memoryview(self._offsets).tobytes())
+        if base:
+            offsets = array("Q", (offset - base for offset in offsets))
+        if not _NATIVE_LITTLE_ENDIAN:
+            for values in (starts, ends, offsets):
+                values.byteswap()
+        return b"".join((_HEADER.pack(MAGIC, count, len(text), len(meta)),
+                         starts.tobytes(), ends.tobytes(), offsets.tobytes(), text, meta))
+
+    def save(self, file: Union[str, BinaryIO], metadata: Optional[dict] = None) -> None:
+        """Ghi store ra file (đường dẫn hoặc file object mở ở chế độ nhị phân)."""
+        if isinstance(file, str):
+            with open(file, "wb") as f:
+                f.write(self.to_bytes(metadata))
+        else:
+            file.write(self.to_bytes(metadata))
+
+    @classmethod
+    def from_bytes(cls, data) -> Tuple["SegmentStore", Optional[dict]]:
+        """Đọc store và metadata từ dữ liệu theo định dạng file (bytes, mmap...), không sao chép mảng."""
+        view = memoryview(data)
+        magic, count, text_size, meta_size = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Không phải file SegmentStore.")
+        pos = _HEADER.size
+        arrays = []
+        for fmt, length in (("d", count), ("d", count), ("Q", count + 1)):
+            part = view[pos:pos + 8 * length]
+            if len(part) != 8 * length:
+                raise ValueError("File SegmentStore bị cắt cụt.")
+            if _NATIVE_LITTLE_ENDIAN:
+                arrays.append(part.cast(fmt))
+            else:
+                values = array(fmt, part.tobytes())
+                values.byteswap()
+                arrays.append(values)
+            pos += 8 * length
+        text = view[pos:pos + text_size]
+        meta = bytes(view[pos + text_size:pos + text_size + meta_size])
+        if len(text) != text_size or len(meta) != meta_size:
+            raise ValueError("File SegmentStore bị cắt cụt.")
+        # offset trong file tính từ đầu phần text, nên buffer của store là view bắt đầu tại phần text
+        store = cls._view(arrays[0], arrays[1], arrays[2], text)
+        return store, (json.loads(meta) if meta else None)
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True) -> Tuple["SegmentStore", Optional[dict]]:
+        """
+        Nạp store từ file. Với use_mmap=True, file được memory-map (chỉ đọc): các mảng thời gian và text
+        được đọc trực tiếp từ page cache khi cần, không nạp toàn bộ vào bộ nhớ của process.
+        """
+        with open(path, "rb") as f:
+            if not use_mmap or f.seek(0, 2) == 0:
+                f.seek(0)
+                return cls.from_bytes(f.read())
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_bytes(data)
+
+    def __reduce__(self):
+        # Tuần tự hóa qua định dạng file khi gửi giữa các process (memoryview không pickle được)
+        return _store_from_bytes, (self.to_bytes(),)
+
+    def __repr__(self) -> str:
+        return f"SegmentStore(segments={len(self)}, start={self.start_time}, end={self.end_time})"
+
+
+def _store_from_bytes(data: bytes) -> SegmentStore:
+    return SegmentStore.from_bytes(data)[0]
+
@@ -1,35 +1,89 @@
-from langchain_openai import ChatOpenAI
-from langchain.output_parsers import PydanticOutputParser
-from langchain_core.prompts import PromptTemplate
-from openai import api_key
-
 from app.modules.schema import MeetingMinutes
-from app.config import OPENAI_API_KEY
+from app.modules.rate_limiter import RateLimiter
+from app.modules.tokenizer import count_tokens
+from app.modules.chunking import split_segments_by_tokens, split_transcript_by_tokens
+from app.modules.dedup import NearDuplicateIndex
+from app.modules.segment_store import SegmentStore
+from app.modules.salience import SalienceFilter
+from app.modules.scheduler import DeadlineScheduler, SchedulePlan, llm_latency
+from app.modules.checkpoint import JobCheckpoint
+from app.modules.llm_cache import CacheUsage, get_llm_cache, make_cache_key, schema_version
+from app.modules.metrics import CACHE_LOOKUPS, CHUNKS, LLM_CALLS, LLM_TOKENS, emit_event, span
+from app.config import (
+    OPENAI_API_KEY, LLM_MODEL_NAME, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, REDUCE_MAX_ITEMS,
+    LLM_GLOBAL_CONCURRENCY, LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_TIMEOUT, MERGE_DEDUP_THRESHOLD, LLM_OUTPUT_MODE
+)
+import json
 import os
-from typing import List
+import re
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Union
 
 # Thiết lập API key cho OpenAI
 # os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
+# Rate limiter dùng chung cho toàn process (hạn mức tính theo API key)
+default_rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+
+# Giới hạn số lời gọi LLM đồng thời của cả process
+_llm_semaphore = threading.BoundedSemaphore(LLM_GLOBAL_CONCURRENCY) if LLM_GLOBAL_CONCURRENCY > 0 else None
+
+
+def _create_openai_llm():
+    # LangChain/OpenAI chỉ được import khi thực sự gọi LLM lần đầu
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+    # Client HTTP dùng chung, giữ kết nối keep-alive tới API giữa các lời gọi
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS),
+        timeout=LLM_HTTP_TIMEOUT
+    )
+    # Khởi tạo LLM (ở đây dùng model "gpt-4o-mini", temperature=0 để output ổn định)
+    return ChatOpenAI(model_name=LLM_MODEL_NAME, temperature=0, http_client=http_client)
+
 
-def generate_meeting_minutes(transcript: str) -> MeetingMinutes:
+_llm_factory: Callable[[], Any] = _create_openai_llm
+_llm_instance: Any = None
+_llm_api_key: Optional[str] = None
+_llm_lock = threading.Lock()
+
+
+def set_llm_factory(factory: Optional[Callable[[], Any]]) -> None:
     """
-    Nhận transcript của cuộc họp và sử dụng LLM thông qua LangChain để trích xuất thông tin
-    và tạo biên bản cuộc họp dưới dạng JSON theo schema MeetingMinutes.
+    Thay hàm tạo LLM dùng cho trích xuất và hợp nhất (ví dụ: model stub trong benchmark).
+    Truyền None để quay lại ChatOpenAI mặc định.
+    """
+    global _llm_factory, _llm_instance
+    with _llm_lock:
+        _llm_factory = factory if factory is not None else _create_openai_llm
+        _llm_instance = None
 
-    Args:
-        transcript (str): Nội dung transcript của cuộc họp.
 
-    Returns:
-        MeetingMinutes: Object chứa biên bản cuộc họp với định dạng JSON chuẩn.
+def get_llm():
     """
-    # Sử dụng PydanticOutputParser để kiểm soát định dạng output
-    parser = PydanticOutputParser(pydantic_object=MeetingMinutes)
+    Trả về chat model dùng chung của process (tạo ở lần gọi đầu tiên và dùng lại cho mọi request,
+    để kết nối HTTP được tái sử dụng). Model được tạo lại nếu OPENAI_API_KEY thay đổi.
+    """
+    global _llm_instance, _llm_api_key
+    api_key = os.environ.get("OPENAI_API_KEY")
+    with _llm_lock:
+        if _llm_instance is None or api_key != _llm_api_key:
+            _llm_instance = _llm_factory()
+            _llm_api_key = api_key
+        return _llm_instance
 
-    # Escape các dấu ngoặc nhọn để không bị trùng với template formatter
-    format_instructions = parser.get_format_instructions().replace("{", "{{").replace("}", "}}")
 
-    prompt_template = """
+# Phiên bản schema MeetingMinutes, là một phần của khóa cache
+MEETING_MINUTES_SCHEMA_VERSION = schema_version(MeetingMinutes)
+
+MEETING_MINUTES_PROMPT_TEMPLATE = """
 Bạn là trợ lý AI thông minh, nhiệm vụ của bạn là đọc transcript cuộc họp dưới đây và trích xuất thông tin để tạo biên bản cuộc họp.
 Nếu một mục không được đề cập, hãy trả về giá trị null.
 Đầu ra phải tuân thủ đúng định dạng JSON với các khóa theo thứ tự như sau:
@@ -60,85 +114,529 @@ Transcript cần xử lý:
 {transcript}
 """
 
+
+@lru_cache(maxsize=None)
+def build_meeting_minutes_prompt() -> tuple:
+    """
+    Tạo PydanticOutputParser và PromptTemplate dùng để trích xuất MeetingMinutes từ transcript.
+    Kết quả được tạo một lần và dùng lại cho mọi lời gọi.
+
+    Returns:
+        tuple: (parser, prompt)
+    """
+    from langchain.output_parsers import PydanticOutputParser
+    from langchain_core.prompts import PromptTemplate
+
+    # Sử dụng PydanticOutputParser để kiểm soát định dạng output
+    parser = PydanticOutputParser(pydantic_object=MeetingMinutes)
+
+    # Escape các dấu ngoặc nhọn để không bị trùng với template formatter
+    format_instructions = parser.get_format_instructions().replace("{", "{{").replace("}", "}}")
+
     prompt = PromptTemplate(
-        template=prompt_template,
+        template=MEETING_MINUTES_PROMPT_TEMPLATE,
         input_variables=["transcript"],
         partial_variables={"format_instructions": format_instructions}
     )
+    return parser, prompt
 
-    # Khởi tạo LLM (ở đây dùng model "gpt-4o-mini", temperature=0 để output ổn định)
-    llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0)
+
+# Prompt rút gọn cho chế độ 'structured': schema được gửi một lần dưới dạng định nghĩa hàm (tool),
+# nên prompt không cần format instructions và output mẫu
+COMPACT_MEETING_MINUTES_PROMPT_TEMPLATE = """
+Đọc transcript cuộc họp dưới đây và trích xuất biên bản cuộc họp bằng cách gọi hàm MeetingMinutes.
+Chỉ dùng thông tin có trong transcript; mục không được đề cập thì để null.
+noi_dung_thao_luan có dạng {{chủ đề: [các ý chính]}}.
+
+Transcript cần xử lý:
+{transcript}
+"""
+
+OUTPUT_MODES = ("structured", "parser")
+
+
+def _output_mode(output_mode: Optional[str] = None) -> str:
+    mode = output_mode or LLM_OUTPUT_MODE
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"output_mode phải là một trong: {', '.join(OUTPUT_MODES)}.")
+    return mode
+
+
+@lru_cache(maxsize=None)
+def build_compact_prompt():
+    """Tạo (một lần) PromptTemplate rút gọn dùng cho chế độ 'structured'."""
+    from langchain_core.prompts import PromptTemplate
+
+    return PromptTemplate(template=COMPACT_MEETING_MINUTES_PROMPT_TEMPLATE, input_variables=["transcript"])
+
+
+@lru_cache(maxsize=None)
+def meeting_minutes_tool() -> dict:
+    """
+    Định nghĩa hàm (OpenAI tool) cho schema MeetingMinutes ở dạng gọn: Optional[X] được viết thành kiểu
+    [X, null] thay cho anyOf, bỏ title và default, giữ mô tả của từng trường (định dạng ngày, giờ...).
+    Kết quả gọi hàm được kiểm tra lại bằng MeetingMinutes.
+    """
+    schema = MeetingMinutes.model_json_schema()
+    properties = {}
+    for name, field in schema["properties"].items():
+        options = field.get("anyOf", [field])
+        prop = dict(next((option for option in options if option.get("type") != "null"), options[0]))
+        prop.pop("title", None)
+        if len(options) > 1 and "type" in prop:
+            prop["type"] = [prop["type"], "null"]
+        if field.get("description"):
+            prop["description"] = field["description"]
+        properties[name] = prop
+    return {
+        "type": "function",
+        "function": {
+            "name": "MeetingMinutes",
+            "description": "Biên bản cuộc họp trích xuất từ transcript",
+            "parameters": {"type": "object", "properties": properties}
+        }
+    }
+
+
+@lru_cache(maxsize=None)
+def _tool_schema_tokens() -> int:
+    return count_tokens(json.dumps(meeting_minutes_tool(), ensure_ascii=False, separators=(",", ":")),
+                        LLM_MODEL_NAME)
+
+
+_structured_llm: tuple = (None, None)
+
+
+def get_structured_llm():
+    """
+    Trả về model dùng chung đã gắn hàm MeetingMinutes (function calling, kèm message gốc) để trích xuất
+    có cấu trúc, tạo lại khi get_llm() trả về model khác. Trả về None nếu model không hỗ trợ.
+    """
+    global _structured_llm
+    llm = get_llm()
+    with _llm_lock:
+        if _structured_llm[0] is not llm:
+            try:
+                runnable = llm.with_structured_output(meeting_minutes_tool(), method="function_calling",
+                                                      include_raw=True)
+            except (AttributeError, NotImplementedError):
+                runnable = None
+            _structured_llm = (llm, runnable)
+        return _structured_llm[1]
+
+
+@lru_cache(maxsize=None)
+def _prompt_overhead_tokens(output_mode: str = "parser") -> int:
+    if output_mode == "structured":
+        return count_tokens(build_compact_prompt().format(transcript=""), LLM_MODEL_NAME) + _tool_schema_tokens()
+    _, prompt = build_meeting_minutes_prompt()
+    return count_tokens(prompt.format(transcript=""), LLM_MODEL_NAME)
+
+
+def estimate_prompt_tokens(transcript: str, output_mode: Optional[str] = None) -> int:
+    """Ước lượng số token của prompt gửi tới LLM cho một đoạn transcript (theo chế độ output)."""
+    return _prompt_overhead_tokens(_output_mode(output_mode)) + count_tokens(transcript, LLM_MODEL_NAME)
+
+
+def _cache_key(transcript: str) -> str:
+    template = (COMPACT_MEETING_MINUTES_PROMPT_TEMPLATE if _output_mode() == "structured"
+                else MEETING_MINUTES_PROMPT_TEMPLATE)
+    return make_cache_key(transcript, template, LLM_MODEL_NAME, MEETING_MINUTES_SCHEMA_VERSION)
+
+
+def lookup_cached_minutes(transcript: str, cache_usage: Optional[CacheUsage] = None) -> Optional[MeetingMinutes]:
+    """
+    Tìm kết quả trích xuất đã cache cho transcript, khóa theo nội dung transcript,
+    prompt, tên model và phiên bản schema. Trả về None nếu cache bị tắt hoặc không có.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return None
+    cached = cache.get(_cache_key(transcript))
+    CACHE_LOOKUPS.inc(cache="llm", result="hit" if cached is not None else "miss")
+    if cache_usage is not None:
+        cache_usage.record(cached is not None)
+    return MeetingMinutes.model_validate_json(cached) if cached is not None else None
+
+
+def store_cached_minutes(transcript: str, meeting_minutes: MeetingMinutes) -> None:
+    """Lưu kết quả trích xuất của transcript vào cache (nếu cache được bật)."""
+    cache = get_llm_cache()
+    if cache is not None:
+        cache.set(_cache_key(transcript), meeting_minutes.model_dump_json())
+
+
+def _invoke_llm(messages, purpose: str, runnable=None):
+    """
+    Gọi LLM (hoặc runnable có cấu trúc từ get_structured_llm), ghi nhận thời gian, số lời gọi,
+    số token prompt/completion và độ trễ của model.
+    """
+    llm = get_llm()
+    target = runnable if runnable is not None else llm
+    if _llm_semaphore is not None:
+        with span("llm_queue_wait"):
+            _llm_semaphore.acquire()
+    try:
+        with span("llm_call"):
+            start = time.perf_counter()
+            response = target.invoke(messages)
+            seconds = time.perf_counter() - start
+    finally:
+        if _llm_semaphore is not None:
+            _llm_semaphore.release()
+    LLM_CALLS.inc(purpose=purpose)
+    # Runnable có cấu trúc trả về {"raw": message, "parsed": ..., "parsing_error": ...}
+    message = response["raw"] if isinstance(response, dict) else response
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    if prompt_tokens is None:
+        prompt_tokens = count_tokens("\n".join(getattr(m, "content", str(m)) for m in messages), LLM_MODEL_NAME)
+        if runnable is not None:
+            prompt_tokens += _tool_schema_tokens()
+    completion_tokens = usage.get("output_tokens")
+    if completion_tokens is None:
+        completion = message.content or ""
+        for call in getattr(message, "tool_calls", None) or ():
+            completion += json.dumps(call.get("args", {}), ensure_ascii=False)
+        completion_tokens = count_tokens(completion, LLM_MODEL_NAME)
+    LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, kind="completion")
+    # Độ trễ theo model, dùng cho lập lịch theo deadline
+    llm_latency.observe(getattr(llm, "model_name", None) or LLM_MODEL_NAME, prompt_tokens, seconds)
+    return response
+
+
+def _extract_with_parser(transcript: str) -> MeetingMinutes:
+    parser, prompt = build_meeting_minutes_prompt()
 
     formatted_prompt = prompt.format_prompt(transcript=transcript)
-    response = llm.invoke(formatted_prompt.to_messages())
+    response = _invoke_llm(formatted_prompt.to_messages(), "extract")
 
     # Phân tích output theo schema MeetingMinutes
-    meeting_minutes = parser.parse(response.content)
+    with span("parse"):
+        meeting_minutes = parser.parse(response.content)
     return meeting_minutes
 
 
-def merge_meeting_minutes(minutes_list: List[MeetingMinutes]) -> MeetingMinutes:
+def extract_meeting_minutes(transcript: str, output_mode: Optional[str] = None) -> MeetingMinutes:
     """
-    Hợp nhất danh sách các object MeetingMinutes thành một object duy nhất.
-    - Với các trường kiểu list, sẽ lấy hợp các phần tử (unique).
-    - Với trường 'noi_dung_thao_luan' (dict), hợp nhất các key và union giá trị của các list.
-    - Với các trường kiểu string, nếu có nhiều giá trị khác nhau, sẽ nối chúng lại bằng dấu chấm phẩy.
+    Gọi LLM để trích xuất MeetingMinutes từ transcript (không qua cache).
 
     Args:
-        minutes_list (List[MeetingMinutes]): Danh sách các MeetingMinutes cần hợp nhất.
+        transcript (str): Nội dung transcript.
+        output_mode (str): 'structured' (function calling, prompt rút gọn) hoặc 'parser' (prompt đầy đủ và
+            PydanticOutputParser). Mặc định theo LLM_OUTPUT_MODE. Ở chế độ 'structured', nếu model không hỗ trợ
+            function calling hoặc kết quả gọi hàm không hợp lệ thì trích xuất lại bằng chế độ 'parser'.
 
     Returns:
-        MeetingMinutes: Object hợp nhất.
+        MeetingMinutes: Kết quả trích xuất.
     """
-    merged = {}
-    # Lấy danh sách các key từ schema MeetingMinutes
-    for key in MeetingMinutes.model_fields.keys():
-        # Các trường kiểu list
-        if key in ["thanh_vien_tham_du", "chuong_trinh_nghi_su", "cac_quyet_dinh", "tai_lieu_dinh_kem"]:
-            union_set = set()
-            for m in minutes_list:
-                value = getattr(m, key)
-                if value:
-                    union_set.update(value)
-            merged[key] = list(union_set) if union_set else None
+    if _output_mode(output_mode) == "parser":
+        return _extract_with_parser(transcript)
 
-        # Trường dạng dict: 'noi_dung_thao_luan'
-        elif key == "noi_dung_thao_luan":
-            merged_sub = {}
-            for m in minutes_list:
-                subdict = getattr(m, key)
-                if subdict:
-                    for subkey, sublist in subdict.items():
-                        if subkey in merged_sub:
-                            merged_sub[subkey].update(sublist)
-                        else:
-                            merged_sub[subkey] = set(sublist)
-            merged[key] = {k: list(v) for k, v in merged_sub.items()} if merged_sub else None
-
-        # Các trường dạng string
-        else:
-            union_set = set()
-            for m in minutes_list:
-                value = getattr(m, key)
-                if value:
-                    union_set.add(value)
+    runnable = get_structured_llm()
+    if runnable is None:
+        return _extract_with_parser(transcript)
+
+    formatted_prompt = build_compact_prompt().format_prompt(transcript=transcript)
+    response = _invoke_llm(formatted_prompt.to_messages(), "extract", runnable)
+    with span("parse"):
+        try:
+            if response.get("parsed") is not None:
+                return MeetingMinutes.model_validate(response["parsed"])
+            error = response.get("parsing_error") or "model không gọi hàm MeetingMinutes"
+        except ValueError as e:
+            error = e
+    emit_event("structured_output_fallback", error=str(error))
+    return _extract_with_parser(transcript)
+
+
+def generate_meeting_minutes(transcript: str, use_cache: bool = True,
+                             cache_usage: Optional[CacheUsage] = None) -> MeetingMinutes:
+    """
+    Nhận transcript của cuộc họp và sử dụng LLM thông qua LangChain để trích xuất thông tin
+    và tạo biên bản cuộc họp dưới dạng JSON theo schema MeetingMinutes.
+    Kết quả được cache trên đĩa; khi cache hit sẽ không gọi tới LLM.
+
+    Args:
+        transcript (str): Nội dung transcript của cuộc họp.
+        use_cache (bool): Dùng cache kết quả trích xuất (mặc định True).
+        cache_usage (CacheUsage): Bộ đếm hit/miss cache của request hiện tại (tùy chọn).
+
+    Returns:
+        MeetingMinutes: Object chứa biên bản cuộc họp với định dạng JSON chuẩn.
+    """
+    if use_cache:
+        cached = lookup_cached_minutes(transcript, cache_usage)
+        if cached is not None:
+            return cached
+
+    meeting_minutes = extract_meeting_minutes(transcript)
+    if use_cache:
+        store_cached_minutes(transcript, meeting_minutes)
+    return meeting_minutes
+
+
+LIST_FIELDS = ["thanh_vien_tham_du", "chuong_trinh_nghi_su", "cac_quyet_dinh", "tai_lieu_dinh_kem"]
+# Các danh sách được gộp cả ý gần trùng (cùng với chủ đề và các ý của noi_dung_thao_luan)
+DEDUP_FIELDS = ["chuong_trinh_nghi_su", "cac_quyet_dinh"]
+
+
+def _canonicalizer(threshold: float) -> Callable[[str], str]:
+    """Hàm ánh xạ mỗi ý về ý đại diện của nhóm gần trùng (threshold <= 0: giữ nguyên)."""
+    if threshold <= 0:
+        return lambda value: value
+    return NearDuplicateIndex(threshold).canonical
+
+
+class MeetingMinutesAccumulator:
+    """
+    Trạng thái hợp nhất tăng dần của nhiều MeetingMinutes: có thể thêm từng kết quả bằng add()
+    và lấy kết quả hợp nhất hiện tại bằng result() bất cứ lúc nào (cùng quy tắc với merge_meeting_minutes).
+    Các ý gần trùng trong DEDUP_FIELDS và noi_dung_thao_luan (kể cả tên chủ đề) được gộp về ý xuất hiện
+    đầu tiên nếu dedup_threshold > 0.
+    """
+
+    def __init__(self, dedup_threshold: float = MERGE_DEDUP_THRESHOLD):
+        # Dùng dict làm tập hợp có thứ tự để kết quả ổn định giữa các lần chạy
+        self._lists = {key: {} for key in LIST_FIELDS}
+        self._discussion = {}
+        self._dedup_threshold = dedup_threshold
+        self._canonical = {key: _canonicalizer(dedup_threshold if key in DEDUP_FIELDS else 0)
+                           for key in LIST_FIELDS}
+        self._topic_canonical = _canonicalizer(dedup_threshold)
+        self._point_canonical = {}
+        self._strings = {key: {} for key in MeetingMinutes.model_fields
+                         if key not in LIST_FIELDS and key != "noi_dung_thao_luan"}
+        self.count = 0
+
+    def add(self, minutes: MeetingMinutes) -> None:
+        for key, union_set in self._lists.items():
+            value = getattr(minutes, key)
+            if value:
+                canonical = self._canonical[key]
+                union_set.update(dict.fromkeys(canonical(item) for item in value))
+
+        subdict = minutes.noi_dung_thao_luan
+        if subdict:
+            for subkey, sublist in subdict.items():
+                topic = self._topic_canonical(subkey)
+                if topic not in self._discussion:
+                    self._discussion[topic] = {}
+                    self._point_canonical[topic] = _canonicalizer(self._dedup_threshold)
+                canonical = self._point_canonical[topic]
+                self._discussion[topic].update(dict.fromkeys(canonical(point) for point in sublist))
+
+        for key, union_set in self._strings.items():
+            value = getattr(minutes, key)
+            if value:
+                union_set[value] = None
+        self.count += 1
+
+    def result(self) -> MeetingMinutes:
+        merged = {}
+        for key, union_set in self._lists.items():
+            merged[key] = list(union_set) if union_set else None
+        merged["noi_dung_thao_luan"] = (
+            {k: list(v) for k, v in self._discussion.items()} if self._discussion else None
+        )
+        for key, union_set in self._strings.items():
             if not union_set:
                 merged[key] = None
             elif len(union_set) == 1:
-                merged[key] = union_set.pop()
+                merged[key] = next(iter(union_set))
             else:
                 # Nối các giá trị khác nhau bằng dấu chấm phẩy
                 merged[key] = "; ".join(sorted(union_set))
+        return MeetingMinutes(**merged)
+
+
+def merge_meeting_minutes(minutes_list: List[MeetingMinutes]) -> MeetingMinutes:
+    """
+    Hợp nhất danh sách các object MeetingMinutes thành một object duy nhất.
+    - Với các trường kiểu list, sẽ lấy hợp các phần tử (unique, giữ thứ tự xuất hiện đầu tiên).
+    - Với trường 'noi_dung_thao_luan' (dict), hợp nhất các key và union giá trị của các list.
+    - Các ý gần trùng (ví dụ do chunk chồng lấn) trong chuong_trinh_nghi_su, cac_quyet_dinh và
+      noi_dung_thao_luan được gộp lại nếu MERGE_DEDUP_THRESHOLD > 0 (mặc định tắt); ý khác nhau ở từ phủ định,
+      tên riêng hoặc con số không bao giờ bị gộp.
+    - Với các trường kiểu string, nếu có nhiều giá trị khác nhau, sẽ nối chúng lại bằng dấu chấm phẩy.
+
+    Args:
+        minutes_list (List[MeetingMinutes]): Danh sách các MeetingMinutes cần hợp nhất.
+
+    Returns:
+        MeetingMinutes: Object hợp nhất.
+    """
+    accumulator = MeetingMinutesAccumulator()
+    for m in minutes_list:
+        accumulator.add(m)
+    return accumulator.result()
+
+REDUCE_PROMPT_TEMPLATE = """
+Bạn là trợ lý AI thông minh. Dưới đây là các biên bản cuộc họp (dạng JSON) được trích xuất từ các phần liên tiếp
+của cùng một cuộc họp. Hãy hợp nhất chúng thành một biên bản duy nhất:
+- Gộp các ý trùng lặp hoặc diễn đạt lại cùng một nội dung thành một ý.
+- Mỗi danh sách (và mỗi chủ đề trong noi_dung_thao_luan) giữ tối đa {max_items} ý quan trọng nhất.
+- Không thêm thông tin không có trong các biên bản đầu vào. Nếu một mục không có, trả về null.
+Đầu ra phải tuân thủ đúng định dạng JSON sau:
+{format_instructions}
+
+Các biên bản cần hợp nhất:
+{minutes_json}
+"""
+
+
+def _rank_by_frequency(values: List[str], max_items: int, dedup_threshold: float = 0) -> List[str]:
+    """
+    Giữ tối đa max_items phần tử xuất hiện nhiều nhất, hòa thì ưu tiên phần tử xuất hiện trước.
+    Nếu dedup_threshold > 0, các phần tử gần trùng được đếm chung cho phần tử xuất hiện đầu tiên.
+    """
+    canonical = _canonicalizer(dedup_threshold)
+    counts = {}
+    for value in values:
+        value = canonical(value)
+        counts[value] = counts.get(value, 0) + 1
+    ranked = sorted(counts, key=lambda v: -counts[v])  # sorted ổn định: giữ thứ tự xuất hiện khi hòa
+    return ranked[:max_items]
+
+
+def rule_reduce_meeting_minutes(group: List[MeetingMinutes], max_items: int = 15) -> MeetingMinutes:
+    """
+    Hợp nhất một nhóm MeetingMinutes bằng luật (không gọi LLM), giới hạn kích thước kết quả:
+    mỗi danh sách, mỗi chủ đề thảo luận và số chủ đề chỉ giữ tối đa max_items phần tử
+    được nhắc tới nhiều nhất trong nhóm (các ý gần trùng được đếm chung).
+    """
+    merged = merge_meeting_minutes(group).model_dump()
+
+    for key in LIST_FIELDS:
+        if merged[key]:
+            occurrences = [item for m in group for item in (getattr(m, key) or [])]
+            threshold = MERGE_DEDUP_THRESHOLD if key in DEDUP_FIELDS else 0
+            merged[key] = _rank_by_frequency(occurrences, max_items, threshold)
+
+    if merged["noi_dung_thao_luan"]:
+        topic_of = _canonicalizer(MERGE_DEDUP_THRESHOLD)
+        topic_mentions, points_by_topic = [], {}
+        for m in group:
+            for topic, points in (m.noi_dung_thao_luan or {}).items():
+                topic = topic_of(topic)
+                topic_mentions.append(topic)
+                points_by_topic.setdefault(topic, []).extend(points)
+        topics = _rank_by_frequency(topic_mentions, max_items)
+        merged["noi_dung_thao_luan"] = {
+            topic: _rank_by_frequency(points_by_topic[topic], max_items, MERGE_DEDUP_THRESHOLD)
+            for topic in topics
+        }
+
+    for key, value in merged.items():
+        if key not in LIST_FIELDS and key != "noi_dung_thao_luan" and value:
+            parts = value.split("; ")
+            if len(parts) > max_items:
+                merged[key] = "; ".join(parts[:max_items])
     return MeetingMinutes(**merged)
 
 
-def read_transcript_in_chunks(file_path: str, chunk_size: int = 7, chunk_overlap: int = 0) -> List[str]:
+@lru_cache(maxsize=None)
+def build_reduce_prompt() -> tuple:
+    """Tạo (một lần) PydanticOutputParser và PromptTemplate dùng để hợp nhất các MeetingMinutes bằng LLM."""
+    from langchain.output_parsers import PydanticOutputParser
+    from langchain_core.prompts import PromptTemplate
+
+    parser = PydanticOutputParser(pydantic_object=MeetingMinutes)
+    format_instructions = parser.get_format_instructions().replace("{", "{{").replace("}", "}}")
+    prompt = PromptTemplate(
+        template=REDUCE_PROMPT_TEMPLATE,
+        input_variables=["minutes_json", "max_items"],
+        partial_variables={"format_instructions": format_instructions}
+    )
+    return parser, prompt
+
+
+def llm_reduce_meeting_minutes(group: List[MeetingMinutes], max_items: int = 15) -> MeetingMinutes:
+    """
+    Hợp nhất một nhóm MeetingMinutes bằng LLM: gộp các ý diễn đạt lại, giữ tối đa max_items ý mỗi mục.
+    """
+    parser, prompt = build_reduce_prompt()
+    minutes_json = "\n".join(m.model_dump_json(exclude_none=True) for m in group)
+
+    formatted_prompt = prompt.format_prompt(minutes_json=minutes_json, max_items=max_items)
+    response = _invoke_llm(formatted_prompt.to_messages(), "reduce")
+    with span("parse"):
+        return parser.parse(response.content)
+
+
+REDUCERS = {
+    "rule": rule_reduce_meeting_minutes,
+    "llm": llm_reduce_meeting_minutes
+}
+
+
+def tree_reduce_meeting_minutes(minutes_list: List[MeetingMinutes], fan_in: int = 4, reducer: str = "rule",
+                                max_items: int = 15, max_concurrency: int = 4) -> MeetingMinutes:
+    """
+    Hợp nhất kết quả các chunk theo dạng cây (map-reduce phân cấp): ở mỗi tầng, các kết quả liên tiếp
+    được gom thành nhóm fan_in phần tử và hợp nhất song song, lặp lại cho tới khi còn một kết quả.
+    Số tầng tăng theo log(fan_in) của số chunk và kích thước mỗi kết quả bị giới hạn bởi max_items.
+
+    Args:
+        minutes_list (List[MeetingMinutes]): Kết quả của các chunk theo thứ tự.
+        fan_in (int): Số kết quả được hợp nhất trong một nhóm (>= 2).
+        reducer (str): 'rule' (hợp nhất bằng luật) hoặc 'llm' (hợp nhất bằng LLM).
+        max_items (int): Số ý tối đa giữ lại cho mỗi danh sách/chủ đề.
+        max_concurrency (int): Số nhóm được hợp nhất đồng thời trong một tầng.
+
+    Returns:
+        MeetingMinutes: Kết quả hợp nhất cuối cùng.
     """
-    Đọc file transcript và chia thành các chunk, mỗi chunk gồm chunk_size dòng,
+    if fan_in < 2:
+        raise ValueError("fan_in phải lớn hơn hoặc bằng 2.")
+    if reducer not in REDUCERS:
+        raise ValueError(f"reducer phải là một trong: {', '.join(REDUCERS)}.")
+    if not minutes_list:
+        raise ValueError("Không có dữ liệu transcript nào để xử lý.")
+
+    reduce_fn = REDUCERS[reducer]
+
+    def _reduce(group: List[MeetingMinutes]) -> MeetingMinutes:
+        return group[0] if len(group) == 1 else reduce_fn(group, max_items)
+
+    level = list(minutes_list)
+    if len(level) == 1:
+        return rule_reduce_meeting_minutes(level, max_items)
+    while len(level) > 1:
+        groups = [level[i:i + fan_in] for i in range(0, len(level), fan_in)]
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(groups)))) as executor:
+            # Mỗi nhóm chạy trong bản sao context để thời gian được tính vào request hiện tại
+            level = list(executor.map(lambda g: contextvars.copy_context().run(_reduce, g), groups))
+    return level[0]
+
+def transcript_to_text(transcript: Union[str, Iterable[Union[str, dict]]]) -> str:
+    """
+    Chuẩn hóa transcript về dạng văn bản, mỗi đoạn trên một dòng.
+
+    Args:
+        transcript: Văn bản transcript, SegmentStore (kết quả của transcribe_audio), hoặc iterable các đoạn
+                    (chuỗi hoặc dictionary có khóa 'text'). Các đoạn rỗng bị bỏ qua.
+
+    Returns:
+        str: Transcript dạng văn bản.
+    """
+    if isinstance(transcript, str):
+        return transcript
+    if isinstance(transcript, SegmentStore):
+        # Văn bản được giải mã một lần từ buffer của store
+        return "\n".join(line for line in transcript.to_text().split("\n") if line)
+    lines = (segment["text"] if isinstance(segment, dict) else segment for segment in transcript)
+    return "\n".join(line for line in lines if line)
+
+
+def split_transcript_by_lines(text: str, chunk_size: int = 7, chunk_overlap: int = 0) -> List[str]:
+    """
+    Chia transcript thành các chunk, mỗi chunk gồm chunk_size dòng,
     với số dòng chồng lấn giữa các chunk là chunk_overlap.
 
     Args:
-        file_path (str): Đường dẫn tới file transcript.
+        text (str): Toàn bộ transcript, mỗi đoạn trên một dòng.
         chunk_size (int): Số dòng trên mỗi chunk (mặc định 7).
         chunk_overlap (int): Số dòng chồng lấn giữa các chunk (mặc định 0).
 
@@ -148,8 +646,7 @@ def read_transcript_in_chunks(file_path: str, chunk_size: int = 7, chunk_overlap
     if chunk_overlap >= chunk_size:
         raise ValueError("chunk_overlap phải nhỏ hơn chunk_size.")
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    lines = text.splitlines(keepends=True)
 
     chunks = []
     i = 0
@@ -162,10 +659,9 @@ def read_transcript_in_chunks(file_path: str, chunk_size: int = 7, chunk_overlap
     return chunks
 
 
-def process_transcript_file(file_path: str, chunk_size: int = 7, chunk_overlap: int = 0) -> MeetingMinutes:
+def read_transcript_in_chunks(file_path: str, chunk_size: int = 7, chunk_overlap: int = 0) -> List[str]:
     """
-    Đọc file transcript, chia thành các chunk theo số dòng xác định (với số dòng chồng lấn),
-    gọi generate_meeting_minutes cho từng chunk và hợp nhất kết quả lại thành một object MeetingMinutes duy nhất.
+    Đọc file transcript và chia thành các chunk theo số dòng (xem split_transcript_by_lines).
 
     Args:
         file_path (str): Đường dẫn tới file transcript.
@@ -173,17 +669,422 @@ def process_transcript_file(file_path: str, chunk_size: int = 7, chunk_overlap:
         chunk_overlap (int): Số dòng chồng lấn giữa các chunk (mặc định 0).
 
     Returns:
-        MeetingMinutes: Meeting minutes hợp nhất từ toàn bộ file transcript.
+        List[str]: Danh sách các đoạn transcript, mỗi đoạn là một chuỗi.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return split_transcript_by_lines(text, chunk_size, chunk_overlap)
+
+
+def summarize_chunk(chunk: str, limiter: RateLimiter, use_cache: bool = True,
+                    cache_usage: Optional[CacheUsage] = None, event_fields: Optional[dict] = None) -> MeetingMinutes:
+    """
+    Trích xuất MeetingMinutes cho một chunk: tra cache, chờ hạn mức của rate limiter rồi gọi LLM.
+    event_fields (ví dụ chunk, total, transcript) được ghi kèm các sự kiện chunk_started/finished/failed.
+    """
+    event_fields = event_fields or {}
+    start = time.perf_counter()
+    emit_event("chunk_started", chars=len(chunk), **event_fields)
+    try:
+        if use_cache:
+            cached = lookup_cached_minutes(chunk, cache_usage)
+            if cached is not None:
+                emit_event("chunk_finished", cached=True, seconds=round(time.perf_counter() - start, 4),
+                           **event_fields)
+                return cached
+        prompt_tokens = estimate_prompt_tokens(chunk)
+        with span("rate_limit_wait"):
+            limiter.acquire(prompt_tokens)
+        meeting_minutes = extract_meeting_minutes(chunk)
+        if use_cache:
+            store_cached_minutes(chunk, meeting_minutes)
+    except Exception as e:
+        emit_event("chunk_failed", error=str(e), seconds=round(time.perf_counter() - start, 4), **event_fields)
+        raise
+    emit_event("chunk_finished", cached=False, prompt_tokens=prompt_tokens,
+               seconds=round(time.perf_counter() - start, 4), **event_fields)
+    return meeting_minutes
+
+
+def summarize_chunks(chunks: List[str], max_concurrency: int = 1,
+                     rate_limiter: Optional[RateLimiter] = None, use_cache: bool = True,
+                     cache_usage: Optional[CacheUsage] = None,
+                     checkpoint: Optional[JobCheckpoint] = None) -> List[MeetingMinutes]:
+    """
+    Gọi generate_meeting_minutes cho từng chunk, tối đa max_concurrency lời gọi LLM đồng thời.
+    Kết quả luôn được trả về theo đúng thứ tự chunk để việc hợp nhất cho ra kết quả ổn định.
+
+    Args:
+        chunks (List[str]): Danh sách các đoạn transcript.
+        max_concurrency (int): Số lời gọi LLM tối đa chạy song song (1 = tuần tự).
+        rate_limiter (RateLimiter): Giới hạn request/token mỗi phút (mặc định dùng limiter chung).
+        use_cache (bool): Dùng cache kết quả trích xuất; chunk cache hit không tính vào hạn mức.
+        cache_usage (CacheUsage): Bộ đếm hit/miss cache của request hiện tại (tùy chọn).
+        checkpoint (JobCheckpoint): Checkpoint của job (tùy chọn): chunk đã có checkpoint không được xử lý lại,
+                                    chunk vừa xong được lưu ngay (kể cả khi chunk khác bị lỗi).
+
+    Returns:
+        List[MeetingMinutes]: Kết quả của từng chunk theo thứ tự.
     """
-    chunks = read_transcript_in_chunks(file_path, chunk_size, chunk_overlap)
-    meeting_minutes_list = []
-    for idx, chunk in enumerate(chunks, start=1):
-        print(f"Processing chunk {idx}...")
-        mm = generate_meeting_minutes(chunk)
-        meeting_minutes_list.append(mm)
-
-    if meeting_minutes_list:
-        merged_minutes = merge_meeting_minutes(meeting_minutes_list)
-        return merged_minutes
-    else:
+    limiter = rate_limiter if rate_limiter is not None else default_rate_limiter
+
+    def _summarize(idx: int, chunk: str) -> MeetingMinutes:
+        if checkpoint is not None:
+            saved = checkpoint.get(chunk)
+            if saved is not None:
+                return saved
+        meeting_minutes = summarize_chunk(chunk, limiter, use_cache, cache_usage,
+                                          {"chunk": idx, "total": len(chunks)})
+        if checkpoint is not None:
+            checkpoint.save(idx, chunk, meeting_minutes)
+        return meeting_minutes
+
+    CHUNKS.inc(len(chunks))
+    if max_concurrency <= 1 or len(chunks) <= 1:
+        return [_summarize(idx, chunk) for idx, chunk in enumerate(chunks, start=1)]
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+        # Mỗi chunk chạy trong bản sao context để thời gian được tính vào request hiện tại
+        futures = [executor.submit(contextvars.copy_context().run, _summarize, idx, chunk)
+                   for idx, chunk in enumerate(chunks, start=1)]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            # Một chunk lỗi: hủy các chunk chưa chạy để không tốn thêm lời gọi LLM
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def chunk_transcript(transcript: Union[str, Iterable[Union[str, dict]]], chunk_size: int = 7,
+                     chunk_overlap: int = 0, chunk_tokens: Optional[int] = None,
+                     chunk_overlap_tokens: int = 0) -> List[str]:
+    """
+    Chia transcript theo ngân sách token nếu có chunk_tokens, ngược lại theo số dòng.
+    SegmentStore được chia theo token tại ranh giới đoạn Whisper (xem split_segments_by_tokens).
+    """
+    if chunk_tokens and isinstance(transcript, SegmentStore):
+        with span("chunking"):
+            chunks = split_segments_by_tokens(transcript, chunk_tokens, chunk_overlap_tokens)
+            return [text for text in (chunk.to_text() for chunk in chunks) if text.strip()]
+    text = transcript_to_text(transcript)
+    with span("chunking"):
+        if chunk_tokens:
+            return split_transcript_by_tokens(text, chunk_tokens, chunk_overlap_tokens)
+        return split_transcript_by_lines(text, chunk_size, chunk_overlap)
+
+
+MERGE_STRATEGIES = ("flat", "tree")
+
+
+def combine_chunk_minutes(meeting_minutes_list: List[MeetingMinutes], merge_strategy: str = "flat",
+                          reduce_fan_in: int = 4, reducer: str = "rule", max_concurrency: int = 1) -> MeetingMinutes:
+    """Hợp nhất kết quả các chunk theo merge_strategy ('flat' hoặc 'tree')."""
+    if merge_strategy not in MERGE_STRATEGIES:
+        raise ValueError(f"merge_strategy phải là một trong: {', '.join(MERGE_STRATEGIES)}.")
+    if not meeting_minutes_list:
         raise ValueError("Không có dữ liệu transcript nào để xử lý.")
+    with span("merge"):
+        if merge_strategy == "tree":
+            return tree_reduce_meeting_minutes(meeting_minutes_list, fan_in=reduce_fan_in, reducer=reducer,
+                                               max_items=REDUCE_MAX_ITEMS, max_concurrency=max_concurrency)
+        return merge_meeting_minutes(meeting_minutes_list)
+
+
+def process_transcript(transcript: Union[str, Iterable[Union[str, dict]]], chunk_size: int = 7,
+                       chunk_overlap: int = 0, max_concurrency: int = 1, rate_limiter: Optional[RateLimiter] = None,
+                       use_cache: bool = True, cache_usage: Optional[CacheUsage] = None,
+                       chunk_tokens: Optional[int] = None, chunk_overlap_tokens: int = 0,
+                       merge_strategy: str = "flat", reduce_fan_in: int = 4,
+                       reducer: str = "rule", salience: Optional[SalienceFilter] = None,
+                       scheduler: Optional[DeadlineScheduler] = None,
+                       checkpoint: Optional[JobCheckpoint] = None) -> MeetingMinutes:
+    """
+    Chia transcript (văn bản hoặc các đoạn transcript trong bộ nhớ) thành các chunk theo số dòng xác định
+    (với số dòng chồng lấn) hoặc theo ngân sách token nếu có chunk_tokens, gọi generate_meeting_minutes
+    cho từng chunk và hợp nhất kết quả lại thành một object MeetingMinutes duy nhất.
+
+    Args:
+        transcript: Văn bản transcript (mỗi đoạn trên một dòng), SegmentStore (kết quả của transcribe_audio)
+                    hoặc iterable các đoạn (chuỗi hoặc dictionary có khóa 'text').
+        chunk_size (int): Số dòng trên mỗi chunk (mặc định 7).
+        chunk_overlap (int): Số dòng chồng lấn giữa các chunk (mặc định 0).
+        max_concurrency (int): Số chunk được gửi tới LLM đồng thời (mặc định 1 = tuần tự).
+        rate_limiter (RateLimiter): Giới hạn request/token mỗi phút (mặc định dùng limiter chung).
+        use_cache (bool): Dùng cache kết quả trích xuất theo từng chunk (mặc định True).
+        cache_usage (CacheUsage): Bộ đếm hit/miss cache của request hiện tại (tùy chọn).
+        chunk_tokens (int): Số token tối đa mỗi chunk. Nếu có, chunk_size/chunk_overlap bị bỏ qua
+                            và transcript được chia theo token, giữ nguyên từng đoạn.
+        chunk_overlap_tokens (int): Số token chồng lấn giữa các chunk khi chia theo token.
+        merge_strategy (str): 'flat' (hợp nhất tất cả một lần bằng merge_meeting_minutes) hoặc
+                              'tree' (hợp nhất phân cấp bằng tree_reduce_meeting_minutes).
+        reduce_fan_in (int): Số kết quả gộp trong một nhóm khi merge_strategy='tree'.
+        reducer (str): 'rule' hoặc 'llm' khi merge_strategy='tree'.
+        salience (SalienceFilter): Bộ lọc salience chạy trước khi chia chunk để bỏ các câu ít giá trị
+                                   (tùy chọn); mức giảm được ghi trong salience.stats.
+        scheduler (DeadlineScheduler): Lập lịch theo deadline (tùy chọn). Nếu có, kích thước chunk, số lời gọi
+                                       song song và cách hợp nhất do scheduler chọn theo độ dài transcript và độ trễ
+                                       quan sát được của model, thay cho các tham số ở trên; lịch được lưu trong
+                                       scheduler.plan.
+        checkpoint (JobCheckpoint): Checkpoint của job (tùy chọn). Kết quả từng chunk được lưu ngay khi xong;
+                                    gọi lại với cùng job_id (ví dụ sau khi một lời gọi LLM bị lỗi) chỉ xử lý các
+                                    chunk còn thiếu rồi hợp nhất. Checkpoint bị xóa khi hợp nhất thành công.
+
+    Returns:
+        MeetingMinutes: Meeting minutes hợp nhất từ toàn bộ transcript.
+    """
+    # Kiểm tra trước khi gọi LLM: merge_strategy/reducer sai chỉ bị phát hiện khi hợp nhất, sau mọi lời gọi chunk
+    if merge_strategy not in MERGE_STRATEGIES:
+        raise ValueError(f"merge_strategy phải là một trong: {', '.join(MERGE_STRATEGIES)}.")
+    if reducer not in REDUCERS:
+        raise ValueError(f"reducer phải là một trong: {', '.join(REDUCERS)}.")
+    if salience is not None:
+        with span("salience"):
+            if not isinstance(transcript, SegmentStore):
+                transcript = transcript_to_text(transcript)
+            transcript = salience.apply(transcript)
+        emit_event("salience_filtered", **salience.report())
+    if scheduler is not None:
+        # Khi tiếp tục một job, dùng lại lịch của lần chạy đầu để transcript được chia thành đúng các chunk cũ
+        saved_plan = checkpoint.get_meta("schedule") if checkpoint is not None else None
+        if saved_plan is not None:
+            plan = scheduler.plan = SchedulePlan(**saved_plan)
+        else:
+            text = transcript.to_text() if isinstance(transcript, SegmentStore) else transcript_to_text(transcript)
+            plan = scheduler.plan_for(count_tokens(text, LLM_MODEL_NAME), estimate_prompt_tokens(""))
+            if checkpoint is not None:
+                checkpoint.set_meta("schedule", plan.to_dict())
+        emit_event("schedule_planned", resumed=saved_plan is not None, **plan.to_dict())
+        chunk_tokens, chunk_overlap_tokens = plan.chunk_tokens, plan.chunk_overlap_tokens
+        max_concurrency, merge_strategy = plan.max_concurrency, plan.merge_strategy
+        reduce_fan_in, reducer = plan.reduce_fan_in, plan.reducer
+    if checkpoint is not None:
+        checkpoint.acquire()
+    try:
+        chunks = chunk_transcript(transcript, chunk_size, chunk_overlap, chunk_tokens, chunk_overlap_tokens)
+        meeting_minutes_list = summarize_chunks(chunks, max_concurrency=max_concurrency, rate_limiter=rate_limiter,
+                                                use_cache=use_cache, cache_usage=cache_usage, checkpoint=checkpoint)
+        merged = combine_chunk_minutes(meeting_minutes_list, merge_strategy, reduce_fan_in, reducer,
+                                       max_concurrency)
+        if checkpoint is not None:
+            if checkpoint.resumed:
+                emit_event("checkpoint_resumed", job_id=checkpoint.job_id, resumed=checkpoint.resumed,
+                           total=len(chunks))
+            # Không xóa nếu một lần chạy khác cùng job_id vẫn đang dùng checkpoint
+            checkpoint.clear()
+    finally:
+        if checkpoint is not None:
+            checkpoint.release()
+    return merged
+
+
+def process_transcript_file(file_path: str, *args, **kwargs) -> MeetingMinutes:
+    """
+    Đọc file transcript và tạo meeting minutes bằng process_transcript.
+
+    Args:
+        file_path (str): Đường dẫn tới file transcript.
+        *args, **kwargs: Các tham số chia chunk, gọi LLM và hợp nhất của process_transcript.
+
+    Returns:
+        MeetingMinutes: Meeting minutes hợp nhất từ toàn bộ file transcript.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return process_transcript(text, *args, **kwargs)
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _comparable_text(text: str) -> str:
+    """Văn bản chunk bỏ khác biệt về hoa thường, dấu câu và khoảng trắng (không ảnh hưởng tới nội dung biên bản)."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+class IncrementalSummarizer:
+    """
+    Tạo meeting minutes cho một transcript rồi cập nhật khi transcript được thay bằng phiên bản khác của cùng
+    audio (ví dụ bản nháp -> bản cuối của transcribe_audio_two_pass), chỉ gọi LLM lại cho các chunk có nội dung
+    thay đổi. Lần cập nhật chia transcript mới theo đúng khoảng thời gian của các chunk lần trước, nên
+    các chunk không đổi (so sánh không phân biệt hoa thường, dấu câu, khoảng trắng) dùng lại kết quả cũ.
+
+    Args:
+        chunk_tokens (int): Số token tối đa mỗi chunk.
+        chunk_overlap_tokens (int): Số token chồng lấn giữa các chunk.
+        max_concurrency, rate_limiter, use_cache, cache_usage, merge_strategy, reduce_fan_in, reducer:
+            Như process_transcript.
+    """
+
+    def __init__(self, chunk_tokens: int = 1500, chunk_overlap_tokens: int = 150, max_concurrency: int = 1,
+                 rate_limiter: Optional[RateLimiter] = None, use_cache: bool = True,
+                 cache_usage: Optional[CacheUsage] = None, merge_strategy: str = "flat",
+                 reduce_fan_in: int = 4, reducer: str = "rule"):
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.use_cache = use_cache
+        self.cache_usage = cache_usage
+        self.merge_strategy = merge_strategy
+        self.reduce_fan_in = reduce_fan_in
+        self.reducer = reducer
+        self._chunks: List[SegmentStore] = []
+        self._minutes: List[MeetingMinutes] = []
+        self.chunks_summarized = 0  # số chunk gửi tới LLM ở lần gọi gần nhất
+
+    def _aligned_chunks(self, segments: SegmentStore) -> List[SegmentStore]:
+        """Chia segments theo khoảng thời gian của các chunk lần trước; chunk quá ngân sách token được chia lại."""
+        bounds = []
+        for chunk in self._chunks:
+            lo, hi = segments.index_range(chunk.start_time, chunk.end_time)
+            if bounds:
+                # Không bỏ sót đoạn nằm giữa hai chunk (ví dụ trong khoảng lặng)
+                bounds[-1][1] = max(bounds[-1][1], lo)
+            bounds.append([lo, hi])
+        bounds[0][0], bounds[-1][1] = 0, len(segments)
+        chunks = []
+        for lo, hi in bounds:
+            if hi <= lo:
+                continue
+            chunk = segments[lo:hi]
+            if count_tokens(chunk.to_text()) > self.chunk_tokens:
+                chunks.extend(split_segments_by_tokens(chunk, self.chunk_tokens, self.chunk_overlap_tokens))
+            else:
+                chunks.append(chunk)
+        return chunks
+
+    def summarize(self, segments: SegmentStore) -> MeetingMinutes:
+        """
+        Tạo meeting minutes cho transcript; nếu đã có kết quả của phiên bản trước, chỉ các chunk
+        có nội dung thay đổi được gửi tới LLM.
+
+        Args:
+            segments (SegmentStore): Transcript (kết quả của transcribe_audio).
+
+        Returns:
+            MeetingMinutes: Meeting minutes hợp nhất từ toàn bộ transcript.
+        """
+        with span("chunking"):
+            if self._chunks and len(segments):
+                chunks = self._aligned_chunks(segments)
+            else:
+                chunks = split_segments_by_tokens(segments, self.chunk_tokens, self.chunk_overlap_tokens)
+            chunks = [chunk for chunk in chunks if chunk.to_text().strip()]
+        previous = {}
+        for chunk, minutes in zip(self._chunks, self._minutes):
+            previous.setdefault(_comparable_text(chunk.to_text()), minutes)
+
+        minutes_list = [previous.get(_comparable_text(chunk.to_text())) for chunk in chunks]
+        changed = [i for i, minutes in enumerate(minutes_list) if minutes is None]
+        results = summarize_chunks([chunks[i].to_text() for i in changed], max_concurrency=self.max_concurrency,
+                                   rate_limiter=self.rate_limiter, use_cache=self.use_cache,
+                                   cache_usage=self.cache_usage)
+        for i, minutes in zip(changed, results):
+            minutes_list[i] = minutes
+        self._chunks, self._minutes = chunks, minutes_list
+        self.chunks_summarized = len(changed)
+        return combine_chunk_minutes(minutes_list, self.merge_strategy, self.reduce_fan_in, self.reducer,
+                                     self.max_concurrency)
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+
+class BatchResult(NamedTuple):
+    """Kết quả của một transcript trong summarize_batch (minutes=None nếu lỗi)."""
+    index: int
+    minutes: Optional[MeetingMinutes]
+    error: Optional[str]
+    chunks: int
+    seconds: float
+
+
+def summarize_batch(transcripts: Sequence[Union[str, Iterable[Union[str, dict]]]], max_concurrency: int = 4,
+                    rate_limiter: Optional[RateLimiter] = None, use_cache: bool = True,
+                    cache_usage: Optional[CacheUsage] = None, chunk_size: int = 7, chunk_overlap: int = 0,
+                    chunk_tokens: Optional[int] = None, chunk_overlap_tokens: int = 0,
+                    merge_strategy: str = "flat", reduce_fan_in: int = 4,
+                    reducer: str = "rule") -> Iterator[BatchResult]:
+    """
+    Tạo meeting minutes cho nhiều transcript cùng lúc. Chunk của mọi transcript được đưa vào cùng một pool
+    (tối đa max_concurrency lời gọi LLM đồng thời, dùng chung client LLM và prompt đã tạo sẵn);
+    kết quả của từng transcript được trả về ngay khi tất cả chunk của transcript đó xong,
+    không chờ cả batch. Một transcript lỗi không làm dừng các transcript khác.
+
+    Args:
+        transcripts: Danh sách transcript (văn bản hoặc iterable các đoạn, như process_transcript).
+        max_concurrency (int): Số chunk được gửi tới LLM đồng thời cho cả batch.
+        rate_limiter (RateLimiter): Giới hạn request/token mỗi phút (mặc định dùng limiter chung).
+        use_cache (bool): Dùng cache kết quả trích xuất theo từng chunk.
+        cache_usage (CacheUsage): Bộ đếm hit/miss cache của cả batch (tùy chọn).
+        chunk_size, chunk_overlap, chunk_tokens, chunk_overlap_tokens: Cách chia chunk (xem process_transcript).
+        merge_strategy, reduce_fan_in, reducer: Cách hợp nhất kết quả các chunk (xem process_transcript).
+
+    Returns:
+        Iterator[BatchResult]: Kết quả theo thứ tự hoàn thành (index là vị trí transcript trong đầu vào).
+            Chunk của transcript ngắn được gửi trước nên transcript ngắn thường có kết quả sớm hơn.
+    """
+    limiter = rate_limiter if rate_limiter is not None else default_rate_limiter
+    start = time.perf_counter()
+
+    results = []
+    remaining = []
+    failed = set()
+    executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+    try:
+        batch_chunks = []
+        for t_idx, transcript in enumerate(transcripts):
+            try:
+                chunks = chunk_transcript(transcript, chunk_size, chunk_overlap, chunk_tokens, chunk_overlap_tokens)
+                if not chunks:
+                    raise ValueError("Không có dữ liệu transcript nào để xử lý.")
+            except Exception as e:
+                chunks = []
+                failed.add(t_idx)
+                yield BatchResult(t_idx, None, str(e), 0, round(time.perf_counter() - start, 3))
+            CHUNKS.inc(len(chunks))
+            batch_chunks.append(chunks)
+            results.append([None] * len(chunks))
+            remaining.append(len(chunks))
+
+        # Transcript ít chunk được xếp hàng trước để có kết quả sớm, không phải chờ sau transcript dài
+        futures = {}
+        for t_idx in sorted(range(len(batch_chunks)), key=lambda i: len(batch_chunks[i])):
+            chunks = batch_chunks[t_idx]
+            for c_idx, chunk in enumerate(chunks):
+                future = executor.submit(contextvars.copy_context().run, summarize_chunk, chunk, limiter,
+                                         use_cache, cache_usage,
+                                         {"transcript": t_idx, "chunk": c_idx + 1, "total": len(chunks)})
+                futures[future] = (t_idx, c_idx)
+        del batch_chunks
+
+        for future in as_completed(futures):
+            t_idx, c_idx = futures[future]
+            if t_idx in failed:
+                continue
+            try:
+                results[t_idx][c_idx] = future.result()
+            except Exception as e:
+                # Transcript lỗi: bỏ các chunk còn lại của transcript đó
+                failed.add(t_idx)
+                for other, (other_t, _) in futures.items():
+                    if other_t == t_idx:
+                        other.cancel()
+                yield BatchResult(t_idx, None, str(e), len(results[t_idx]), round(time.perf_counter() - start, 3))
+                continue
+            remaining[t_idx] -= 1
+            if remaining[t_idx] == 0:
+                try:
+                    minutes = combine_chunk_minutes(results[t_idx], merge_strategy, reduce_fan_in, reducer,
+                                                    max_concurrency)
+                    yield BatchResult(t_idx, minutes, None, len(results[t_idx]),
+                                      round(time.perf_counter() - start, 3))
+                except Exception as e:
+                    yield BatchResult(t_idx, None, str(e), len(results[t_idx]),
+                                      round(time.perf_counter() - start, 3))
+                results[t_idx] = []  # giải phóng kết quả chunk đã hợp nhất
+    finally:
+        # Dừng các chunk chưa chạy nếu caller ngừng đọc kết quả giữa chừng (ví dụ client ngắt kết nối)
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,38 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    # tiktoken chỉ được import ở lần đếm token đầu tiên
+    try:
+        import tiktoken
+    except ImportError:  # tiktoken được cài kèm langchain-openai, nhưng không bắt buộc
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken tải file BPE ở lần dùng đầu tiên; khi không có mạng thì dùng ước lượng
+        return None
+
+
+def count_tokens(text: str, model_name: str = "gpt-4o-mini") -> int:
+    """
+    Đếm số token của văn bản theo tokenizer của model.
+    Nếu không có tiktoken, ước lượng xấp xỉ theo số ký tự (tiếng Việt có dấu ~3 ký tự/token).
+
+    Args:
+        text (str): Văn bản cần đếm.
+        model_name (str): Tên model dùng để chọn tokenizer.
+
+    Returns:
+        int: Số token.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return max(1, len(text) // 3)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from typing import BinaryIO, Iterable, NamedTuple, Optional, Tuple, Union
+
+from app import config
+from app.modules.segment_store import SegmentStore
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class CachedTranscriptionInfo(NamedTuple):
+    """Thông tin transcription được lưu kèm transcript (thay cho TranscriptionInfo của Faster Whisper)."""
+    language: str
+    language_probability: float
+    duration: Optional[float] = None
+    duration_after_vad: Optional[float] = None
+    # Thống kê lọc hallucination/từ đệm (xem TranscriptFilter), None nếu không lọc
+    filtered: Optional[dict] = None
+
+
+def hash_audio_file(path: str) -> str:
+    """Tính SHA-256 của file audio theo từng khối, không đọc toàn bộ file vào bộ nhớ."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_audio_stream(source: BinaryIO) -> str:
+    """Tính SHA-256 của file object (ví dụ file upload) theo từng khối rồi đưa con trỏ về đầu file."""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def copy_and_hash(source: BinaryIO, output_path: str) -> str:
+    """Sao chép file upload ra đĩa và đồng thời tính SHA-256, chỉ đọc dữ liệu một lần."""
+    digest = hashlib.sha256()
+    with open(output_path, "wb") as out:
+        for block in iter(lambda: source.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+            out.write(block)
+    return digest.hexdigest()
+
+
+def make_transcript_key(audio_hash: str, model_size: str, compute_type: str, beam_size: int, vad_filter: bool,
+                        filter_signature: Optional[str] = None) -> str:
+    """
+    Khóa cache transcript: hash nội dung audio cùng các tham số Whisper ảnh hưởng tới kết quả
+    và cấu hình bộ lọc transcript (filter_signature, None nếu không lọc).
+    """
+    params = {
+        "audio": audio_hash,
+        "model_size": model_size,
+        "compute_type": compute_type,
+        "beam_size": int(beam_size),
+        "vad_filter": bool(vad_filter)
+    }
+    if filter_signature is not None:
+        params["filter"] = filter_signature
+    params = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+
+class TranscriptCache:
+    """
+    Lưu transcript đã tiền xử lý và thông tin transcription trên đĩa, mỗi khóa một file SegmentStore
+    (thông tin transcription nằm trong phần metadata); khi đọc, file được memory-map thay vì parse lại.
+    Tổng dung lượng bị giới hạn bởi max_bytes; file lâu không được đọc nhất bị xóa trước (LRU theo mtime).
+    """
+
+    SUFFIX = ".seg"
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def get(self, key: str) -> Optional[Tuple[SegmentStore, CachedTranscriptionInfo]]:
+        """Trả về (segments, info) đã lưu hoặc None nếu chưa có."""
+        path = self._path(key)
+        try:
+            segments, metadata = SegmentStore.load(path)
+            os.utime(path)  # đánh dấu vừa được dùng để phục vụ LRU
+        except (FileNotFoundError, ValueError, struct.error):
+            return None
+        return segments, CachedTranscriptionInfo(**metadata["info"])
+
+    def set(self, key: str, segments: Union[SegmentStore, Iterable[dict]], info) -> None:
+        """Lưu transcript và thông tin transcription, sau đó dọn bớt nếu vượt dung lượng."""
+        if not isinstance(segments, SegmentStore):
+            segments = SegmentStore.from_segments(segments)
+        metadata = {
+            "info": {
+                "language": info.language,
+                "language_probability": info.language_probability,
+                "duration": getattr(info, "duration", None),
+                "duration_after_vad": getattr(info, "duration_after_vad", None),
+                "filtered": getattr(info, "filtered", None)
+            },
+            "created_at": time.time()
+        }
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        segments.save(temp_path, metadata)
+        os.replace(temp_path, path)  # ghi nguyên tử, không để lại file hỏng khi lỗi giữa chừng
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                # Tính cả file .json của định dạng cache cũ để chúng được dọn dần
+                if not name.endswith((self.SUFFIX, ".json")):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self) -> dict:
+        files = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(self.SUFFIX)]
+        return {
+            "entries": len(files),
+            "bytes": sum(os.path.getsize(p) for p in files if os.path.exists(p)),
+            "max_bytes": self.max_bytes
+        }
+
+
+_cache: Optional[TranscriptCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_transcript_cache() -> Optional[TranscriptCache]:
+    """Trả về cache transcript dùng chung theo config, hoặc None nếu cache bị tắt."""
+    global _cache
+    if not config.TRANSCRIPT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranscriptCache(config.TRANSCRIPT_CACHE_DIR, config.TRANSCRIPT_CACHE_MAX_BYTES)
+        return _cache
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import re
+import unicodedata
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from app import config
+from app.modules.metrics import FILTERED_SEGMENTS, FILTERED_TOKENS
+from app.modules.tokenizer import count_tokens
+
+_WORD = re.compile(r"\w+")
+_SPACES = re.compile(r"\s+")
+# Dấu câu còn sót lại ở đầu đoạn sau khi xóa một cụm từ trong blocklist
+_LEADING_PUNCTUATION = " ,.;:!?-–…"
+_TRAILING_PUNCTUATION = ",.;:!?…"
+
+
+def _normalize(text: str) -> str:
+    """
+    Chuẩn hóa để so khớp: NFC và chữ thường. Chỉ giữ nguyên độ dài chuỗi (để ánh xạ vị trí khớp về văn bản gốc)
+    khi text đã ở dạng NFC; văn bản dạng tách dấu (NFD) phải được chuẩn hóa NFC trước khi dùng vị trí khớp.
+    """
+    text = unicodedata.normalize("NFC", text)
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Một số ký tự đổi độ dài khi viết thường (ví dụ 'İ'): giữ nguyên để vị trí khớp vẫn đúng
+        lowered = "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+    return lowered
+
+
+class PhraseAutomaton:
+    """
+    Automaton Aho-Corasick cho một danh sách cụm từ: tìm mọi cụm từ trong văn bản bằng một lần duyệt,
+    thời gian tuyến tính theo độ dài văn bản, không phụ thuộc số cụm từ (thay vì một regex cho mỗi cụm).
+    Chỉ nhận các lần khớp trọn từ (không khớp một phần của từ dài hơn).
+
+    Args:
+        phrases (Iterable[str]): Các cụm từ (không phân biệt hoa thường).
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._lengths: List[Tuple[int, ...]] = [()]
+        self.phrases = sorted({_SPACES.sub(" ", _normalize(p)).strip() for p in phrases} - {""})
+        for phrase in self.phrases:
+            state = 0
+            for ch in phrase:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._lengths.append(())
+                state = nxt
+            self._lengths[state] += (len(phrase),)
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if state else 0
+                # Cụm từ kết thúc tại trạng thái fail cũng kết thúc tại trạng thái này
+                self._lengths[nxt] += self._lengths[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Các khoảng [start, end) trong text khớp một cụm từ, đã gộp các khoảng chồng nhau.
+        text phải đã được chuẩn hóa bằng _normalize (cùng độ dài với văn bản gốc).
+        """
+        goto, fail, lengths = self._goto, self._fail, self._lengths
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length in lengths[state]:
+                start, end = i - length + 1, i + 1
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    found.append((start, end))
+        merged: List[Tuple[int, int]] = []
+        for start, end in sorted(found):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+
+def collapse_repetitions(text: str, min_repeats: int = 3, max_ngram: int = 10) -> str:
+    """
+    Thu gọn các vòng lặp của Whisper trong một đoạn: cụm 1..max_ngram từ lặp liên tiếp
+    từ min_repeats lần trở lên chỉ được giữ lại một lần (so sánh không phân biệt hoa thường, dấu câu).
+    """
+    words = text.split()
+    if len(words) < min_repeats:
+        return text
+    keys = [" ".join(_WORD.findall(word.lower())) for word in words]
+    result = []
+    i = 0
+    while i < len(words):
+        for size in range(1, min(max_ngram, (len(words) - i) // min_repeats) + 1):
+            pattern = keys[i:i + size]
+            if not any(pattern):
+                # Chỉ gồm dấu câu (ví dụ "-", "…", "—"): không phải vòng lặp của lời nói
+                continue
+            repeats = 1
+            while keys[i + repeats * size:i + (repeats + 1) * size] == pattern:
+                repeats += 1
+            if repeats >= min_repeats:
+                result.extend(words[i:i + size])
+                i += repeats * size
+                break
+        else:
+            result.append(words[i])
+            i += 1
+    return " ".join(result)
+
+
+class TranscriptFilter:
+    """
+    Lọc các đoạn transcript không phải lời nói thật trước khi gửi tới LLM, cho từng transcript (có trạng thái):
+      - blocklist: xóa các cụm từ Whisper hay "bịa" ra (một automaton Aho-Corasick cho cả danh sách);
+        đoạn chỉ còn dấu câu bị loại.
+      - repetition: thu gọn cụm từ lặp liên tiếp trong một đoạn và bỏ các đoạn giống hệt nhau lặp liên tiếp
+        (chỉ giữ repeat_threshold - 1 đoạn đầu).
+      - no_speech: bỏ đoạn có no_speech_prob > no_speech_threshold và avg_logprob < logprob_threshold
+        (cùng quy tắc với Whisper).
+      - filler: bỏ đoạn chỉ gồm từ đệm (ừ, à, ờ...) hoặc rỗng.
+    Số đoạn bị bỏ và số token bị loại theo từng lý do được ghi trong stats.
+
+    Args:
+        phrases: Các cụm từ cần loại hoặc PhraseAutomaton đã dựng sẵn.
+        filler_words (Iterable[str]): Các từ đệm.
+        no_speech_threshold (float): Ngưỡng no_speech_prob.
+        logprob_threshold (float): Ngưỡng avg_logprob.
+        repeat_threshold (int): Số lần lặp liên tiếp tối thiểu để coi là vòng lặp.
+    """
+
+    def __init__(self, phrases: Union[Iterable[str], PhraseAutomaton] = (), filler_words: Iterable[str] = (),
+                 no_speech_threshold: float = 0.6, logprob_threshold: float = -1.0, repeat_threshold: int = 3):
+        self.automaton = phrases if isinstance(phrases, PhraseAutomaton) else PhraseAutomaton(phrases)
+        self.filler_words = frozenset(_normalize(word) for word in filler_words)
+        self.no_speech_threshold = no_speech_threshold
+        self.logprob_threshold = logprob_threshold
+        self.repeat_threshold = repeat_threshold
+        self.signature = hashlib.sha256(json.dumps({
+            "phrases": self.automaton.phrases,
+            "filler_words": sorted(self.filler_words),
+            "no_speech_threshold": no_speech_threshold,
+            "logprob_threshold": logprob_threshold,
+            "repeat_threshold": repeat_threshold
+        }, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+        # Thống kê được cập nhật dần khi lọc (có thể đọc sau khi duyệt hết các đoạn)
+        self.stats = {"segments": 0, "segments_removed": {}, "tokens_removed": {}, "total_tokens_removed": 0}
+        self._last_key = None
+        self._run = 0
+
+    def _record(self, reason: str, before: str, after: str = "") -> None:
+        """Ghi nhận một đoạn bị loại (after rỗng) hoặc bị cắt bớt, tính số token bị bớt đi."""
+        if not after:
+            self.stats["segments_removed"][reason] = self.stats["segments_removed"].get(reason, 0) + 1
+            FILTERED_SEGMENTS.inc(reason=reason)
+        tokens = count_tokens(before) - count_tokens(after)
+        if tokens > 0:
+            self.stats["tokens_removed"][reason] = self.stats["tokens_removed"].get(reason, 0) + tokens
+            self.stats["total_tokens_removed"] += tokens
+            FILTERED_TOKENS.inc(tokens, reason=reason)
+
+    def apply(self, text: str, avg_logprob: Optional[float] = None,
+              no_speech_prob: Optional[float] = None) -> str:
+        """
+        Lọc một đoạn (đã qua clean_text) theo thứ tự thời gian. Trả về văn bản còn lại, hoặc chuỗi rỗng
+        nếu đoạn bị loại.
+        """
+        self.stats["segments"] += 1
+        # Chuẩn hóa NFC trước khi so khớp: vị trí khớp tính trên _normalize(text) được dùng để cắt chính text
+        text = unicodedata.normalize("NFC", text)
+        if (no_speech_prob is not None and avg_logprob is not None
+                and no_speech_prob > self.no_speech_threshold and avg_logprob < self.logprob_threshold):
+            self._record("no_speech", text)
+            return ""
+
+        if len(self.automaton):
+            normalized = _normalize(text)
+            spans = self.automaton.spans(normalized)
+            if spans:
+                kept, position = [], 0
+                for start, end in spans:
+                    kept.append(text[position:start])
+                    # Bỏ luôn dấu câu ngay sau cụm từ (ví dụ "...kênh của mình nhé!")
+                    while end < len(text) and text[end] in _TRAILING_PUNCTUATION:
+                        end += 1
+                    position = end
+                kept.append(text[position:])
+                remaining = _SPACES.sub(" ", " ".join(kept)).strip().lstrip(_LEADING_PUNCTUATION)
+                if not _WORD.search(remaining):
+                    remaining = ""
+                self._record("blocklist", text, remaining)
+                text = remaining
+                if not text:
+                    return ""
+
+        collapsed = collapse_repetitions(text, self.repeat_threshold)
+        if collapsed != text:
+            self._record("repetition", text, collapsed)
+            text = collapsed
+
+        words = [_normalize(word) for word in _WORD.findall(text)]
+        if not words or all(word in self.filler_words for word in words):
+            self._record("filler", text)
+            self._last_key, self._run = None, 0
+            return ""
+
+        key = " ".join(words)
+        self._run = self._run + 1 if key == self._last_key else 1
+        self._last_key = key
+        if self._run >= self.repeat_threshold:
+            self._record("repetition", text)
+            return ""
+        return text
+
+    @property
+    def tokens_removed(self) -> int:
+        return self.stats["total_tokens_removed"]
+
+
+def merge_filter_stats(stats_list: Iterable[dict]) -> dict:
+    """Cộng thống kê lọc của nhiều phần transcript (ví dụ các shard)."""
+    merged = {"segments": 0, "segments_removed": {}, "tokens_removed": {}, "total_tokens_removed": 0}
+    for stats in stats_list:
+        merged["segments"] += stats["segments"]
+        merged["total_tokens_removed"] += stats["total_tokens_removed"]
+        for key in ("segments_removed", "tokens_removed"):
+            for reason, count in stats[key].items():
+                merged[key][reason] = merged[key].get(reason, 0) + count
+    return merged
+
+
+def _load_phrases() -> Tuple[str, ...]:
+    phrases = list(config.TRANSCRIPT_FILTER_PHRASES)
+    if config.TRANSCRIPT_FILTER_PHRASES_FILE:
+        with open(config.TRANSCRIPT_FILTER_PHRASES_FILE, "r", encoding="utf-8") as f:
+            phrases.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    return tuple(phrases)
+
+
+@lru_cache(maxsize=4)
+def _build_automaton(phrases: Tuple[str, ...]) -> PhraseAutomaton:
+    return PhraseAutomaton(phrases)
+
+
+def get_transcript_filter() -> Optional[TranscriptFilter]:
+    """
+    Tạo TranscriptFilter mới theo config (mỗi transcript một bộ lọc vì bộ lọc có trạng thái), hoặc None nếu tắt.
+    Automaton của blocklist chỉ được dựng một lần cho cả process.
+    """
+    if not config.TRANSCRIPT_FILTER_ENABLED:
+        return None
+    return TranscriptFilter(_build_automaton(_load_phrases()), config.TRANSCRIPT_FILLER_WORDS,
+                            config.TRANSCRIPT_NO_SPEECH_THRESHOLD, config.TRANSCRIPT_LOGPROB_THRESHOLD,
+                            config.TRANSCRIPT_REPEAT_THRESHOLD)
+
+
+if __name__ == "__main__":
+    # Kiểm tra nhanh các trường hợp đã từng lỗi
+    import unicodedata as _unicodedata
+
+    transcript_filter = TranscriptFilter(["hãy đăng ký kênh"], ["ừ", "à"])
+    decomposed = _unicodedata.normalize("NFD", "Chốt ngân sách. Hãy đăng ký kênh…")
+    assert transcript_filter.apply(decomposed) == "Chốt ngân sách.", transcript_filter.apply(decomposed)
+    assert collapse_repetitions("Chúng ta - - - bắt đầu … … …") == "Chúng ta - - - bắt đầu … … …"
+    assert collapse_repetitions("cảm ơn cảm ơn cảm ơn các bạn") == "cảm ơn các bạn"
+    print("OK")
@@ -0,0 +1,193 @@
+"""
+Benchmark loại ý gần trùng khi hợp nhất meeting minutes: so sánh NearDuplicateIndex (MinHash + LSH, gần tuyến tính)
+với so sánh từng cặp O(n²) trên cùng tiêu chí (Jaccard shingle sau khi bỏ dấu), và đo merge_meeting_minutes
+khi chỉ gộp ý trùng khớp (threshold=0) so với khi gộp cả ý gần trùng.
+Các ý được sinh từ một tập ý gốc cùng các biến thể diễn đạt lại (bỏ dấu, đổi hoa thường, thêm khoảng trắng,
+thêm từ đệm) như kết quả của các chunk chồng lấn.
+
+Chạy:
+    python -m benchmarks.bench_dedup --items 1000 5000 20000 --output bench_dedup.json
+So sánh với baseline (thoát với mã 1 nếu có bước chậm hơn ngưỡng cho phép):
+    python -m benchmarks.bench_dedup --baseline benchmarks/dedup_baseline.json --threshold 0.3
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import unicodedata
+from collections import Counter
+from typing import List, Tuple
+
+from app.modules.dedup import NearDuplicateIndex, compatible, dedupe, guard_tokens, jaccard, normalize_text, shingles
+from app.modules.schema import MeetingMinutes
+from app.modules.summarizer import MeetingMinutesAccumulator
+from benchmarks.bench_pipeline import compare
+from benchmarks.synthetic import NAMES, TOPICS
+
+DECISIONS = [
+    "Giao cho {name} phụ trách {topic}, hạn hoàn thành ngày {date}.",
+    "Phê duyệt kế hoạch {topic} với ngân sách {count} trăm triệu đồng.",
+    "Bổ sung {count} nhân sự cho {topic} trước ngày {date}.",
+    "{name} báo cáo lại tình hình {topic} trong cuộc họp ngày {date}.",
+]
+
+FILLER_WORDS = ["các", "việc", "cho", "về"]
+
+# Các cặp ý gần giống nhau về chữ nhưng trái nghĩa hoặc khác người phụ trách: không bao giờ được gộp
+CONTRADICTING_PAIRS = [
+    ("Phê duyệt bổ sung nhân sự cho dự án", "Không phê duyệt bổ sung nhân sự cho dự án"),
+    ("Tăng ngân sách marketing cho quý tới", "Giảm ngân sách marketing cho quý tới"),
+    ("Anh An phụ trách báo cáo tài chính quý 3", "Anh Bình phụ trách báo cáo tài chính quý 3"),
+    ("Dự án đã hoàn thành đúng hạn", "Dự án chưa hoàn thành đúng hạn"),
+]
+
+
+def make_items(count: int, seed: int = 42, duplicate_ratio: float = 0.5) -> Tuple[List[str], int]:
+    """
+    Sinh count ý, trong đó khoảng duplicate_ratio là biến thể gần trùng của một ý đã sinh trước đó.
+    Trả về (danh sách ý, số ý gốc).
+    """
+    rng = random.Random(seed)
+    originals: List[str] = []
+    items: List[str] = []
+    while len(items) < count:
+        if originals and rng.random() < duplicate_ratio:
+            items.append(paraphrase(rng.choice(originals), rng))
+            continue
+        item = rng.choice(DECISIONS).format(
+            name=rng.choice(NAMES), topic=rng.choice(TOPICS), count=rng.randint(1, 99),
+            date=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025")
+        originals.append(item)
+        items.append(item)
+    return items, len(originals)
+
+
+def paraphrase(text: str, rng: random.Random) -> str:
+    """Biến thể gần trùng của một ý: bỏ dấu, đổi hoa thường, thêm khoảng trắng hoặc thêm một từ đệm."""
+    choice = rng.randrange(4)
+    if choice == 0:
+        text = "".join(ch for ch in unicodedata.normalize("NFD", text) if not unicodedata.combining(ch))
+        return text.replace("đ", "d").replace("Đ", "D")
+    if choice == 1:
+        return text.lower().rstrip(".")
+    if choice == 2:
+        return "  " + text.replace(" ", "  ", 2)
+    words = text.split()
+    words.insert(rng.randrange(1, len(words)), rng.choice(FILLER_WORDS))
+    return " ".join(words)
+
+
+def pairwise_dedupe(values: List[str], threshold: float) -> List[str]:
+    """Cách làm O(n²): so sánh mỗi ý với mọi ý đại diện đã giữ lại."""
+    guard_words = NearDuplicateIndex().guard_words
+    kept = []
+    for value in values:
+        normalized = normalize_text(value)
+        shingle_set = shingles(normalized)
+        numbers = tuple(sorted(w for w in normalized.split() if any(ch.isdigit() for ch in w)))
+        words, guard = Counter(normalized.split()), guard_tokens(value, guard_words)
+        if not any(numbers == kept_numbers and jaccard(shingle_set, kept_shingles) >= threshold
+                   and compatible(words, guard, kept_words, kept_guard)
+                   for _, kept_shingles, kept_numbers, kept_words, kept_guard in kept):
+            kept.append((value, shingle_set, numbers, words, guard))
+    return [value for value, *_ in kept]
+
+
+def check_contradictions(threshold: float) -> None:
+    for pair in CONTRADICTING_PAIRS:
+        if len(dedupe(list(pair), threshold)) != 2 or len(pairwise_dedupe(list(pair), threshold)) != 2:
+            raise AssertionError(f"Hai ý trái nghĩa bị gộp: {pair}")
+
+
+def timed(fn) -> Tuple[float, object]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run_size(count: int, args) -> dict:
+    items, originals = make_items(count, seed=args.seed)
+    stages = {}
+
+    def index_dedupe():
+        index = NearDuplicateIndex(args.similarity)
+        for item in items:
+            index.canonical(item)
+        return index
+
+    seconds, index = timed(index_dedupe)
+    stages["minhash_index"] = {"seconds": round(seconds, 5), "kept": len(index), "originals": originals,
+                               "comparisons": index.comparisons,
+                               "items_per_second": round(count / seconds, 1)}
+
+    if count <= args.pairwise_max:
+        seconds, kept = timed(lambda: pairwise_dedupe(items, args.similarity))
+        stages["pairwise"] = {"seconds": round(seconds, 5), "kept": len(kept), "originals": originals,
+                              "items_per_second": round(count / seconds, 1)}
+        stages["minhash_index"]["speedup"] = round(seconds / stages["minhash_index"]["seconds"], 1)
+
+    # Hợp nhất các chunk (mỗi chunk 10 ý) với gộp trùng khớp và gộp gần trùng
+    minutes_list = [MeetingMinutes(cac_quyet_dinh=items[i:i + 10],
+                                   noi_dung_thao_luan={TOPICS[(i // 10) % len(TOPICS)]: items[i:i + 10]})
+                    for i in range(0, count, 10)]
+    for name, threshold in (("merge_exact", 0), ("merge_dedup", args.similarity)):
+        def merge():
+            accumulator = MeetingMinutesAccumulator(dedup_threshold=threshold)
+            for minutes in minutes_list:
+                accumulator.add(minutes)
+            return accumulator.result()
+
+        seconds, merged = timed(merge)
+        stages[name] = {"seconds": round(seconds, 5), "decisions": len(merged.cac_quyet_dinh),
+                        "discussion_points": sum(len(v) for v in merged.noi_dung_thao_luan.values()),
+                        "json_bytes": len(merged.model_dump_json())}
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 5000, 20000], help="Số ý cần loại trùng")
+    parser.add_argument("--similarity", type=float, default=0.7, help="Ngưỡng Jaccard coi hai ý là gần trùng")
+    parser.add_argument("--pairwise-max", type=int, default=20000, help="Chỉ chạy cách O(n²) tới số ý này")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File JSON baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Ngưỡng chậm hơn cho phép so với baseline")
+    args = parser.parse_args()
+
+    check_contradictions(args.similarity)  # đồng thời nạp numpy trước khi đo
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "similarity": args.similarity
+        },
+        "results": {f"items={count}": run_size(count, args) for count in args.items}
+    }
+
+    for size, stages in report["results"].items():
+        for stage, metrics in stages.items():
+            kept = metrics.get("kept", metrics.get("decisions"))
+            print(f"{size:>12} {stage:<14} {metrics['seconds']:>10.4f}s  kept={kept:<6} "
+                  f"{metrics.get('speedup', '')!s:>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
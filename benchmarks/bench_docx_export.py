@@ -0,0 +1,137 @@
+"""
+Benchmark xuất DOCX: so sánh cách dựng toàn bộ tài liệu bằng python-docx ở mỗi lần gọi (dynamic)
+với template biên dịch sẵn (template) và xuất hàng loạt (bulk), tính theo số tài liệu mỗi giây.
+Biên bản đầu vào được sinh từ transcript tổng hợp bằng StubChatModel; trước khi đo, benchmark kiểm tra
+hai cách xuất cho ra cùng nội dung (đoạn văn, style, chữ đậm, bảng).
+
+Chạy:
+    python -m benchmarks.bench_docx_export --lines 50 500 --docs 20 --output bench_docx.json
+So sánh với baseline (thoát với mã 1 nếu có bước chậm hơn ngưỡng cho phép):
+    python -m benchmarks.bench_docx_export --baseline benchmarks/docx_baseline.json --threshold 0.3
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from typing import List
+
+from app.modules.exporter import (
+    export_meeting_minutes_bulk, export_meeting_minutes_to_docx, export_meeting_minutes_to_docx_dynamic,
+    get_docx_template
+)
+from app.modules.schema import MeetingMinutes
+from benchmarks.bench_pipeline import compare
+from benchmarks.stub_llm import StubChatModel
+from benchmarks.synthetic import generate_transcript
+
+
+def make_minutes(num_lines: int, docs: int) -> List[MeetingMinutes]:
+    """Sinh `docs` biên bản khác nhau từ transcript tổng hợp dài num_lines dòng."""
+    return [MeetingMinutes(**StubChatModel._extract(generate_transcript(num_lines, seed=seed)))
+            for seed in range(docs)]
+
+
+def document_outline(content: bytes) -> tuple:
+    """Nội dung có thể so sánh của file DOCX: (style, text, bold của từng run) mỗi đoạn và text các bảng."""
+    from docx import Document
+
+    document = Document(io.BytesIO(content))
+    paragraphs = [(p.style.name, p.text, tuple(r.bold for r in p.runs)) for p in document.paragraphs]
+    tables = [[cell.text for row in table.rows for cell in row.cells] for table in document.tables]
+    return paragraphs, tables
+
+
+def check_equivalent(minutes_list: List[MeetingMinutes]) -> None:
+    for minutes in minutes_list:
+        dynamic, template = io.BytesIO(), io.BytesIO()
+        export_meeting_minutes_to_docx_dynamic(minutes, dynamic)
+        export_meeting_minutes_to_docx(minutes, template)
+        if document_outline(dynamic.getvalue()) != document_outline(template.getvalue()):
+            raise AssertionError("Template và python-docx cho ra nội dung khác nhau.")
+
+
+def throughput(fn, docs: int, min_seconds: float) -> dict:
+    """Lặp fn (xuất `docs` tài liệu mỗi lần) cho tới khi đủ min_seconds, trả về số tài liệu mỗi giây."""
+    rounds, start = 0, time.perf_counter()
+    while True:
+        fn()
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+    seconds = elapsed / (rounds * docs)
+    return {"seconds": round(seconds, 6), "docs_per_second": round(1 / seconds, 2)}
+
+
+def run_size(num_lines: int, args) -> dict:
+    minutes_list = make_minutes(num_lines, args.docs)
+    check_equivalent(minutes_list[:3])
+
+    def dynamic():
+        for minutes in minutes_list:
+            export_meeting_minutes_to_docx_dynamic(minutes, io.BytesIO())
+
+    def template():
+        for minutes in minutes_list:
+            export_meeting_minutes_to_docx(minutes, io.BytesIO())
+
+    def bulk():
+        export_meeting_minutes_bulk(minutes_list)
+
+    stages = {
+        "dynamic": throughput(dynamic, args.docs, args.min_seconds),
+        "template": throughput(template, args.docs, args.min_seconds),
+        "bulk": throughput(bulk, args.docs, args.min_seconds)
+    }
+    stages["template"]["speedup"] = round(stages["dynamic"]["seconds"] / stages["template"]["seconds"], 1)
+    stages["bulk"]["speedup"] = round(stages["dynamic"]["seconds"] / stages["bulk"]["seconds"], 1)
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 500], help="Số dòng transcript của mỗi biên bản")
+    parser.add_argument("--docs", type=int, default=20, help="Số biên bản khác nhau mỗi lượt")
+    parser.add_argument("--min-seconds", type=float, default=2.0, help="Thời gian đo tối thiểu cho mỗi cách xuất")
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File JSON baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Ngưỡng chậm hơn cho phép so với baseline")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    get_docx_template()
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "docs": args.docs,
+            "template_build_seconds": round(time.perf_counter() - start, 4)
+        },
+        "results": {f"lines={num_lines}": run_size(num_lines, args) for num_lines in args.lines}
+    }
+
+    for size, stages in report["results"].items():
+        for stage, metrics in stages.items():
+            print(f"{size:>10} {stage:<9} {metrics['docs_per_second']:>10.1f} docs/s "
+                  f"{metrics.get('speedup', '')!s:>8}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+Benchmark offline cho pipeline transcript -> MeetingMinutes -> DOCX.
+
+Dùng transcript tiếng Việt tổng hợp và StubChatModel (không gọi mạng, độ trễ cấu hình được) thay cho ChatOpenAI,
+đo thời gian, throughput và bộ nhớ đỉnh của từng bước (chia chunk, gọi LLM, hợp nhất, xuất DOCX) và của cả pipeline.
+
+Chạy:
+    python -m benchmarks.bench_pipeline --lines 200 2000 --latency 0.05 --output bench_pipeline.json
+So sánh với baseline (thoát với mã 1 nếu có bước chậm hơn ngưỡng cho phép):
+    python -m benchmarks.bench_pipeline --lines 200 2000 --baseline benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from app import config
+from app.modules import summarizer
+from app.modules.chunking import read_transcript_in_token_chunks
+from app.modules.exporter import export_meeting_minutes_to_docx
+from benchmarks.stub_llm import StubChatModel
+from benchmarks.synthetic import generate_transcript
+
+# Các chỉ số được so sánh với baseline (giá trị càng lớn càng tệ)
+COMPARED_METRICS = ("seconds", "peak_mb")
+
+
+def measure(fn: Callable, repeat: int = 3, items: int = 0) -> dict:
+    """
+    Đo một bước: thời gian là trung vị của `repeat` lần chạy (không bật tracemalloc),
+    bộ nhớ đỉnh đo ở một lần chạy riêng với tracemalloc.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = statistics.median(durations)
+    result = {"seconds": round(seconds, 5), "peak_mb": round(peak / (1024 * 1024), 3)}
+    if items:
+        result["items"] = items
+        result["items_per_second"] = round(items / seconds, 2) if seconds else None
+    return result
+
+
+def run_size(num_lines: int, args) -> Dict[str, dict]:
+    """Chạy toàn bộ các bước cho một transcript num_lines dòng."""
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(generate_transcript(num_lines, seed=args.seed))
+    try:
+        stages = {}
+        line_chunks = summarizer.read_transcript_in_chunks(path, args.chunk_size, args.chunk_overlap)
+        stages["chunk_lines"] = measure(
+            lambda: summarizer.read_transcript_in_chunks(path, args.chunk_size, args.chunk_overlap),
+            args.repeat, num_lines)
+        stages["chunk_lines"]["chunks"] = len(line_chunks)
+
+        token_chunks = read_transcript_in_token_chunks(path, args.chunk_tokens, args.chunk_overlap_tokens)
+        stages["chunk_tokens"] = measure(
+            lambda: read_transcript_in_token_chunks(path, args.chunk_tokens, args.chunk_overlap_tokens),
+            args.repeat, num_lines)
+        stages["chunk_tokens"]["chunks"] = len(token_chunks)
+
+        results = summarizer.summarize_chunks(token_chunks, max_concurrency=args.concurrency, use_cache=False)
+        stages["summarize"] = measure(
+            lambda: summarizer.summarize_chunks(token_chunks, max_concurrency=args.concurrency, use_cache=False),
+            1, len(token_chunks))
+
+        merged = summarizer.merge_meeting_minutes(results)
+        stages["merge"] = measure(lambda: summarizer.merge_meeting_minutes(results), args.repeat, len(results))
+
+        stages["export_docx"] = measure(
+            lambda: export_meeting_minutes_to_docx(merged, io.BytesIO()), args.repeat, 1)
+
+        def end_to_end():
+            minutes = summarizer.process_transcript_file(
+                path, chunk_tokens=args.chunk_tokens, chunk_overlap_tokens=args.chunk_overlap_tokens,
+                max_concurrency=args.concurrency, use_cache=False)
+            export_meeting_minutes_to_docx(minutes, io.BytesIO())
+
+        stages["end_to_end"] = measure(end_to_end, 1, num_lines)
+        return stages
+    finally:
+        os.remove(path)
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    So sánh kết quả hiện tại với baseline, trả về danh sách các chỉ số vượt quá baseline * (1 + threshold).
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, metrics in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(stage)
+            if not base:
+                continue
+            for metric in COMPARED_METRICS:
+                if metric in metrics and base.get(metric):
+                    limit = base[metric] * (1 + threshold)
+                    if metrics[metric] > limit:
+                        regressions.append(
+                            f"{size}/{stage}/{metric}: {metrics[metric]} > {base[metric]} (+{threshold:.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[200, 2000], help="Số dòng transcript cần đo")
+    parser.add_argument("--latency", type=float, default=0.05, help="Độ trễ (giây) mỗi lời gọi LLM stub")
+    parser.add_argument("--latency-per-1k-chars", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=config.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--chunk-size", type=int, default=7)
+    parser.add_argument("--chunk-overlap", type=int, default=2)
+    parser.add_argument("--chunk-tokens", type=int, default=config.CHUNK_MAX_TOKENS)
+    parser.add_argument("--chunk-overlap-tokens", type=int, default=config.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần lặp cho các bước không gọi LLM")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File JSON baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Ngưỡng chậm hơn cho phép so với baseline")
+    args = parser.parse_args()
+
+    stub = StubChatModel(latency=args.latency, latency_per_1k_chars=args.latency_per_1k_chars)
+    summarizer.set_llm_factory(lambda: stub)
+    try:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+                "stub_latency": args.latency,
+                "concurrency": args.concurrency
+            },
+            "results": {}
+        }
+        for num_lines in args.lines:
+            report["results"][f"lines={num_lines}"] = run_size(num_lines, args)
+        report["meta"]["llm_calls"] = stub.calls
+    finally:
+        summarizer.set_llm_factory(None)
+
+    for size, stages in report["results"].items():
+        for stage, metrics in stages.items():
+            print(f"{size:>12} {stage:<14} {metrics['seconds']:>10.4f}s {metrics['peak_mb']:>9.3f}MB "
+                  f"{metrics.get('items_per_second') or '':>12}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
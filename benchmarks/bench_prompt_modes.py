@@ -0,0 +1,125 @@
+"""
+Benchmark số token và thời gian trích xuất biên bản theo hai chế độ output của LLM trên cùng các chunk transcript:
+  - parser:     prompt đầy đủ (format instructions của PydanticOutputParser + output mẫu) cho mỗi chunk.
+  - structured: prompt rút gọn + định nghĩa hàm MeetingMinutes (function calling).
+Số token prompt/completion được lấy từ bộ đếm mmg_llm_tokens_total (usage của API, hoặc đếm bằng tokenizer nếu
+API không trả về), nên phản ánh đúng những gì ứng dụng ghi nhận. Mặc định dùng StubChatModel (không gọi mạng,
+báo usage như API, độ trễ tăng theo độ dài prompt); --live gọi model thật theo config (cần OPENAI_API_KEY).
+
+Chạy:
+    python -m benchmarks.bench_prompt_modes --lines 200 --chunk-tokens 300 800 1500 --output bench_prompt_modes.json
+So sánh với baseline (thoát với mã 1 nếu có chỉ số lớn hơn ngưỡng cho phép):
+    python -m benchmarks.bench_prompt_modes --baseline benchmarks/prompt_modes_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import List
+
+from app import config
+from app.modules import summarizer
+from app.modules.chunking import split_transcript_by_tokens
+from app.modules.metrics import LLM_CALLS, LLM_TOKENS
+from benchmarks.bench_pipeline import compare
+from benchmarks.stub_llm import StubChatModel
+from benchmarks.synthetic import generate_transcript
+
+MODES = ("parser", "structured")
+
+
+def run_mode(chunks: List[str], mode: str) -> dict:
+    """Trích xuất lần lượt từng chunk theo một chế độ, trả về số token và thời gian."""
+    prompt_before = LLM_TOKENS.value(kind="prompt")
+    completion_before = LLM_TOKENS.value(kind="completion")
+    calls_before = LLM_CALLS.value(purpose="extract")
+    start = time.perf_counter()
+    results = [summarizer.extract_meeting_minutes(chunk, output_mode=mode) for chunk in chunks]
+    seconds = time.perf_counter() - start
+    calls = int(LLM_CALLS.value(purpose="extract") - calls_before)
+    prompt_tokens = int(LLM_TOKENS.value(kind="prompt") - prompt_before)
+    completion_tokens = int(LLM_TOKENS.value(kind="completion") - completion_before)
+    transcript_tokens = sum(summarizer.count_tokens(chunk, config.LLM_MODEL_NAME) for chunk in chunks)
+    return {
+        "seconds": round(seconds, 4),
+        "calls": calls,
+        # Lớn hơn số chunk nếu có chunk phải trích xuất lại bằng chế độ parser
+        "fallbacks": calls - len(chunks),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "prompt_overhead_per_chunk": round((prompt_tokens - transcript_tokens) / len(chunks), 1),
+        "results": [minutes.model_dump() for minutes in results]
+    }
+
+
+def run_size(transcript: str, chunk_tokens: int, args) -> dict:
+    chunks = split_transcript_by_tokens(transcript, chunk_tokens, args.chunk_overlap_tokens)
+    stages = {mode: run_mode(chunks, mode) for mode in MODES}
+    same = stages["parser"].pop("results") == stages["structured"].pop("results")
+    parser, structured = stages["parser"], stages["structured"]
+    for stage in stages.values():
+        stage["chunks"] = len(chunks)
+    structured["same_minutes"] = same
+    structured["prompt_token_saving"] = round(1 - structured["prompt_tokens"] / parser["prompt_tokens"], 3)
+    structured["total_token_saving"] = round(
+        1 - (structured["prompt_tokens"] + structured["completion_tokens"])
+        / (parser["prompt_tokens"] + parser["completion_tokens"]), 3)
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=200, help="Số dòng transcript tổng hợp")
+    parser.add_argument("--chunk-tokens", type=int, nargs="+", default=[300, 800, 1500],
+                        help="Các ngân sách token mỗi chunk cần đo")
+    parser.add_argument("--chunk-overlap-tokens", type=int, default=config.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--latency", type=float, default=0.0, help="Độ trễ (giây) mỗi lời gọi LLM stub")
+    parser.add_argument("--latency-per-1k-chars", type=float, default=0.01,
+                        help="Độ trễ thêm (giây) của LLM stub cho mỗi 1000 ký tự prompt")
+    parser.add_argument("--live", action="store_true", help="Gọi model thật theo config thay cho stub")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File JSON baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Ngưỡng lớn hơn cho phép so với baseline")
+    args = parser.parse_args()
+
+    if not args.live:
+        summarizer.set_llm_factory(lambda: StubChatModel(args.latency, args.latency_per_1k_chars))
+    transcript = generate_transcript(args.lines, seed=args.seed)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "model": config.LLM_MODEL_NAME if args.live else "stub",
+            "lines": args.lines,
+            "overhead_tokens": {mode: summarizer.estimate_prompt_tokens("", mode) for mode in MODES}
+        },
+        "results": {f"chunk_tokens={size}": run_size(transcript, size, args) for size in args.chunk_tokens}
+    }
+
+    for size, stages in report["results"].items():
+        for mode, metrics in stages.items():
+            print(f"{size:>18} {mode:<11} {metrics['seconds']:>8.3f}s  chunks={metrics['chunks']:<4} "
+                  f"prompt={metrics['prompt_tokens']:<7} completion={metrics['completion_tokens']:<7} "
+                  f"overhead/chunk={metrics['prompt_overhead_per_chunk']:<7} "
+                  f"{metrics.get('prompt_token_saving', '')!s:>6}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
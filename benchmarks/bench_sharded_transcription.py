@@ -0,0 +1,80 @@
+"""
+Benchmark so sánh thời gian transcribe một file audio dài giữa cách gọi một lần
+(BatchedInferencePipeline.transcribe trên cả file) và cách chia shard theo VAD chạy trên nhiều process.
+
+Chạy:
+    python -m benchmarks.bench_sharded_transcription path/to/meeting.mp3 --workers 2 4 --output bench_sharded.json
+
+Model được nạp sẵn (warm-up) trước khi đo để chỉ so sánh thời gian giải mã; cache transcript bị tắt.
+Nếu cache PCM bật (PCM_CACHE_ENABLED), audio chỉ được giải mã ở lần chạy đầu, các lần sau đọc từ memory-map.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+
+from app import config
+from app.modules.model_registry import get_model_registry
+from app.modules.preprocessing import transcribe_audio, transcribe_audio_sharded
+
+
+def _timed(fn, **kwargs) -> tuple:
+    start = time.perf_counter()
+    segments, info = fn(**kwargs)
+    return time.perf_counter() - start, segments, info
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio", help="Đường dẫn tới file audio cần transcribe")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Các số worker cần đo")
+    parser.add_argument("--model-size", default=config.WHISPER_MODEL_SIZE)
+    parser.add_argument("--compute-type", default=config.WHISPER_COMPUTE_TYPE)
+    parser.add_argument("--beam-size", type=int, default=config.WHISPER_BEAM_SIZE)
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    params = dict(
+        input_audio=args.audio,
+        model_size=args.model_size,
+        device="cpu",
+        compute_type=args.compute_type,
+        beam_size=args.beam_size,
+        vad_filter=True,
+        use_cache=False
+    )
+
+    get_model_registry().warm_up(args.model_size, "cpu", args.compute_type)
+    baseline_seconds, segments, info = _timed(transcribe_audio, **params)
+    results = {
+        "audio": os.path.basename(args.audio),
+        "audio_seconds": round(info.duration, 2),
+        "cpu_count": os.cpu_count(),
+        "machine": platform.processor() or platform.machine(),
+        "model_size": args.model_size,
+        "single_call": {"seconds": round(baseline_seconds, 2), "segments": len(segments)},
+        "sharded": []
+    }
+    print(f"single call: {baseline_seconds:.2f}s ({len(segments)} segments)")
+
+    for workers in args.workers:
+        # Lần gọi đầu tiên khởi động pool và nạp model trong từng worker, không tính vào kết quả
+        transcribe_audio_sharded(**params, num_workers=workers)
+        seconds, sharded_segments, _ = _timed(transcribe_audio_sharded, **params, num_workers=workers)
+        speedup = baseline_seconds / seconds if seconds else 0.0
+        results["sharded"].append({
+            "workers": workers,
+            "seconds": round(seconds, 2),
+            "segments": len(sharded_segments),
+            "speedup": round(speedup, 2)
+        })
+        print(f"sharded x{workers}: {seconds:.2f}s ({len(sharded_segments)} segments), speedup {speedup:.2f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark thời gian khởi động (cold start): mỗi lần đo chạy một interpreter Python mới, import module
+(hoặc khởi động app FastAPI và gọi /health) và ghi lại thời gian import, thời gian cả process
+và các thư viện nặng (faster-whisper, LangChain, OpenAI, python-docx, ...) đã bị nạp theo.
+
+Chạy:
+    python -m benchmarks.bench_startup --repeat 5 --output bench_startup.json
+So sánh với baseline (thoát với mã 1 nếu chậm hơn ngưỡng cho phép hoặc app.main nạp thư viện nặng):
+    python -m benchmarks.bench_startup --baseline benchmarks/startup_baseline.json --threshold 0.3
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.bench_pipeline import compare
+
+# Các thư viện nặng chỉ nên được import khi thực sự dùng tới
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "onnxruntime", "av", "torch", "langchain_openai",
+                 "langchain", "langchain_core", "langchain_text_splitters", "openai", "tiktoken", "docx", "gradio")
+
+# Các module mà khi import không được kéo theo thư viện nặng nào
+LIGHT_TARGETS = ("app", "app.config", "app.main")
+
+IMPORT_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+APP_READY_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from app.main import app
+with TestClient(app) as client:
+    client.get("/health").raise_for_status()
+    seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+TARGETS = {
+    "app": IMPORT_SNIPPET.format(module="app", heavy=HEAVY_MODULES),
+    "app.config": IMPORT_SNIPPET.format(module="app.config", heavy=HEAVY_MODULES),
+    "app.modules.exporter": IMPORT_SNIPPET.format(module="app.modules.exporter", heavy=HEAVY_MODULES),
+    "app.modules.summarizer": IMPORT_SNIPPET.format(module="app.modules.summarizer", heavy=HEAVY_MODULES),
+    "app.modules.preprocessing": IMPORT_SNIPPET.format(module="app.modules.preprocessing", heavy=HEAVY_MODULES),
+    "app.main": IMPORT_SNIPPET.format(module="app.main", heavy=HEAVY_MODULES),
+    "app_ready": APP_READY_SNIPPET.format(heavy=HEAVY_MODULES),
+}
+
+
+def run_target(snippet: str, repeat: int) -> dict:
+    """Chạy snippet trong `repeat` interpreter mới, trả về trung vị thời gian import và thời gian process."""
+    env = dict(os.environ, WHISPER_WARMUP_ON_STARTUP="0")
+    import_seconds, process_seconds = [], []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, env=env, check=True)
+        process_seconds.append(time.perf_counter() - start)
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        import_seconds.append(result["seconds"])
+        loaded = result["loaded"]
+    return {
+        "seconds": round(statistics.median(import_seconds), 4),
+        "process_seconds": round(statistics.median(process_seconds), 4),
+        "heavy_modules": loaded
+    }
+
+
+def check_light_targets(results: Dict[str, dict]) -> List[str]:
+    """Các module nhẹ (LIGHT_TARGETS) không được kéo theo thư viện nặng khi import."""
+    return [f"{target}: nạp thư viện nặng {', '.join(results[target]['heavy_modules'])}"
+            for target in LIGHT_TARGETS if target in results and results[target]["heavy_modules"]]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=5, help="Số interpreter mới cho mỗi module")
+    parser.add_argument("--output", help="Ghi kết quả ra file JSON")
+    parser.add_argument("--baseline", help="File JSON baseline để so sánh")
+    parser.add_argument("--threshold", type=float, default=0.3, help="Ngưỡng chậm hơn cho phép so với baseline")
+    args = parser.parse_args()
+
+    results = {target: run_target(TARGETS[target], args.repeat) for target in args.targets}
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat
+        },
+        "results": {"startup": results}
+    }
+
+    for target, metrics in results.items():
+        print(f"{target:<28} {metrics['seconds']:>8.3f}s {metrics['process_seconds']:>8.3f}s  "
+              f"{', '.join(metrics['heavy_modules']) or '-'}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    regressions = check_light_targets(results)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions += compare(report, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
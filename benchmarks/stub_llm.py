@@ -0,0 +1,107 @@
+"""
+Chat model giả lập (stub) thay cho ChatOpenAI trong benchmark: không gọi mạng, trả về
+MeetingMinutes dạng JSON suy ra một cách tất định từ transcript, với độ trễ cấu hình được.
+Hỗ trợ cả with_structured_output (function calling) và báo số token như API (usage_metadata).
+"""
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from app.modules.tokenizer import count_tokens
+from benchmarks.synthetic import NAMES, TOPICS
+
+DATE_PATTERN = re.compile(r"\b\d{2}/\d{2}/\d{4}\b")
+TRANSCRIPT_MARKER = "Transcript cần xử lý:"
+
+
+class StubChatModel:
+    """
+    Model stub có giao diện invoke(messages) giống chat model của LangChain.
+
+    Args:
+        latency (float): Độ trễ cố định (giây) của mỗi lời gọi.
+        latency_per_1k_chars (float): Độ trễ thêm (giây) cho mỗi 1000 ký tự prompt.
+    """
+
+    def __init__(self, latency: float = 0.2, latency_per_1k_chars: float = 0.0):
+        self.latency = latency
+        self.latency_per_1k_chars = latency_per_1k_chars
+        self.calls = 0
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def _call(self, messages, tool_tokens: int = 0):
+        prompt = "\n".join(getattr(m, "content", str(m)) for m in messages)
+        time.sleep(self.latency + self.latency_per_1k_chars * len(prompt) / 1000)
+        transcript = prompt.split(TRANSCRIPT_MARKER, 1)[-1]
+        return prompt, self._extract(transcript), count_tokens(prompt) + tool_tokens
+
+    def _record(self, prompt: str, prompt_tokens: int, completion: str) -> dict:
+        completion_tokens = count_tokens(completion)
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def invoke(self, messages):
+        prompt, minutes, prompt_tokens = self._call(messages)
+        content = json.dumps(minutes, ensure_ascii=False)
+        return SimpleNamespace(content=content, tool_calls=[],
+                               usage_metadata=self._record(prompt, prompt_tokens, content))
+
+    def with_structured_output(self, schema, method: str = "function_calling", include_raw: bool = False):
+        return _StubStructuredModel(self, schema, include_raw)
+
+    @staticmethod
+    def _extract(transcript: str) -> dict:
+        lines = [line.strip() for line in transcript.splitlines() if line.strip()]
+        dates = DATE_PATTERN.findall(transcript)
+        members = [name for name in NAMES if name in transcript]
+        topics = [topic for topic in TOPICS if topic in transcript]
+        discussion = {}
+        for topic in topics:
+            points = [line for line in lines if topic in line and "quyết định" not in line]
+            if points:
+                discussion[topic.capitalize()] = points[:3]
+        decisions = [line for line in lines if "quyết định" in line or "thống nhất" in line]
+        return {
+            "ngay_hop": dates[0] if dates else None,
+            "gio_hop": None,
+            "dia_diem": "Phòng họp A" if "phòng họp A" in transcript else None,
+            "chu_tri": NAMES[0] if "chủ trì" in transcript else None,
+            "nguoi_ghi_chep": NAMES[1] if "thư ký" in transcript else None,
+            "thanh_vien_tham_du": members or None,
+            "muc_tieu_cuoc_hop": None,
+            "chuong_trinh_nghi_su": [topic.capitalize() for topic in topics] or None,
+            "noi_dung_thao_luan": discussion or None,
+            "cac_quyet_dinh": decisions or None,
+            "ket_luan": None,
+            "tai_lieu_dinh_kem": None,
+            "ghi_chu": None
+        }
+
+
+class _StubStructuredModel:
+    """Kết quả của StubChatModel.with_structured_output: trả lời bằng một lời gọi hàm như API thật."""
+
+    def __init__(self, model: StubChatModel, schema, include_raw: bool):
+        self.model = model
+        self.schema = schema
+        self.include_raw = include_raw
+        self.tool_tokens = count_tokens(json.dumps(schema, ensure_ascii=False, separators=(",", ":"))
+                                        if isinstance(schema, dict) else json.dumps(schema.model_json_schema()))
+
+    def invoke(self, messages):
+        prompt, minutes, prompt_tokens = self.model._call(messages, self.tool_tokens)
+        usage = self.model._record(prompt, prompt_tokens, json.dumps(minutes, ensure_ascii=False))
+        raw = SimpleNamespace(content="", tool_calls=[{"name": "MeetingMinutes", "args": minutes, "id": "call_0"}],
+                              usage_metadata=usage)
+        parsed = minutes if isinstance(self.schema, dict) else self.schema.model_validate(minutes)
+        return {"raw": raw, "parsed": parsed, "parsing_error": None} if self.include_raw else parsed
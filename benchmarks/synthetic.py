@@ -0,0 +1,61 @@
+"""
+Sinh transcript cuộc họp tiếng Việt tổng hợp (có tính tất định theo seed) để benchmark pipeline.
+"""
+import random
+from typing import List
+
+NAMES = [
+    "Nguyễn Văn An", "Trần Thị Bình", "Lê Văn Cường", "Phạm Thị Dung", "Hoàng Minh Đức",
+    "Vũ Thị Hạnh", "Đặng Quốc Huy", "Bùi Thị Lan", "Đỗ Văn Minh", "Ngô Thị Nga"
+]
+
+TOPICS = [
+    "tiến độ dự án", "ngân sách quý ba", "tuyển dụng nhân sự", "kiểm thử hệ thống",
+    "kế hoạch triển khai", "phản hồi khách hàng", "bảo mật dữ liệu", "đào tạo nội bộ"
+]
+
+STATEMENTS = [
+    "Về {topic}, tôi xin báo cáo là hiện tại chúng ta đã hoàn thành khoảng {percent} phần trăm khối lượng công việc.",
+    "Anh {name} cho biết {topic} đang gặp một số khó khăn do thiếu nguồn lực trong tháng vừa rồi.",
+    "Chị {name} đề xuất tăng thêm {count} người cho phần {topic} để kịp hạn chót ngày {date}.",
+    "Chúng ta cần rà soát lại {topic} trước khi trình ban giám đốc vào ngày {date}.",
+    "Ý kiến của tôi là {topic} nên được ưu tiên trong giai đoạn tới, đặc biệt là các hạng mục còn tồn đọng.",
+    "Cuộc họp thống nhất quyết định giao cho {name} phụ trách {topic}, hạn hoàn thành ngày {date}.",
+    "Đồng chí {name} nhấn mạnh rằng {topic} phải được theo dõi hằng tuần và báo cáo đầy đủ.",
+]
+
+FILLERS = ["Vâng.", "Ừ, đúng rồi.", "Ok, tiếp tục nhé.", "Dạ, em hiểu rồi.", "Vâng, cảm ơn anh."]
+
+
+def generate_transcript_lines(num_lines: int, seed: int = 42, filler_ratio: float = 0.2) -> List[str]:
+    """
+    Sinh num_lines dòng transcript, mỗi dòng tương ứng một đoạn Whisper.
+
+    Args:
+        num_lines (int): Số dòng cần sinh.
+        seed (int): Seed cho bộ sinh ngẫu nhiên (cùng seed cho cùng transcript).
+        filler_ratio (float): Tỉ lệ câu đệm ("vâng", "ok", ...) xen giữa các phát biểu.
+
+    Returns:
+        List[str]: Danh sách các dòng transcript.
+    """
+    rng = random.Random(seed)
+    lines = [f"Hôm nay ngày 15/04/2025, chúng ta họp tại phòng họp A, chủ trì là {NAMES[0]}, thư ký là {NAMES[1]}."]
+    while len(lines) < num_lines:
+        if rng.random() < filler_ratio:
+            lines.append(rng.choice(FILLERS))
+            continue
+        template = rng.choice(STATEMENTS)
+        lines.append(template.format(
+            topic=rng.choice(TOPICS),
+            name=rng.choice(NAMES),
+            percent=rng.randint(10, 95),
+            count=rng.randint(1, 5),
+            date=f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+        ))
+    return lines[:num_lines]
+
+
+def generate_transcript(num_lines: int, seed: int = 42, filler_ratio: float = 0.2) -> str:
+    """Sinh transcript dạng văn bản, mỗi đoạn trên một dòng."""
+    return "\n".join(generate_transcript_lines(num_lines, seed, filler_ratio))
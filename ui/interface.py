@@ -1,20 +1,24 @@
 import gradio as gr
 import os
-from app.modules.preprocessing import transcribe_audio
-from app.modules.summarizer import process_transcript_file, generate_meeting_minutes
-from app.modules.exporter import export_meeting_minutes_to_docx, refine_meeting_minutes
+from app.modules.preprocessing import transcribe_audio, transcribe_audio_two_pass
+from app.modules.salience import get_salience_filter
+from app.modules.scheduler import get_deadline_scheduler
+from app.modules.checkpoint import open_checkpoint
+from app.modules.transcript_cache import hash_audio_file
+from app.modules.summarizer import IncrementalSummarizer, process_transcript, generate_meeting_minutes
+from app.modules.exporter import export_to_temp_docx
 from app import config
 
 def process_audio_to_docx(audio_file: str) -> str:
     """
     Nhận file audio, chuyển đổi thành transcript, xử lý transcript để tạo MeetingMinutes,
-    refine MeetingMinutes và xuất ra file DOCX.
+    và xuất ra file DOCX.
 
     Quy trình:
       - Sử dụng transcribe_audio để lấy transcript từ audio.
-      - Kết hợp transcript thành văn bản và lưu tạm ra file.
-      - Gọi process_transcript_file để tạo MeetingMinutes.
-      - Sử dụng refine_meeting_minutes để cải thiện nội dung.
+      - Gọi process_transcript với các đoạn transcript trong bộ nhớ để tạo MeetingMinutes.
+        Kết quả từng chunk được lưu checkpoint theo nội dung audio, nên chạy lại sau lỗi không gọi lại LLM
+        cho các chunk đã xong.
       - Xuất ra file DOCX theo định dạng hành chính Việt Nam.
 
     Args:
@@ -26,47 +30,96 @@ def process_audio_to_docx(audio_file: str) -> str:
     if not audio_file:
         raise ValueError("Không có file audio nào được tải lên.")
 
-    temp_transcript = "temp_transcript.txt"
     try:
-        # Bước 1: Chuyển đổi audio thành transcript
+        # Bước 1: Chuyển đổi audio thành transcript (băm audio một lần, dùng cho cả cache transcript lẫn checkpoint)
+        audio_hash = hash_audio_file(audio_file)
         segments, info = transcribe_audio(
             input_audio=audio_file,
             model_size=config.WHISPER_MODEL_SIZE,
             device=config.WHISPER_DEVICE,
             compute_type=config.WHISPER_COMPUTE_TYPE,
             beam_size=config.WHISPER_BEAM_SIZE,
-            vad_filter=config.WHISPER_USE_VAD
+            vad_filter=config.WHISPER_USE_VAD,
+            audio_hash=audio_hash,
+            num_workers=config.WHISPER_NUM_WORKERS
+        )
+        # Bước 2-3: Xử lý transcript (các đoạn trong bộ nhớ, không ghi file tạm) thành MeetingMinutes
+        meeting_minutes = process_transcript(
+            segments,
+            chunk_tokens=config.CHUNK_MAX_TOKENS,
+            chunk_overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+            salience=get_salience_filter(),
+            scheduler=get_deadline_scheduler(),
+            # Checkpoint theo nội dung audio: chạy lại cùng file sau khi lỗi chỉ xử lý các chunk còn thiếu;
+            # hai lần chạy đồng thời cùng file dùng chung checkpoint, chỉ lần xong sau cùng xóa nó
+            checkpoint=open_checkpoint(f"audio-{audio_hash}")
         )
-        # Bước 2: Kết hợp transcript thành văn bản
-        transcript_text = "\n".join(seg['text'] for seg in segments)
-        # Lưu transcript ra file tạm
-        with open(temp_transcript, "w", encoding="utf-8") as f:
-            f.write(transcript_text)
-
-        # Bước 3: Xử lý transcript thành MeetingMinutes qua process_transcript_file
-        meeting_minutes = process_transcript_file(temp_transcript, chunk_size=10, chunk_overlap=2)
-
-        # Bước 4: Refine MeetingMinutes bằng LLM để cải thiện văn phong
-        refined_minutes = refine_meeting_minutes(meeting_minutes)
 
-        # Bước 5: Xuất MeetingMinutes đã refine ra file DOCX
-        output_docx = "generated_meeting_minutes.docx"
-        export_meeting_minutes_to_docx(refined_minutes, output_docx)
+        # Bước 4: Xuất MeetingMinutes ra file DOCX trong thư mục tạm riêng của lần chạy này
+        output_docx = export_to_temp_docx(meeting_minutes)
 
         # return os.path.abspath(output_docx)
         return output_docx
 
     except Exception as e:
         raise Exception(f"Xảy ra lỗi: {str(e)}")
-    finally:
-        if os.path.exists(temp_transcript):
-            os.remove(temp_transcript)
+
+
+def process_audio_two_pass(audio_file: str, two_pass: bool = False):
+    """
+    Như process_audio_to_docx nhưng trả kết quả theo từng bước (generator cho Gradio): với two_pass=True,
+    biên bản nháp (model Whisper nhỏ, giải mã tham lam) được trả về trước, sau đó transcript
+    được giải mã lại bằng model đã cấu hình và biên bản cuối thay thế bản nháp; chỉ các chunk có nội dung
+    thay đổi được gửi lại tới LLM.
+
+    Args:
+        audio_file (str): Đường dẫn tới file audio được tải lên.
+        two_pass (bool): Bật chế độ hai lượt (bản nháp nhanh rồi bản cuối; mặc định tắt). Chế độ này chạy Whisper
+                         và LLM hai lần, không dùng bộ lọc salience, lập lịch theo deadline và checkpoint
+                         của process_audio_to_docx.
+
+    Yields:
+        tuple: (đường dẫn file DOCX, trạng thái).
+    """
+    if not two_pass:
+        yield process_audio_to_docx(audio_file), "Hoàn tất."
+        return
+    if not audio_file:
+        raise ValueError("Không có file audio nào được tải lên.")
+
+    try:
+        summarizer = IncrementalSummarizer(chunk_tokens=config.CHUNK_MAX_TOKENS,
+                                           chunk_overlap_tokens=config.CHUNK_OVERLAP_TOKENS)
+        passes = transcribe_audio_two_pass(
+            input_audio=audio_file,
+            model_size=config.WHISPER_MODEL_SIZE,
+            device=config.WHISPER_DEVICE,
+            compute_type=config.WHISPER_COMPUTE_TYPE,
+            beam_size=config.WHISPER_BEAM_SIZE,
+            vad_filter=config.WHISPER_USE_VAD,
+            num_workers=config.WHISPER_NUM_WORKERS,
+            draft_model_size=config.WHISPER_DRAFT_MODEL_SIZE,
+            draft_beam_size=config.WHISPER_DRAFT_BEAM_SIZE
+        )
+        for stage, segments, info in passes:
+            meeting_minutes = summarizer.summarize(segments)
+            if stage == "draft":
+                yield (export_to_temp_docx(meeting_minutes, "meeting_minutes_draft.docx"),
+                       "Bản nháp — đang giải mã lại bằng model đầy đủ...")
+            else:
+                yield (export_to_temp_docx(meeting_minutes),
+                       f"Bản cuối (cập nhật {summarizer.chunks_summarized}/{summarizer.chunk_count} chunk).")
+    except Exception as e:
+        raise Exception(f"Xảy ra lỗi: {str(e)}")
 
 # Xây dựng giao diện Gradio với output type là "filepath"
 iface = gr.Interface(
-    fn=process_audio_to_docx,
-    inputs=gr.Audio(type="filepath", label="Tải lên file audio"),
-    outputs=gr.File(label="Tải xuống biên bản họp (.docx)"),
+    fn=process_audio_two_pass,
+    inputs=[
+        gr.Audio(type="filepath", label="Tải lên file audio"),
+        gr.Checkbox(value=False, label="Trả bản nháp nhanh trước (hai lượt)")
+    ],
+    outputs=[gr.File(label="Tải xuống biên bản họp (.docx)"), gr.Textbox(label="Trạng thái")],
     title="Meeting Minutes Generator",
     description="Tải lên file audio để tạo biên bản cuộc họp (DOCX). Kết quả sẽ trả về đường dẫn tới file .docx."
 )